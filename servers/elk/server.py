@@ -7,24 +7,941 @@ Provides MCP interface for ELK Stack (Elasticsearch primarily)
 """
 
 import sys
+import csv
+import time
+import asyncio
+import gzip
 import json
+import math
+import re
+import base64
+import copy
+import random
+import hashlib
 import logging
+import fnmatch
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from itertools import accumulate, count
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterator, List
+from datetime import datetime, timedelta, timezone
 
 # Add template directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "template"))
 
 from base_server import BaseMCPServer, create_json_schema
 import requests
+import mcp.server.stdio
+from mcp.server import Server
+from mcp.types import Tool, TextContent
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 
 __version__ = "1.0.0"
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HTTP connection settings, overridable through the "http" section of config.json
+DEFAULT_HTTP_OPTIONS = {
+    "pool_connections": 10,
+    "pool_maxsize": 20,
+    "max_retries": 3,
+    "backoff_factor": 0.5,
+    "retry_statuses": [429, 503],
+    "compress_requests": True,
+    "compression_min_bytes": 1024,
+    "timeout": 30
+}
+
+# Fields returned by search tools unless fields or full_source is given;
+# overridable with "default_source_fields" in config.json
+DEFAULT_SOURCE_FIELDS = [
+    "@timestamp", "message", "level", "log.level", "service", "service.name",
+    "host.name", "kubernetes.namespace", "kubernetes.pod.name", "error.message", "error.type"
+]
+
+# Tool schema properties for _source projection and truncation
+PROJECTION_PROPERTIES = {
+    "fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Source fields to return (wildcards allowed, e.g. 'kubernetes.*')"
+    },
+    "exclude_fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Source fields to leave out (e.g. 'error.stack_trace')"
+    },
+    "max_field_length": {
+        "type": "integer",
+        "description": "Truncate string values longer than this many characters"
+    }
+}
+
+# Call instrumentation settings, overridable through the "profiling" section of config.json
+DEFAULT_PROFILE_OPTIONS = {
+    "enabled": True,
+    "history_size": 500,
+    "slow_ms": 1000,
+    "log_slow": True,
+    "query_preview_chars": 500
+}
+
+# Index catalog settings, overridable through the "index_catalog" section of config.json
+DEFAULT_CATALOG_OPTIONS = {
+    "enabled": True,
+    "ttl": 300,
+    "write_grace": 3600,
+    "max_target_length": 3000,
+    "auto_keyword": True
+}
+
+# Indices whose @timestamp bounds are read per _msearch request when building the index catalog
+CATALOG_MSEARCH_CHUNK = 200
+
+# Field catalogs: index patterns cached per cluster, fields per cardinality request
+FIELD_CATALOG_MAX_PATTERNS = 64
+CARDINALITY_MAX_FIELDS = 50
+
+# Seconds per date-math unit accepted by parse_es_time
+DATE_MATH_UNITS = {"s": 1, "m": 60, "h": 3600, "H": 3600, "d": 86400, "w": 604800}
+
+# Sampling: random_sampler needs Elasticsearch 8.2+, older clusters fall back to random_score
+RANDOM_SAMPLER_MIN_VERSION = (8, 2)
+TOP_HITS_MAX_SIZE = 100
+RANDOM_SCORE_MAX_SIZE = 10000
+SAMPLE_CONFIDENCE_Z = 1.96
+
+# Tool schema properties for sampled searches
+SAMPLING_PROPERTIES = {
+    "sample": {
+        "type": "boolean",
+        "description": "Answer from a uniform random sample instead of scanning every match",
+        "default": False
+    },
+    "sample_probability": {
+        "type": "number",
+        "description": "Sampling probability (0-0.5); derived from sample_size when omitted"
+    },
+    "sample_size": {
+        "type": "integer",
+        "description": "Target number of sampled documents (default: size for search_logs, 10000 for aggregations)"
+    },
+    "seed": {
+        "type": "integer",
+        "description": "Sampling seed; the same seed returns the same sample",
+        "default": 0
+    }
+}
+
+# Most documents fetched by one get_documents call
+MGET_MAX_DOCS = 1000
+
+# Live tail limits: open tails kept, ids remembered per tail, longest long-poll
+TAIL_MAX_SESSIONS = 100
+TAIL_MAX_SEEN = 10000
+TAIL_MAX_WAIT = 60
+TAIL_POLL_INTERVAL = 1.0
+
+# Tool execution settings, overridable through the "executor" section of config.json
+DEFAULT_EXECUTOR_OPTIONS = {
+    "max_workers": 8,
+    "default_timeout": 120,
+    "tool_timeouts": {
+        "export_logs": 900,
+        "tail_logs": TAIL_MAX_WAIT + 60
+    },
+    "cancel_es_tasks": True
+}
+
+# Search time budgets, overridable through the "search_budgets" section of config.json.
+# Budgets are sent as the search "timeout"; shards still running return what they have.
+DEFAULT_BUDGET_OPTIONS = {
+    "default": "20s",
+    "tools": {
+        "search_logs": "10s",
+        "tail_logs": "5s",
+        "get_log_stats": "15s",
+        "analyze_errors": "15s",
+        "aggregated_search": "30s",
+        "multi_search": "30s"
+    },
+    "allow_partial_results": True,
+    "http_margin_seconds": 5
+}
+
+# Tool schema properties for search time budgets
+BUDGET_PROPERTIES = {
+    "time_budget": {
+        "type": "string",
+        "description": "Search time budget (e.g., '500ms', '10s', '1m'); shards still running return partial results"
+    },
+    "allow_partial_results": {
+        "type": "boolean",
+        "description": "Return partial results when shards time out or fail instead of an error",
+        "default": True
+    },
+    "terminate_after": {
+        "type": "integer",
+        "description": "Stop collecting after this many documents per shard (counts become lower bounds)"
+    }
+}
+
+# Async searches tracked for cleanup, and defaults for how long results are kept
+ASYNC_SEARCH_MAX_TRACKED = 100
+DEFAULT_ASYNC_KEEP_ALIVE = "1h"
+
+# Log-volume anomaly detection: histogram size cap, cached series and buckets re-read for late logs
+VOLUME_MAX_BUCKETS = 1000
+VOLUME_CACHE_MAX_ENTRIES = 32
+VOLUME_REFETCH_BUCKETS = 1
+VOLUME_ALL_SERVICES = "_all"
+
+# Query selecting error logs
+DEFAULT_ERROR_QUERY = "level:error OR log.level:error"
+
+# Keyword fields behind get_log_stats/analyze_errors, overridable through "stats_fields" in config.json
+DEFAULT_STATS_FIELDS = {
+    "level": "log.level",
+    "service": "service.name",
+    "host": "host.name",
+    "message": "message.keyword"
+}
+
+# Tool schema properties shared by the log statistics tools
+LOG_STATS_PROPERTIES = {
+    "time_range": {
+        "type": "string",
+        "description": "Time range (e.g., '30m', '24h', '7d', '2w')",
+        "default": "24h"
+    },
+    "query": {
+        "type": "string",
+        "description": "Query string narrowing the logs counted",
+        "default": "*"
+    },
+    "top": {
+        "type": "integer",
+        "description": "Buckets per breakdown (services, hosts, messages)",
+        "default": 10
+    },
+    "error_query": {
+        "type": "string",
+        "description": "Query string selecting error logs",
+        "default": DEFAULT_ERROR_QUERY
+    },
+    "level_field": {
+        "type": "string",
+        "description": "Keyword field holding the log level (default from config stats_fields)"
+    },
+    "service_field": {
+        "type": "string",
+        "description": "Keyword field holding the service name"
+    },
+    "host_field": {
+        "type": "string",
+        "description": "Keyword field holding the host name"
+    },
+    "message_field": {
+        "type": "string",
+        "description": "Keyword field holding the message"
+    }
+}
+
+# Accepted time_range units
+TIME_RANGE_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+# Histogram intervals tried in order by auto_interval
+HISTOGRAM_INTERVALS = [
+    ("1m", 60), ("5m", 300), ("10m", 600), ("30m", 1800), ("1h", 3600),
+    ("3h", 10800), ("12h", 43200), ("1d", 86400), ("7d", 604800)
+]
+
+# Tool schema properties for fan-out across named clusters
+CLUSTER_PROPERTIES = {
+    "clusters": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Cluster names to query (default: all configured clusters)"
+    },
+    "timeout": {
+        "type": "number",
+        "description": "Per-cluster deadline in seconds; slower clusters are reported as failed"
+    }
+}
+
+# Result cache settings, overridable through the "cache" section of config.json
+DEFAULT_CACHE_OPTIONS = {
+    "enabled": True,
+    "max_entries": 500,
+    "absolute_ttl": 3600,
+    "relative_ttl": 60,
+    "snap_seconds": 60
+}
+
+# Aggregation types accepted in aggregation specs
+BUCKET_AGGREGATIONS = {
+    "terms", "multi_terms", "significant_terms", "rare_terms", "date_histogram",
+    "auto_date_histogram", "histogram", "range", "date_range", "filter", "filters",
+    "composite", "missing", "sampler"
+}
+METRIC_AGGREGATIONS = {
+    "avg", "sum", "min", "max", "value_count", "cardinality", "percentiles",
+    "percentile_ranks", "stats", "extended_stats", "median_absolute_deviation", "top_hits"
+}
+PIPELINE_AGGREGATIONS = {
+    "avg_bucket", "sum_bucket", "min_bucket", "max_bucket", "stats_bucket",
+    "percentiles_bucket", "derivative", "cumulative_sum", "moving_fn",
+    "bucket_script", "bucket_selector", "bucket_sort", "serial_diff"
+}
+
+# date_histogram intervals that must be sent as calendar_interval
+CALENDAR_INTERVALS = {
+    "minute", "1m", "hour", "1h", "day", "1d", "week", "1w",
+    "month", "1M", "quarter", "1q", "year", "1y"
+}
+
+# Point-in-time keep-alive used for paginated searches
+DEFAULT_PIT_KEEP_ALIVE = "2m"
+
+# Name of the connection configured by the top-level elasticsearch_url
+DEFAULT_CLUSTER = "default"
+
+# Worst-first ordering of cluster health colours
+HEALTH_ORDER = ["red", "yellow", "green"]
+
+
+class ESRequestError(Exception):
+    """Raised by streaming helpers when an Elasticsearch request fails"""
+
+    def __init__(self, result: dict):
+        super().__init__(result.get("message", "Elasticsearch request failed"))
+        self.result = result
+
+
+def encode_cursor(state: dict) -> str:
+    """Encode pagination state as an opaque continuation token"""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a continuation token produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is not base64 JSON holding an object
+    """
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, AttributeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(decoded, dict):
+        raise ValueError("Invalid cursor")
+    return decoded
+
+
+def build_aggregation(spec: dict) -> dict:
+    """Translate an aggregation spec node into an Elasticsearch aggregation
+
+    A node holds exactly one aggregation type plus an optional "aggs" map
+    of named child nodes. Metric and terms parameters may be given as a
+    bare field name, and date_histogram takes a plain "interval" that is
+    sent as calendar_interval or fixed_interval as appropriate.
+
+    Args:
+        spec: Aggregation spec node, e.g. {"terms": "service.keyword", "aggs": {...}}
+
+    Returns:
+        Elasticsearch aggregation body
+
+    Raises:
+        ValueError: If the node is malformed or uses an unknown aggregation type
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Aggregation spec must be an object, got {spec!r}")
+
+    children = spec.get("aggs") or spec.get("aggregations") or {}
+    types = [key for key in spec if key not in ("aggs", "aggregations")]
+    if len(types) != 1:
+        raise ValueError(f"Aggregation spec needs exactly one aggregation type, got {types}")
+
+    agg_type = types[0]
+    if agg_type not in BUCKET_AGGREGATIONS | METRIC_AGGREGATIONS | PIPELINE_AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation type: {agg_type}")
+
+    params = spec[agg_type]
+    if isinstance(params, str):
+        key = "buckets_path" if agg_type in PIPELINE_AGGREGATIONS else "field"
+        params = {key: params}
+    params = dict(params)
+
+    if agg_type == "date_histogram" and "interval" in params:
+        interval = params.pop("interval")
+        params["calendar_interval" if interval in CALENDAR_INTERVALS else "fixed_interval"] = interval
+
+    body = {agg_type: params}
+    if children:
+        if agg_type in METRIC_AGGREGATIONS | PIPELINE_AGGREGATIONS:
+            raise ValueError(f"{agg_type} aggregations cannot have sub-aggregations")
+        body["aggs"] = {name: build_aggregation(child) for name, child in children.items()}
+    return body
+
+
+def flatten_field_caps(result: dict) -> dict:
+    """Flatten a _field_caps response into name -> type, searchable, aggregatable, keyword
+
+    Object and metadata fields are left out. A field mapped with different
+    types across indices gets the list of types and is only marked
+    aggregatable if it is aggregatable everywhere. keyword names the
+    aggregatable keyword multi-field of a field, preferring "<name>.keyword".
+    """
+    fields = {}
+    for name, caps in result.get("fields", {}).items():
+        types = {type_name: cap for type_name, cap in caps.items() if type_name != "unmapped"}
+        if name.startswith("_") or not types or set(types) <= {"object", "nested"}:
+            continue
+        names = sorted(types)
+        fields[name] = {
+            "type": names[0] if len(names) == 1 else names,
+            "searchable": all(cap.get("searchable") for cap in types.values()),
+            "aggregatable": all(cap.get("aggregatable") for cap in types.values()),
+            "keyword": None
+        }
+
+    for name, entry in fields.items():
+        parent = fields.get(name.rsplit(".", 1)[0]) if "." in name else None
+        if parent is None or entry["type"] != "keyword" or not entry["aggregatable"]:
+            continue
+        if parent["keyword"] is None or name.endswith(".keyword"):
+            parent["keyword"] = name
+    return fields
+
+
+def keyword_aggregation_fields(aggs: dict, fields: dict) -> dict:
+    """Point aggregations on non-aggregatable fields at their keyword multi-fields
+
+    Every "field" in an aggregation's parameters is resolved, including
+    those nested in composite sources and multi_terms terms. Queries of
+    filter and filters aggregations are left alone.
+
+    Args:
+        aggs: Elasticsearch aggregations, changed in place
+        fields: Field catalog from flatten_field_caps
+
+    Returns:
+        Dict of replaced field -> keyword field
+    """
+    replaced = {}
+
+    def resolve(node: Any):
+        if isinstance(node, list):
+            for item in node:
+                resolve(item)
+        elif isinstance(node, dict):
+            field = node.get("field")
+            entry = fields.get(field) if isinstance(field, str) else None
+            if entry and not entry["aggregatable"] and entry["keyword"]:
+                replaced[field] = entry["keyword"]
+                node["field"] = entry["keyword"]
+            for value in node.values():
+                resolve(value)
+
+    for agg in aggs.values():
+        for key, params in agg.items():
+            if key in ("aggs", "aggregations"):
+                replaced.update(keyword_aggregation_fields(params, fields))
+            elif key not in ("filter", "filters"):
+                resolve(params)
+    return replaced
+
+
+class QueryCache:
+    """Size-bounded LRU cache of search responses with per-entry TTLs"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a cached response, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: dict, ttl: float):
+        """Store a response for ttl seconds, evicting least recently used entries"""
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset counters"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return size and hit-rate counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def snap_time_ranges(body: Any, snap_seconds: int, now: Optional[float] = None) -> tuple:
+    """Pin "now"-relative range bounds to a snapped absolute anchor
+
+    Every "now" in a range bound is replaced with the current time rounded
+    down to snap_seconds, using Elasticsearch's "anchor||math" syntax, so
+    repeated relative queries within one snap interval are identical.
+
+    Args:
+        body: Search body or part of it
+        snap_seconds: Snap granularity in seconds
+        now: Current Unix time (defaults to time.time())
+
+    Returns:
+        Tuple of the rewritten body and whether its time window is fixed
+        in the past (no relative or open-ended upper bounds)
+    """
+    now = time.time() if now is None else now
+    anchor = datetime.utcfromtimestamp(now // snap_seconds * snap_seconds).strftime("%Y-%m-%dT%H:%M:%SZ")
+    state = {"relative": False, "bounded": False}
+
+    def rewrite(node: Any, in_range: bool = False) -> Any:
+        if isinstance(node, dict):
+            if in_range:
+                bounds = {}
+                for key, value in node.items():
+                    if isinstance(value, str) and value.startswith("now"):
+                        state["relative"] = True
+                        value = f"{anchor}||{value[3:]}" if value[3:] else anchor
+                    elif key in ("lt", "lte"):
+                        # Naive bounds are UTC; bounds that are now or later still gain data
+                        upper = parse_es_time(value, now)
+                        if upper is not None and upper <= now * 1000:
+                            state["bounded"] = True
+                        else:
+                            state["relative"] = True
+                    bounds[key] = value
+                return bounds
+            return {
+                key: (
+                    {field: rewrite(bounds, True) for field, bounds in value.items()}
+                    if key == "range" and isinstance(value, dict) else rewrite(value)
+                )
+                for key, value in node.items()
+            }
+        if isinstance(node, list):
+            return [rewrite(item) for item in node]
+        return node
+
+    rewritten = rewrite(body)
+    return rewritten, state["bounded"] and not state["relative"]
+
+
+def parse_es_time(value: Any, now: Optional[float] = None) -> Optional[float]:
+    """Resolve a range bound to epoch milliseconds
+
+    Understands epoch milliseconds, ISO 8601 (naive means UTC), "now" and
+    "anchor||" with +/- date math. Rounding ("/d") and anything else
+    unrecognised return None so callers can fall back to not pruning.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    if value.startswith("now"):
+        anchor, math_part = (time.time() if now is None else now), value[3:]
+    else:
+        anchor_text, _, math_part = value.partition("||")
+        try:
+            parsed = datetime.fromisoformat(anchor_text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        anchor = parsed.timestamp()
+
+    for sign, amount, unit in re.findall(r"([+-])(\d+)([smhHdw])", math_part):
+        anchor += (1 if sign == "+" else -1) * int(amount) * DATE_MATH_UNITS[unit]
+    if re.sub(r"[+-]\d+[smhHdw]", "", math_part):
+        return None
+    return anchor * 1000
+
+
+def query_time_bounds(body: dict, field: str = "@timestamp") -> tuple:
+    """Find the required time range on a field in a search body
+
+    Only ranges that every hit must satisfy (top-level, or under bool
+    must/filter) are considered.
+
+    Returns:
+        Tuple of (lower, upper) epoch milliseconds, None where unbounded
+    """
+    lower, upper = None, None
+    pending = [body.get("query", {})]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, dict):
+            continue
+        if isinstance(node.get("range"), dict) and field in node["range"]:
+            bounds = node["range"][field]
+            for key in ("gte", "gt", "from"):
+                value = parse_es_time(bounds.get(key))
+                if value is not None:
+                    lower = value if lower is None else max(lower, value)
+            for key in ("lte", "lt", "to"):
+                value = parse_es_time(bounds.get(key))
+                if value is not None:
+                    upper = value if upper is None else min(upper, value)
+        if isinstance(node.get("bool"), dict):
+            for clause in ("must", "filter"):
+                children = node["bool"].get(clause, [])
+                pending.extend(children if isinstance(children, list) else [children])
+    return lower, upper
+
+
+def rolling_baselines(counts: List[float], window: int) -> List[Optional[tuple]]:
+    """Mean and standard deviation of the preceding window of each count
+
+    Computed from running sums of counts and squares, so each series
+    costs O(n) whatever the window. Buckets with fewer than half a window
+    (and at least two buckets) of history get None.
+
+    Returns:
+        List of (mean, std) or None, aligned with counts
+    """
+    sums = [0.0] + list(accumulate(counts))
+    squares = [0.0] + list(accumulate(value * value for value in counts))
+    min_history = max(2, window // 2)
+    baselines = []
+    for position in range(len(counts)):
+        start = max(0, position - window)
+        n = position - start
+        if n < min_history:
+            baselines.append(None)
+            continue
+        mean = (sums[position] - sums[start]) / n
+        variance = max((squares[position] - squares[start]) / n - mean * mean, 0.0)
+        baselines.append((mean, math.sqrt(variance)))
+    return baselines
+
+
+def deviation_score(count: float, mean: float, std: float) -> float:
+    """Score a count against its baseline in standard deviations
+
+    The deviation is floored at the Poisson noise of the mean (and at 1),
+    so flat or sparse baselines do not turn small wobbles into anomalies.
+    """
+    return (count - mean) / max(std, math.sqrt(mean), 1.0)
+
+
+def sampling_confidence(sampled: int, probability: float) -> dict:
+    """95% relative error of a count estimated as sampled / probability
+
+    For a bucket holding k sampled documents, the same formula with k in
+    place of sampled gives that bucket's error.
+    """
+    if not sampled or probability >= 1:
+        return {"level": 0.95, "relative_error": 0.0 if probability >= 1 else None}
+    return {
+        "level": 0.95,
+        "relative_error": round(SAMPLE_CONFIDENCE_Z * math.sqrt((1 - probability) / sampled), 4)
+    }
+
+
+def random_score_query(query: Optional[dict], seed: int) -> dict:
+    """Wrap a query so matches score by a seeded hash instead of relevance
+
+    The top k hits of the wrapped query are a uniform random sample of k
+    documents drawn from every match, and the same seed gives the same sample.
+    """
+    return {
+        "function_score": {
+            "query": query or {"match_all": {}},
+            "random_score": {"seed": seed, "field": "_seq_no"},
+            "boost_mode": "replace"
+        }
+    }
+
+
+def summarize_profile(profile: dict, top: int = 5) -> List[dict]:
+    """Condense a _search profile into per-shard timings and slowest query components
+
+    Returns:
+        Shards sorted slowest first, times in milliseconds
+    """
+    def walk(nodes: List[dict]) -> Iterator[dict]:
+        for node in nodes:
+            yield node
+            yield from walk(node.get("children", []))
+
+    shards = []
+    for shard in profile.get("shards", []):
+        searches = shard.get("searches", [])
+        components = [node for search in searches for node in walk(search.get("query", []))]
+        query_ns = sum(node["time_in_nanos"] for search in searches for node in search.get("query", []))
+        collector_ns = sum(node["time_in_nanos"] for search in searches for node in search.get("collector", []))
+        aggregations_ns = sum(node["time_in_nanos"] for node in shard.get("aggregations", []))
+        shards.append({
+            "shard": shard.get("id"),
+            "total_ms": round((query_ns + collector_ns + aggregations_ns) / 1e6, 3),
+            "query_ms": round(query_ns / 1e6, 3),
+            "collector_ms": round(collector_ns / 1e6, 3),
+            "aggregations_ms": round(aggregations_ns / 1e6, 3),
+            "slowest_components": [
+                {
+                    "type": node.get("type"),
+                    "description": node.get("description", "")[:200],
+                    "time_ms": round(node["time_in_nanos"] / 1e6, 3)
+                }
+                for node in sorted(components, key=lambda node: node["time_in_nanos"], reverse=True)[:top]
+            ]
+        })
+    return sorted(shards, key=lambda shard: shard["total_ms"], reverse=True)
+
+
+def parse_duration(value: Any) -> float:
+    """Parse a duration such as 500ms, 10s, 2m, 1h, 1d or a number of seconds
+
+    Raises:
+        ValueError: If the duration is not understood
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)(ms|s|m|h|d)?", str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid duration: {value} (use e.g. '500ms', '10s', '2m')")
+    return float(match.group(1)) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, None: 1}[match.group(2)]
+
+
+def partial_result_info(result: dict) -> dict:
+    """Describe why a search response is incomplete, or {} if it is complete"""
+    shards = result.get("_shards", {})
+    if not (result.get("timed_out") or result.get("terminated_early") or shards.get("failed")):
+        return {}
+    return {
+        "partial": True,
+        "timed_out": bool(result.get("timed_out")),
+        "terminated_early": bool(result.get("terminated_early")),
+        "shards": {key: shards.get(key) for key in ("total", "successful", "skipped", "failed")},
+        "shard_failures": [
+            {
+                "index": failure.get("index"),
+                "shard": failure.get("shard"),
+                "reason": failure.get("reason", {}).get("reason") if isinstance(failure.get("reason"), dict)
+                else failure.get("reason")
+            }
+            for failure in shards.get("failures", [])[:10]
+        ]
+    }
+
+
+def parse_time_range(time_range: str) -> timedelta:
+    """Parse a relative time range such as '15m', '24h', '7d' or '2w'
+
+    Raises:
+        ValueError: If the range is not a positive number followed by m, h, d or w
+    """
+    match = re.fullmatch(r"(\d+)([mhdw])", time_range.strip()) if isinstance(time_range, str) else None
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid time range: {time_range} (use e.g. '15m', '24h', '7d', '2w')")
+    return timedelta(**{TIME_RANGE_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def auto_interval(span: timedelta, max_buckets: int = 100) -> str:
+    """Pick the smallest histogram interval giving at most max_buckets buckets"""
+    seconds = span.total_seconds()
+    for interval, length in HISTOGRAM_INTERVALS:
+        if seconds / length <= max_buckets:
+            return interval
+    return HISTOGRAM_INTERVALS[-1][0]
+
+
+def match_index_pattern(pattern: str, names: List[str]) -> List[str]:
+    """Expand a comma-separated index pattern (wildcards, -exclusions) over names"""
+    matched = []
+    for part in pattern.split(","):
+        part = part.strip()
+        if part.startswith("-"):
+            matched = [name for name in matched if not fnmatch.fnmatchcase(name, part[1:])]
+            continue
+        for name in names:
+            # Wildcards skip hidden and system indices, as in Elasticsearch
+            if name.startswith(".") and not part.startswith("."):
+                continue
+            if fnmatch.fnmatchcase(name, part) and name not in matched:
+                matched.append(name)
+    return matched
+
+
+class LogTemplateMiner:
+    """Streaming Drain-style log template miner
+
+    Messages are tokenized, variable-looking tokens are masked to typed
+    placeholders (<UUID>, <IP>, <HEX>, <NUM>), and each message is routed
+    through a fixed-depth prefix tree (token count, then the leading
+    tokens) to a small list of clusters. A message joins the most similar
+    cluster if enough tokens match, placeholders included, turning
+    differing positions into <*>; otherwise it starts a new cluster.
+    """
+
+    WILDCARD = "<*>"
+    MASKS = [
+        ("<UUID>", re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")),
+        ("<IP>", re.compile(r"^\d{1,3}(\.\d{1,3}){3}(:\d+)?$")),
+        ("<NUM>", re.compile(r"^[-+]?\d+([.,:]\d+)*[a-zA-Z%]{0,3}$")),
+        ("<HEX>", re.compile(r"^(0x)?[0-9a-fA-F]{8,}$"))
+    ]
+
+    def __init__(self, depth: int = 4, similarity: float = 0.5, max_children: int = 100,
+                 max_examples: int = 3):
+        self.depth = max(depth, 3)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_examples = max_examples
+        self.root = {}
+        self.clusters = []
+
+    def tokenize(self, message: str) -> List[str]:
+        """Split a message into tokens with variable-looking tokens masked"""
+        tokens = []
+        for token in message.split():
+            stripped = token.strip(",;()[]{}'\"")
+            token = next((placeholder for placeholder, mask in self.MASKS if mask.match(stripped)), token)
+            tokens.append(token)
+        return tokens
+
+    def add(self, message: str, doc_id: Optional[str] = None, timestamp: Optional[str] = None):
+        """Assign one message to a template cluster"""
+        tokens = self.tokenize(message)
+        if not tokens:
+            return
+
+        # Descend: token count, then up to depth - 2 leading tokens
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            key = self.WILDCARD if any(ch.isdigit() for ch in token) else token
+            if key not in node and len(node) >= self.max_children:
+                key = self.WILDCARD
+            node = node.setdefault(key, {})
+        leaf = node.setdefault(None, [])
+
+        best, best_score = None, -1.0
+        for cluster in leaf:
+            # Masked positions count as matches, or mostly-numeric messages never cluster
+            same = sum(1 for a, b in zip(cluster["tokens"], tokens) if a == b)
+            score = same / len(tokens)
+            if score > best_score:
+                best, best_score = cluster, score
+
+        if best is None or best_score < self.similarity:
+            best = {"tokens": tokens, "count": 0, "examples": [], "first_seen": timestamp,
+                    "last_seen": timestamp}
+            leaf.append(best)
+            self.clusters.append(best)
+        else:
+            best["tokens"] = [a if a == b else self.WILDCARD for a, b in zip(best["tokens"], tokens)]
+
+        best["count"] += 1
+        if doc_id and len(best["examples"]) < self.max_examples:
+            best["examples"].append(doc_id)
+        if timestamp:
+            if not best["first_seen"] or timestamp < best["first_seen"]:
+                best["first_seen"] = timestamp
+            if not best["last_seen"] or timestamp > best["last_seen"]:
+                best["last_seen"] = timestamp
+
+    def top(self, limit: int = 20) -> List[dict]:
+        """Return the most frequent templates"""
+        ranked = sorted(self.clusters, key=lambda cluster: cluster["count"], reverse=True)
+        return [
+            {
+                "template": " ".join(cluster["tokens"]),
+                "count": cluster["count"],
+                "example_ids": cluster["examples"],
+                "first_seen": cluster["first_seen"],
+                "last_seen": cluster["last_seen"]
+            }
+            for cluster in ranked[:limit]
+        ]
+
+
+def flatten_source(value: Any, prefix: str = "") -> dict:
+    """Flatten a nested document source into dotted keys for tabular output"""
+    flat = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flat.update(flatten_source(item, f"{prefix}{key}."))
+    elif isinstance(value, list) and any(isinstance(item, (dict, list)) for item in value):
+        flat[prefix[:-1]] = json.dumps(value)
+    elif isinstance(value, list):
+        flat[prefix[:-1]] = ",".join(str(item) for item in value)
+    else:
+        flat[prefix[:-1]] = value
+    return flat
+
+
+def csv_columns(keys: set, fields: Optional[List[str]] = None) -> List[str]:
+    """Order CSV columns: _index, _id, then keys in the order of the requested field patterns
+
+    A pattern covers keys it matches as a wildcard and, for object fields,
+    the dotted keys below it. Keys no pattern covers follow, sorted.
+    """
+    remaining = sorted(keys - {"_index", "_id"})
+    columns = ["_index", "_id"]
+    for pattern in fields or []:
+        matched = [key for key in remaining
+                   if fnmatch.fnmatchcase(key, pattern) or key.startswith(f"{pattern}.")]
+        columns.extend(matched)
+        remaining = [key for key in remaining if key not in matched]
+    return columns + remaining
+
+
+def truncate_source(value: Any, max_length: int) -> Any:
+    """Recursively shorten long string values of a document source
+
+    Args:
+        value: Source document or part of it
+        max_length: Maximum string length to keep
+
+    Returns:
+        Copy of the value with long strings truncated
+    """
+    if isinstance(value, str) and len(value) > max_length:
+        return f"{value[:max_length]}...[+{len(value) - max_length} chars]"
+    if isinstance(value, dict):
+        return {key: truncate_source(item, max_length) for key, item in value.items()}
+    if isinstance(value, list):
+        return [truncate_source(item, max_length) for item in value]
+    return value
+
 
 class ELKMCPServer(BaseMCPServer):
     """MCP Server for ELK Stack (Elasticsearch)"""
@@ -41,9 +958,49 @@ class ELKMCPServer(BaseMCPServer):
         self.es_url = None
         self.username = None
         self.password = None
+        self.http_options = dict(DEFAULT_HTTP_OPTIONS)
+        self.default_source_fields = list(DEFAULT_SOURCE_FIELDS)
+        self.cache_options = dict(DEFAULT_CACHE_OPTIONS)
+        self.profile_options = dict(DEFAULT_PROFILE_OPTIONS)
+        self.executor_options = dict(DEFAULT_EXECUTOR_OPTIONS)
+        self.budget_options = dict(DEFAULT_BUDGET_OPTIONS)
+        self.catalog_options = dict(DEFAULT_CATALOG_OPTIONS)
+        self.stats_fields = dict(DEFAULT_STATS_FIELDS)
+        self.session = None
+
+        # Per-cluster index catalogs, keyed by cluster URL
+        self.index_catalogs = {}
+        self.index_listings = {}
+        self.field_catalogs = OrderedDict()
+        self.catalog_lock = threading.Lock()
+        self.cluster_versions = {}
+        self.tails = OrderedDict()
+        self.async_searches = OrderedDict()
+        self.volume_series = OrderedDict()
+
+        # Additional named clusters; requests go to the one bound to the current thread
+        self.clusters = {}
+        self.cluster_sessions = {}
+        self.local = threading.local()
 
         # Load configuration
         self.load_configuration()
+        self.session = self.create_session()
+        self.cluster_sessions = {name: self.create_session(cluster) for name, cluster in self.clusters.items()}
+        self.query_cache = QueryCache(self.cache_options["max_entries"])
+        self.call_history = deque(maxlen=self.profile_options["history_size"])
+
+        # Tool calls run on a worker pool; each gets an id sent as X-Opaque-Id
+        self.executor = ThreadPoolExecutor(max_workers=self.executor_options["max_workers"],
+                                           thread_name_prefix="elk-tool")
+        self.call_ids = count(1)
+        self.tool_handlers = {}
+        self.tool_specs = {}
+        self.active_calls = {}
+        self.cancelled_calls = set()
+
+        # Guards call bookkeeping, tails, async searches and volume series shared by pool threads
+        self.state_lock = threading.Lock()
 
         # Setup tools
         self.setup_tools()
@@ -55,6 +1012,15 @@ class ELKMCPServer(BaseMCPServer):
                 config = json.load(f)
                 self.es_url = config.get("elasticsearch_url", "http://localhost:9200")
                 self.username = config.get("username", "elastic")
+                self.http_options.update(config.get("http", {}))
+                self.default_source_fields = config.get("default_source_fields", self.default_source_fields)
+                self.cache_options.update(config.get("cache", {}))
+                self.profile_options.update(config.get("profiling", {}))
+                self.executor_options.update(config.get("executor", {}))
+                self.budget_options.update(config.get("search_budgets", {}))
+                self.catalog_options.update(config.get("index_catalog", {}))
+                self.stats_fields.update(config.get("stats_fields", {}))
+                self.clusters = config.get("clusters", {})
                 self.password=REDACTED_PASSWORDpassword", "")
         else:
             # Default configuration
@@ -69,9 +1035,277 @@ class ELKMCPServer(BaseMCPServer):
             json.dump({
                 "elasticsearch_url": self.es_url,
                 "username": self.username,
-                "password": self.password
+                "password": self.password,
+                "http": self.http_options,
+                "default_source_fields": self.default_source_fields,
+                "cache": self.cache_options,
+                "profiling": self.profile_options,
+                "executor": self.executor_options,
+                "search_budgets": self.budget_options,
+                "index_catalog": self.catalog_options,
+                "stats_fields": self.stats_fields,
+                "clusters": self.clusters
             }, f, indent=2)
 
+    def create_session(self, cluster: Optional[dict] = None) -> requests.Session:
+        """Create a pooled keep-alive HTTP session for Elasticsearch
+
+        Connections are reused across calls, responses are requested gzip
+        compressed, and 429/503 responses are retried with exponential backoff.
+
+        Args:
+            cluster: Named cluster entry supplying credentials (default connection if None)
+
+        Returns:
+            Configured requests session
+        """
+        options = self.http_options
+        retry = Retry(
+            total=options["max_retries"],
+            backoff_factor=options["backoff_factor"],
+            status_forcelist=options["retry_statuses"],
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=options["pool_connections"],
+            pool_maxsize=options["pool_maxsize"],
+            max_retries=retry
+        )
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        username = cluster.get("username") if cluster is not None else self.username
+        password = cluster.get("password", "") if cluster is not None else self.password
+        session.auth = HTTPBasicAuth(username, password) if username else None
+        session.headers.update({
+            "Accept-Encoding": "gzip",
+            "Connection": "keep-alive"
+        })
+        return session
+
+    @contextmanager
+    def use_cluster(self, name: Optional[str]):
+        """Route es_request calls made by this thread to a named cluster"""
+        previous = getattr(self.local, "cluster", None)
+        self.local.cluster = name
+        try:
+            yield
+        finally:
+            self.local.cluster = previous
+
+    def active_connection(self) -> dict:
+        """Return url, session and timeout of the cluster bound to this thread"""
+        name = getattr(self.local, "cluster", None) or DEFAULT_CLUSTER
+        if name == DEFAULT_CLUSTER and DEFAULT_CLUSTER not in self.clusters:
+            return {"name": name, "url": self.es_url, "session": self.session,
+                    "timeout": self.http_options["timeout"]}
+
+        cluster = self.clusters.get(name, {})
+        return {
+            "name": name,
+            "url": cluster.get("elasticsearch_url"),
+            "session": self.cluster_sessions.get(name, self.session),
+            "timeout": cluster.get("timeout", self.http_options["timeout"])
+        }
+
+    def cluster_names(self) -> List[str]:
+        """Return the default connection followed by all named clusters"""
+        names = [DEFAULT_CLUSTER] if self.es_url and DEFAULT_CLUSTER not in self.clusters else []
+        return names + list(self.clusters)
+
+    def fan_out(self, handler, args: dict) -> dict:
+        """Run a tool handler against several clusters concurrently
+
+        Each cluster gets its own deadline (its configured timeout unless the
+        call passes one); clusters that miss it or fail are reported in
+        "failed" and the rest are returned as partial results.
+
+        Args:
+            handler: Tool handler to run once per cluster
+            args: Tool arguments; clusters selects the targets (default: all)
+
+        Returns:
+            Dict with per-cluster "results" and "failed" reasons
+        """
+        names = args.get("clusters") or self.cluster_names()
+        unknown = [name for name in names if name not in self.cluster_names()]
+        if unknown:
+            raise ValueError(f"Unknown clusters: {', '.join(unknown)}")
+
+        call_id = getattr(self.local, "call_id", None)
+        tool = getattr(self.local, "tool", None)
+
+        def run(name: str) -> dict:
+            self.local.call_id = call_id
+            self.local.tool = tool
+            with self.use_cluster(name):
+                return handler(args)
+
+        results = {}
+        failed = {}
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=max(len(names), 1), thread_name_prefix="elk-fanout")
+        try:
+            futures = {name: executor.submit(run, name) for name in names}
+            for name, future in futures.items():
+                with self.use_cluster(name):
+                    deadline = args.get("timeout") or self.active_connection()["timeout"]
+                try:
+                    result = future.result(timeout=max(deadline - (time.monotonic() - started), 0))
+                except FutureTimeoutError:
+                    failed[name] = f"Timed out after {deadline}s"
+                    continue
+                except Exception as e:
+                    failed[name] = f"Unexpected error: {str(e)}"
+                    continue
+                if result.get("status") == "error":
+                    failed[name] = result.get("message")
+                else:
+                    results[name] = result
+        finally:
+            executor.shutdown(wait=False)
+
+        return {"results": results, "failed": failed}
+
+    def register_tool(self, name: str, description: str, handler, schema: dict):
+        """Register a tool whose handler runs on the worker pool under a timeout"""
+        def offloaded(args: dict) -> dict:
+            return self.run_tool(name, handler, args)
+
+        self.tool_handlers[name] = handler
+        self.tool_specs[name] = (description, schema)
+        super().register_tool(name=name, description=description, handler=offloaded, schema=schema)
+
+    def tool_timeout(self, name: str) -> float:
+        """Return the per-call timeout of a tool in seconds"""
+        return self.executor_options["tool_timeouts"].get(name, self.executor_options["default_timeout"])
+
+    def start_call(self, name: str, handler, args: dict) -> tuple:
+        """Submit a handler to the worker pool under a fresh call id"""
+        call_id = f"elk-mcp-{next(self.call_ids)}"
+        with self.state_lock:
+            self.active_calls[call_id] = set()
+
+        def run() -> dict:
+            self.local.call_id = call_id
+            self.local.tool = name
+            try:
+                return handler(args)
+            finally:
+                self.local.call_id = self.local.tool = None
+
+        return call_id, self.executor.submit(run)
+
+    def finish_call(self, call_id: str):
+        """Forget a call's bookkeeping once its worker is done"""
+        with self.state_lock:
+            self.active_calls.pop(call_id, None)
+            self.cancelled_calls.discard(call_id)
+
+    def run_tool(self, name: str, handler, args: dict) -> dict:
+        """Run a tool handler on the worker pool, cancelling it after its timeout
+
+        A call that times out is marked cancelled (its further es_request
+        calls fail fast) and its running Elasticsearch tasks are cancelled.
+        """
+        call_id, future = self.start_call(name, handler, args)
+        future.add_done_callback(lambda _: self.finish_call(call_id))
+        timeout = self.tool_timeout(name)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            cancelled = self.cancel_call(call_id)
+            return self.format_error(
+                f"{name} timed out after {timeout}s; cancelled {cancelled} Elasticsearch tasks"
+            )
+        except Exception as e:
+            return self.format_error(f"Unexpected error: {str(e)}")
+
+    async def run_tool_async(self, name: str, args: dict) -> dict:
+        """Await a tool on the worker pool without blocking the event loop
+
+        For asyncio transports: the same timeout applies, and cancelling the
+        awaiting task (e.g. the client cancelled the request) also cancels
+        the call's Elasticsearch tasks.
+        """
+        call_id, future = self.start_call(name, self.tool_handlers[name], args)
+        future.add_done_callback(lambda _: self.finish_call(call_id))
+        timeout = self.tool_timeout(name)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            cancelled = await asyncio.get_running_loop().run_in_executor(None, self.cancel_call, call_id)
+            return self.format_error(
+                f"{name} timed out after {timeout}s; cancelled {cancelled} Elasticsearch tasks"
+            )
+        except asyncio.CancelledError:
+            await asyncio.get_running_loop().run_in_executor(None, self.cancel_call, call_id)
+            raise
+        except Exception as e:
+            return self.format_error(f"Unexpected error: {str(e)}")
+
+    def run(self):
+        """Serve the tools over MCP stdio, dispatching every call through run_tool_async
+
+        Calls are awaited on the worker pool, so a slow aggregation holds one
+        worker while other calls proceed, and a request the client cancels
+        also cancels its Elasticsearch tasks.
+        """
+        app = Server("elk")
+
+        @app.list_tools()
+        async def list_tools() -> list[Tool]:
+            return [
+                Tool(name=name, description=description, inputSchema=schema)
+                for name, (description, schema) in self.tool_specs.items()
+            ]
+
+        @app.call_tool()
+        async def call_tool(name: str, arguments: Any) -> list[TextContent]:
+            if name in self.tool_handlers:
+                result = await self.run_tool_async(name, arguments or {})
+            else:
+                result = self.format_error(f"Unknown tool: {name}")
+            return [TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+
+        async def serve():
+            async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+                await app.run(read_stream, write_stream, app.create_initialization_options())
+
+        asyncio.run(serve())
+
+    def cancel_call(self, call_id: str) -> int:
+        """Stop a tool call and cancel its Elasticsearch tasks
+
+        Tasks are found through the X-Opaque-Id header es_request sends with
+        the call id, on every cluster the call has used.
+
+        Returns:
+            Number of Elasticsearch tasks cancelled
+        """
+        with self.state_lock:
+            # A call that already finished has nothing left to cancel
+            if call_id not in self.active_calls:
+                return 0
+            self.cancelled_calls.add(call_id)
+            clusters = list(self.active_calls[call_id])
+        if not self.executor_options["cancel_es_tasks"]:
+            return 0
+
+        cancelled = 0
+        for cluster in clusters:
+            with self.use_cluster(cluster):
+                result = self.es_request("GET", "/_tasks?actions=*search*,*mget*&detailed=false")
+                for node_id, node in result.get("nodes", {}).items():
+                    for task_id, task in node.get("tasks", {}).items():
+                        if task.get("headers", {}).get("X-Opaque-Id") == call_id and task.get("cancellable"):
+                            response = self.es_request("POST", f"/_tasks/{task_id}/_cancel")
+                            cancelled += 0 if response.get("status") == "error" else 1
+        return cancelled
+
     def setup_tools(self):
         """Register ELK tools"""
 
@@ -93,6 +1327,14 @@ class ELKMCPServer(BaseMCPServer):
                     "password": {
                         "type": "string",
                         "description": "Elasticsearch password"
+                    },
+                    "cluster": {
+                        "type": "string",
+                        "description": "Add or update a named cluster instead of the default connection"
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "Request timeout in seconds for the named cluster"
                     }
                 },
                 required=["elasticsearch_url", "username", "password"]
@@ -114,6 +1356,77 @@ class ELKMCPServer(BaseMCPServer):
             schema=create_json_schema(properties={}, required=[])
         )
 
+        self.register_tool(
+            name="get_cache_stats",
+            description="Get query result cache size and hit-rate statistics",
+            handler=self.get_cache_stats,
+            schema=create_json_schema(
+                properties={
+                    "clear": {
+                        "type": "boolean",
+                        "description": "Clear the cache after reporting",
+                        "default": False
+                    }
+                },
+                required=[]
+            )
+        )
+
+        self.register_tool(
+            name="get_query_profile",
+            description="Show recent slow Elasticsearch calls (wall time, took, shards, bytes, cache) and optionally profile a search",
+            handler=self.get_query_profile,
+            schema=create_json_schema(
+                properties={
+                    "min_ms": {
+                        "type": "number",
+                        "description": "Only list calls at least this slow (default: profiling slow_ms)"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum calls to list, slowest first",
+                        "default": 20
+                    },
+                    "include_cached": {
+                        "type": "boolean",
+                        "description": "Also list result cache hits",
+                        "default": False
+                    },
+                    "profile": {
+                        "type": "boolean",
+                        "description": "Run a search with the profile API and summarize per-shard timings",
+                        "default": False
+                    },
+                    "index": {
+                        "type": "string",
+                        "description": "Index to profile"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Query string to profile"
+                    },
+                    "from_time": {
+                        "type": "string",
+                        "description": "Start time of the profiled search"
+                    },
+                    "to_time": {
+                        "type": "string",
+                        "description": "End time of the profiled search"
+                    },
+                    "body": {
+                        "type": "object",
+                        "description": "Full search body to profile instead of query/from_time/to_time"
+                    },
+                    "clear": {
+                        "type": "boolean",
+                        "description": "Clear the call history after reporting",
+                        "default": False
+                    }
+                },
+                required=[]
+            )
+        )
+
         # Index operations
         self.register_tool(
             name="list_indices",
@@ -124,6 +1437,11 @@ class ELKMCPServer(BaseMCPServer):
                     "pattern": {
                         "type": "string",
                         "description": "Index pattern (e.g., 'logs-*')"
+                    },
+                    "refresh": {
+                        "type": "boolean",
+                        "description": "Bypass the cached listing",
+                        "default": False
                     }
                 },
                 required=[]
@@ -139,25 +1457,75 @@ class ELKMCPServer(BaseMCPServer):
                     "index": {
                         "type": "string",
                         "description": "Index name"
+                    },
+                    "refresh": {
+                        "type": "boolean",
+                        "description": "Rebuild the cached index catalog first, to attach its stats",
+                        "default": False
                     }
                 },
                 required=["index"]
             )
         )
 
-        # Search operations
         self.register_tool(
-            name="search_logs",
-            description="Search logs in Elasticsearch",
-            handler=self.search_logs,
+            name="get_field_catalog",
+            description=(
+                "List the fields of an index pattern with type, keyword subfield and whether they "
+                "can be aggregated, optionally with approximate cardinality; cached per pattern"
+            ),
+            handler=self.get_field_catalog,
             schema=create_json_schema(
                 properties={
                     "index": {
                         "type": "string",
                         "description": "Index name or pattern (e.g., 'logs-*')"
                     },
-                    "query": {
-                        "type": "string",
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Field name patterns to include (e.g., ['service.*', 'host.name'])"
+                    },
+                    "aggregatable_only": {
+                        "type": "boolean",
+                        "description": "Only list fields that can be aggregated directly or through a keyword subfield",
+                        "default": False
+                    },
+                    "include_cardinality": {
+                        "type": "boolean",
+                        "description": (
+                            f"Estimate distinct values of aggregatable fields from a sample "
+                            f"(at most {CARDINALITY_MAX_FIELDS} fields not yet estimated)"
+                        ),
+                        "default": False
+                    },
+                    "sample_size": {
+                        "type": "integer",
+                        "description": "Documents to sample for cardinality (default: 10000)"
+                    },
+                    "refresh": {
+                        "type": "boolean",
+                        "description": "Rebuild the cached field catalog first",
+                        "default": False
+                    }
+                },
+                required=["index"]
+            )
+        )
+
+        # Search operations
+        self.register_tool(
+            name="search_logs",
+            description="Search logs in Elasticsearch",
+            handler=self.search_logs,
+            schema=create_json_schema(
+                properties={
+                    "index": {
+                        "type": "string",
+                        "description": "Index name or pattern (e.g., 'logs-*')"
+                    },
+                    "query": {
+                        "type": "string",
                         "description": "Search query string"
                     },
                     "from_time": {
@@ -177,6 +1545,129 @@ class ELKMCPServer(BaseMCPServer):
                         "type": "string",
                         "description": "Field to sort by",
                         "default": "@timestamp"
+                    },
+                    "paginate": {
+                        "type": "boolean",
+                        "description": "Page with point-in-time and search_after and return a next_cursor",
+                        "default": False
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Continuation token from a previous call (repeat the same query)"
+                    },
+                    **PROJECTION_PROPERTIES,
+                    "full_source": {
+                        "type": "boolean",
+                        "description": "Return the whole _source instead of the default lightweight field set",
+                        "default": False
+                    },
+                    **SAMPLING_PROPERTIES,
+                    **BUDGET_PROPERTIES
+                },
+                required=["index"]
+            )
+        )
+
+        self.register_tool(
+            name="tail_logs",
+            description="Follow logs: each call with the returned cursor yields only entries newer than the last call",
+            handler=self.tail_logs,
+            schema=create_json_schema(
+                properties={
+                    "index": {
+                        "type": "string",
+                        "description": "Index name or pattern (e.g., 'logs-*')"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Search query string"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Cursor from the previous call (omit to start a new tail)"
+                    },
+                    "from_time": {
+                        "type": "string",
+                        "description": "Start a new tail here instead of at the newest entries (e.g., 'now-5m')"
+                    },
+                    "size": {
+                        "type": "integer",
+                        "description": "Maximum entries per call",
+                        "default": 100
+                    },
+                    "wait_seconds": {
+                        "type": "number",
+                        "description": f"Long-poll up to this long for new entries (max {TAIL_MAX_WAIT})",
+                        "default": 0
+                    },
+                    "lag_seconds": {
+                        "type": "number",
+                        "description": "Re-check this many seconds before the cursor for late-indexed entries",
+                        "default": 2
+                    },
+                    "tiebreaker_field": {
+                        "type": "string",
+                        "description": "Secondary sort field ordering entries with equal timestamps (e.g., 'log.offset')"
+                    },
+                    **PROJECTION_PROPERTIES,
+                    "time_budget": BUDGET_PROPERTIES["time_budget"]
+                },
+                required=["index"]
+            )
+        )
+
+        self.register_tool(
+            name="export_logs",
+            description="Stream all logs matching a query to a local NDJSON or CSV file",
+            handler=self.export_logs,
+            schema=create_json_schema(
+                properties={
+                    "index": {
+                        "type": "string",
+                        "description": "Index name or pattern (e.g., 'logs-*')"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Search query string"
+                    },
+                    "from_time": {
+                        "type": "string",
+                        "description": "Start time (e.g., '2024-01-01T00:00:00')"
+                    },
+                    "to_time": {
+                        "type": "string",
+                        "description": "End time (e.g., '2024-01-02T00:00:00')"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["ndjson", "csv"],
+                        "description": "Output format",
+                        "default": "ndjson"
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "Output file (default: ~/.elk-mcp/exports/<index>-<time>.<format>)"
+                    },
+                    "compress": {
+                        "type": "boolean",
+                        "description": "Gzip the output file",
+                        "default": False
+                    },
+                    "fields": PROJECTION_PROPERTIES["fields"],
+                    "exclude_fields": PROJECTION_PROPERTIES["exclude_fields"],
+                    "sort_field": {
+                        "type": "string",
+                        "description": "Field to sort by (ascending)",
+                        "default": "@timestamp"
+                    },
+                    "page_size": {
+                        "type": "integer",
+                        "description": "Hits fetched per request",
+                        "default": 1000
+                    },
+                    "max_hits": {
+                        "type": "integer",
+                        "description": "Stop after this many hits"
                     }
                 },
                 required=["index"]
@@ -199,19 +1690,195 @@ class ELKMCPServer(BaseMCPServer):
                     },
                     "agg_type": {
                         "type": "string",
-                        "description": "Aggregation type (terms, date_histogram, avg, sum, etc.)",
+                        "description": "Aggregation type (terms, date_histogram, avg, sum, cardinality, percentiles, etc.)",
                         "default": "terms"
                     },
                     "size": {
                         "type": "integer",
                         "description": "Number of buckets",
                         "default": 10
+                    },
+                    "interval": {
+                        "type": "string",
+                        "description": "Bucket interval for date_histogram (e.g., '5m', '1h', '1d')",
+                        "default": "1h"
+                    },
+                    "aggs": {
+                        "type": "object",
+                        "description": (
+                            "Named aggregation specs used instead of field/agg_type. Each node holds one "
+                            "aggregation type and optional nested 'aggs', e.g. {\"by_service\": {\"terms\": "
+                            "\"service.keyword\", \"aggs\": {\"p95\": {\"percentiles\": {\"field\": "
+                            "\"duration\", \"percents\": [95]}}}}}"
+                        )
+                    },
+                    "after_key": {
+                        "type": "object",
+                        "description": "after_key from a previous composite aggregation page"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Optional query string restricting the aggregated documents"
+                    },
+                    "from_time": {
+                        "type": "string",
+                        "description": "Start time (e.g., '2024-01-01T00:00:00')"
+                    },
+                    "to_time": {
+                        "type": "string",
+                        "description": "End time (e.g., '2024-01-02T00:00:00')"
+                    },
+                    **SAMPLING_PROPERTIES,
+                    **BUDGET_PROPERTIES
+                },
+                required=["index"]
+            )
+        )
+
+        self.register_tool(
+            name="multi_search",
+            description="Run several log searches and aggregations in a single _msearch round trip",
+            handler=self.multi_search,
+            schema=create_json_schema(
+                properties={
+                    "searches": {
+                        "type": "array",
+                        "description": (
+                            "Search specs with the same arguments as search_logs, or as aggregated_search "
+                            "when type is 'aggregation'; each may set a 'key' to label its result"
+                        ),
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "key": {"type": "string"},
+                                "type": {"type": "string", "enum": ["search", "aggregation"]}
+                            }
+                        }
+                    },
+                    "index": {
+                        "type": "string",
+                        "description": "Default index for specs that do not name one"
+                    },
+                    **BUDGET_PROPERTIES
+                },
+                required=["searches"]
+            )
+        )
+
+        # Async search
+        async_id_properties = {
+            "id": {
+                "type": "string",
+                "description": "Async search id returned by submit_async_search"
+            },
+            "wait": {
+                "type": "string",
+                "description": "How long to wait for completion before returning, e.g. '5s' (default: 0)"
+            },
+            "cluster": {
+                "type": "string",
+                "description": "Cluster the search was submitted to, if not submitted by this server"
+            }
+        }
+
+        self.register_tool(
+            name="submit_async_search",
+            description=(
+                "Submit a long-running search or aggregation as an Elasticsearch async search; "
+                "returns an id immediately unless the search finishes within 'wait'"
+            ),
+            handler=self.submit_async_search,
+            schema=create_json_schema(
+                properties={
+                    "index": {
+                        "type": "string",
+                        "description": "Index pattern to search"
+                    },
+                    "type": {
+                        "type": "string",
+                        "enum": ["search", "aggregation"],
+                        "description": (
+                            "Use search_logs arguments ('search') or aggregated_search arguments "
+                            "('aggregation', default)"
+                        )
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Search query"
+                    },
+                    "field": {
+                        "type": "string",
+                        "description": "Field to aggregate on (aggregation)"
+                    },
+                    "agg_type": {
+                        "type": "string",
+                        "description": "Aggregation type (aggregation)"
+                    },
+                    "aggs": {
+                        "type": "object",
+                        "description": "Raw aggregations (aggregation)"
+                    },
+                    "from_time": {
+                        "type": "string",
+                        "description": "Start time"
+                    },
+                    "to_time": {
+                        "type": "string",
+                        "description": "End time"
+                    },
+                    "size": {
+                        "type": "integer",
+                        "description": "Number of hits (search) or buckets (aggregation)"
+                    },
+                    "wait": {
+                        "type": "string",
+                        "description": "How long to wait for completion before returning an id (default: 1s)"
+                    },
+                    "keep_alive": {
+                        "type": "string",
+                        "description": (
+                            f"How long Elasticsearch keeps the search and its results "
+                            f"(default: {DEFAULT_ASYNC_KEEP_ALIVE})"
+                        )
                     }
                 },
-                required=["index", "field"]
+                required=["index"]
+            )
+        )
+
+        self.register_tool(
+            name="poll_async_search",
+            description="Check progress of an async search, including partial hits or aggregations so far",
+            handler=self.poll_async_search,
+            schema=create_json_schema(properties=async_id_properties, required=["id"])
+        )
+
+        self.register_tool(
+            name="fetch_async_search",
+            description=(
+                "Fetch the results of an async search; completed results are deleted from the "
+                "cluster unless keep is set"
+            ),
+            handler=self.fetch_async_search,
+            schema=create_json_schema(
+                properties={
+                    **async_id_properties,
+                    "keep": {
+                        "type": "boolean",
+                        "description": "Keep completed results stored instead of deleting them (default: false)"
+                    }
+                },
+                required=["id"]
             )
         )
 
+        self.register_tool(
+            name="delete_async_search",
+            description="Cancel a running async search or delete its stored results",
+            handler=self.delete_async_search,
+            schema=create_json_schema(properties=async_id_properties, required=["id"])
+        )
+
         # Document operations
         self.register_tool(
             name="get_document",
@@ -226,12 +1893,40 @@ class ELKMCPServer(BaseMCPServer):
                     "doc_id": {
                         "type": "string",
                         "description": "Document ID"
-                    }
+                    },
+                    **PROJECTION_PROPERTIES
                 },
                 required=["index", "doc_id"]
             )
         )
 
+        self.register_tool(
+            name="get_documents",
+            description="Get many documents by index and ID in one request, in input order",
+            handler=self.get_documents,
+            schema=create_json_schema(
+                properties={
+                    "documents": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "index": {"type": "string"},
+                                "id": {"type": "string"}
+                            }
+                        },
+                        "description": f"Documents as {{index, id}} (or search hits with _index/_id), at most {MGET_MAX_DOCS}"
+                    },
+                    "index": {
+                        "type": "string",
+                        "description": "Index for documents that do not name one"
+                    },
+                    **PROJECTION_PROPERTIES
+                },
+                required=["documents"]
+            )
+        )
+
         # Data analysis
         self.register_tool(
             name="analyze_errors",
@@ -243,10 +1938,70 @@ class ELKMCPServer(BaseMCPServer):
                         "type": "string",
                         "description": "Index name or pattern"
                     },
-                    "time_range": {
+                    **LOG_STATS_PROPERTIES,
+                    **BUDGET_PROPERTIES,
+                    "include_templates": {
+                        "type": "boolean",
+                        "description": "Also mine the error messages into templates (see mine_log_templates)",
+                        "default": False
+                    },
+                    "max_messages": {
+                        "type": "integer",
+                        "description": "Newest error messages to mine when include_templates is set",
+                        "default": 10000
+                    }
+                },
+                required=["index"]
+            )
+        )
+
+        self.register_tool(
+            name="mine_log_templates",
+            description="Cluster error (or any) log messages into templates with counts, examples and first/last seen",
+            handler=self.mine_log_templates,
+            schema=create_json_schema(
+                properties={
+                    "index": {
                         "type": "string",
-                        "description": "Time range (e.g., '1h', '24h', '7d')",
-                        "default": "24h"
+                        "description": "Index name or pattern"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Query string selecting the messages",
+                        "default": DEFAULT_ERROR_QUERY
+                    },
+                    "from_time": {
+                        "type": "string",
+                        "description": "Start time (e.g., '2024-01-01T00:00:00' or 'now-1h')"
+                    },
+                    "to_time": {
+                        "type": "string",
+                        "description": "End time (e.g., '2024-01-02T00:00:00' or 'now')"
+                    },
+                    "message_field": {
+                        "type": "string",
+                        "description": "Source field holding the message",
+                        "default": "message"
+                    },
+                    "max_messages": {
+                        "type": "integer",
+                        "description": "Maximum number of newest messages to read",
+                        "default": 10000
+                    },
+                    "similarity": {
+                        "type": "number",
+                        "description": "Fraction of matching tokens needed to join a template",
+                        "default": 0.5
+                    },
+                    "depth": {
+                        "type": "integer",
+                        "description": "Prefix tree depth",
+                        "default": 4
+                    },
+                    "top": {
+                        "type": "integer",
+                        "description": "Number of templates to return",
+                        "default": 20
                     }
                 },
                 required=["index"]
@@ -257,6 +2012,26 @@ class ELKMCPServer(BaseMCPServer):
             name="get_log_stats",
             description="Get statistics for log entries",
             handler=self.get_log_stats,
+            schema=create_json_schema(
+                properties={
+                    "index": {
+                        "type": "string",
+                        "description": "Index name or pattern"
+                    },
+                    **LOG_STATS_PROPERTIES,
+                    **BUDGET_PROPERTIES
+                },
+                required=["index"]
+            )
+        )
+
+        self.register_tool(
+            name="detect_volume_anomalies",
+            description=(
+                "Find log-volume spikes, drops and silent services by comparing per-service "
+                "histograms with rolling baselines; histograms are cached between calls"
+            ),
+            handler=self.detect_volume_anomalies,
             schema=create_json_schema(
                 properties={
                     "index": {
@@ -265,133 +2040,349 @@ class ELKMCPServer(BaseMCPServer):
                     },
                     "time_range": {
                         "type": "string",
-                        "description": "Time range (e.g., '1h', '24h', '7d')",
+                        "description": "Time range to check, including baseline history (e.g., '6h', '24h', '7d')",
                         "default": "24h"
-                    }
+                    },
+                    "interval": {
+                        "type": "string",
+                        "description": "Bucket size (e.g., '5m', '1h'; default: picked from time_range)"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Query string narrowing the logs counted",
+                        "default": "*"
+                    },
+                    "service_field": {
+                        "type": "string",
+                        "description": "Keyword field holding the service name (default from config stats_fields)"
+                    },
+                    "top": {
+                        "type": "integer",
+                        "description": "Busiest services to check",
+                        "default": 20
+                    },
+                    "baseline_window": {
+                        "type": "integer",
+                        "description": "Preceding buckets each bucket is compared with",
+                        "default": 12
+                    },
+                    "threshold": {
+                        "type": "number",
+                        "description": "Deviation score (in standard deviations) to report",
+                        "default": 3.0
+                    },
+                    "min_baseline": {
+                        "type": "number",
+                        "description": "Minimum baseline logs per bucket for reporting drops",
+                        "default": 5
+                    },
+                    "direction": {
+                        "type": "string",
+                        "enum": ["both", "spike", "drop"],
+                        "description": "Report spikes, drops (including silent services) or both",
+                        "default": "both"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum anomalies to return",
+                        "default": 20
+                    },
+                    "include_series": {
+                        "type": "boolean",
+                        "description": "Also return each service's bucket counts",
+                        "default": False
+                    },
+                    "refresh": {
+                        "type": "boolean",
+                        "description": "Ignore cached histograms",
+                        "default": False
+                    },
+                    **BUDGET_PROPERTIES
                 },
                 required=["index"]
             )
         )
 
-    def es_request(self, method: str, endpoint: str, data: Optional[dict] = None) -> dict:
-        """Make Elasticsearch REST API request
-
+        # Cross-cluster fan-out
+        self.register_tool(
+            name="multi_cluster_health",
+            description="Get health of all or selected clusters concurrently",
+            handler=self.multi_cluster_health,
+            schema=create_json_schema(
+                properties=dict(CLUSTER_PROPERTIES),
+                required=[]
+            )
+        )
+
+        self.register_tool(
+            name="multi_cluster_search_logs",
+            description="Search logs on all or selected clusters concurrently, merged newest first and tagged with their cluster",
+            handler=self.multi_cluster_search_logs,
+            schema=create_json_schema(
+                properties={
+                    **CLUSTER_PROPERTIES,
+                    "index": {
+                        "type": "string",
+                        "description": "Index name or pattern (e.g., 'logs-*')"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Search query string"
+                    },
+                    "from_time": {
+                        "type": "string",
+                        "description": "Start time (e.g., '2024-01-01T00:00:00')"
+                    },
+                    "to_time": {
+                        "type": "string",
+                        "description": "End time (e.g., '2024-01-02T00:00:00')"
+                    },
+                    "size": {
+                        "type": "integer",
+                        "description": "Number of merged results to return",
+                        "default": 10
+                    },
+                    "sort_field": {
+                        "type": "string",
+                        "description": "Field to sort and merge by",
+                        "default": "@timestamp"
+                    },
+                    **PROJECTION_PROPERTIES
+                },
+                required=["index"]
+            )
+        )
+
+        self.register_tool(
+            name="multi_cluster_log_stats",
+            description="Get log statistics from all or selected clusters concurrently",
+            handler=self.multi_cluster_log_stats,
+            schema=create_json_schema(
+                properties={
+                    **CLUSTER_PROPERTIES,
+                    "index": {
+                        "type": "string",
+                        "description": "Index name or pattern"
+                    },
+                    **LOG_STATS_PROPERTIES,
+                    **BUDGET_PROPERTIES
+                },
+                required=["index"]
+            )
+        )
+
+    def es_request(self, method: str, endpoint: str, data: Optional[Any] = None,
+                   timeout: Optional[float] = None) -> dict:
+        """Make Elasticsearch REST API request
+
         Args:
             method: HTTP method (GET, POST, PUT, DELETE)
             endpoint: API endpoint
-            data: Request body (for POST/PUT)
+            data: Request body (for POST/PUT); a list is sent as NDJSON lines
+            timeout: HTTP timeout in seconds (default: the cluster's timeout)
 
         Returns:
             Response dict
         """
-        if not self.es_url:
-            return self.format_error("Elasticsearch URL not configured")
+        connection = self.active_connection()
+        if not connection["url"]:
+            return self.format_error(f"Elasticsearch URL not configured for cluster {connection['name']}")
 
-        url = f"{self.es_url.rstrip('/')}/{endpoint.lstrip('/')}"
-        auth = HTTPBasicAuth(self.username, self.password) if self.username else None
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            return self.format_error(f"Unsupported HTTP method: {method}")
 
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, auth=auth, timeout=30)
-            elif method.upper() == "POST":
-                response = requests.post(url, json=data, auth=auth, timeout=30)
-            elif method.upper() == "PUT":
-                response = requests.put(url, json=data, auth=auth, timeout=30)
-            elif method.upper() == "DELETE":
-                response = requests.delete(url, auth=auth, timeout=30)
-            else:
-                return self.format_error(f"Unsupported HTTP method: {method}")
+        url = f"{connection['url'].rstrip('/')}/{endpoint.lstrip('/')}"
 
+        body = None
+        headers = {}
+        call_id = getattr(self.local, "call_id", None)
+        if call_id:
+            with self.state_lock:
+                if call_id in self.cancelled_calls:
+                    return self.format_error("Cancelled: the tool call timed out")
+                self.active_calls.get(call_id, set()).add(connection["name"])
+            headers["X-Opaque-Id"] = call_id
+        if isinstance(data, list):
+            body = "".join(json.dumps(line) + "\n" for line in data).encode("utf-8")
+            headers["Content-Type"] = "application/x-ndjson"
+        elif data is not None:
+            body = json.dumps(data).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        if body is not None:
+            if self.http_options["compress_requests"] and len(body) >= self.http_options["compression_min_bytes"]:
+                body = gzip.compress(body)
+                headers["Content-Encoding"] = "gzip"
+
+        record = {
+            "cluster": connection["name"],
+            "method": method,
+            "endpoint": endpoint,
+            "query": data,
+            "request_bytes": len(body) if body is not None else 0
+        }
+        started = time.monotonic()
+        try:
+            response = connection["session"].request(
+                method, url, data=body, headers=headers,
+                timeout=timeout or connection["timeout"]
+            )
+            record["status"] = response.status_code
+            record["response_bytes"] = len(response.content)
+            record["wire_bytes"] = int(response.headers.get("Content-Length") or record["response_bytes"])
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            self.record_call(record, started, result)
+            return result
 
         except requests.exceptions.RequestException as e:
+            self.record_call(record, started, error=str(e))
             return self.format_error(f"Request failed: {str(e)}")
         except Exception as e:
+            self.record_call(record, started, error=str(e))
             return self.format_error(f"Unexpected error: {str(e)}")
 
-    def configure_elk(self, args: dict) -> dict:
-        """Configure Elasticsearch connection"""
-        self.es_url = args.get("elasticsearch_url")
-        self.username = args.get("username")
-        self.password=REDACTED_PASSWORDpassword")
-        self.save_configuration()
+    def record_call(self, record: dict, started: Optional[float], result: Any = None,
+                    error: Optional[str] = None):
+        """Add one Elasticsearch call (or cache hit) to the profiling ring buffer
 
-        # Test connection
-        result = self.es_request("GET", "/")
-        if "status" in result and result["status"] == "error":
-            return result
+        The record is also left on the calling thread so cached_search can
+        mark it as a cache miss.
 
-        return self.format_success(
-            "Successfully configured Elasticsearch connection",
-            {"config_saved": str(self.config_file)}
-        )
+        Args:
+            record: Call details (cluster, method, endpoint, query, byte counts)
+            started: time.monotonic() at the start of the call, None for cache hits
+            result: Parsed response, for took and shard counts
+            error: Failure description
+        """
+        options = self.profile_options
+        if not options["enabled"]:
+            return
 
-    def get_cluster_health(self, args: dict) -> dict:
-        """Get cluster health"""
-        result = self.es_request("GET", "/_cluster/health")
+        record.update({
+            "time": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "wall_ms": round((time.monotonic() - started) * 1000, 2) if started is not None else 0.0,
+            "took_ms": result.get("took") if isinstance(result, dict) else None,
+            "shards": result.get("_shards") if isinstance(result, dict) else None,
+            "cache": record.get("cache"),
+            "error": error
+        })
+        if record["query"] is not None:
+            preview = json.dumps(record["query"], separators=(",", ":"))
+            limit = options["query_preview_chars"]
+            record["query"] = preview if len(preview) <= limit else preview[:limit] + "..."
 
-        if "status" in result and result["status"] != "error":
-            return self.format_success(
-                f"Cluster status: {result.get('status', 'unknown')}",
-                {"health": result}
+        self.call_history.append(record)
+        self.local.last_call = record
+        if options["log_slow"] and record["wall_ms"] >= options["slow_ms"]:
+            logger.warning(
+                f"Slow Elasticsearch call: {record['method']} {record['endpoint']} "
+                f"{record['wall_ms']}ms (took {record['took_ms']}ms) on {record['cluster']}"
             )
 
-        return result
+    def search_budget(self, args: Optional[dict] = None) -> dict:
+        """Resolve the time budget and partial-result settings of a search
 
-    def get_cluster_stats(self, args: dict) -> dict:
-        """Get cluster statistics"""
-        result = self.es_request("GET", "/_cluster/stats")
+        The budget comes from the time_budget argument, else the calling
+        tool's entry in budget_options["tools"], else the default.
 
-        if "status" not in result or result["status"] != "error":
-            return self.format_success("Retrieved cluster statistics", {"stats": result})
+        Raises:
+            ValueError: If time_budget is invalid
+        """
+        args = args or {}
+        options = self.budget_options
+        tool = getattr(self.local, "tool", None)
+        seconds = parse_duration(args.get("time_budget") or options["tools"].get(tool, options["default"]))
+        return {
+            "seconds": seconds,
+            "allow_partial": args.get("allow_partial_results", options["allow_partial_results"]),
+            "terminate_after": args.get("terminate_after"),
+            "http_timeout": max(seconds + options["http_margin_seconds"], self.active_connection()["timeout"])
+        }
 
-        return result
+    def budgeted_search(self, index: str, body: dict, args: Optional[dict] = None) -> dict:
+        """Run a _search within its time budget (see search_budget)
 
-    def list_indices(self, args: dict) -> dict:
-        """List indices"""
-        pattern = args.get("pattern", "*")
-        result = self.es_request("GET", f"/_cat/indices/{pattern}?format=json&s=index")
+        Returns:
+            Raw search response; check partial_result_info for timed-out or failed shards
+        """
+        try:
+            budget = self.search_budget(args)
+        except ValueError as e:
+            return self.format_error(str(e))
 
-        if isinstance(result, list):
-            return self.format_success(
-                f"Found {len(result)} indices",
-                {
-                    "count": len(result),
-                    "indices": result
-                }
-            )
+        body = dict(body, timeout=f"{int(budget['seconds'] * 1000)}ms")
+        if budget["terminate_after"]:
+            body["terminate_after"] = budget["terminate_after"]
+        partial = "true" if budget["allow_partial"] else "false"
+        return self.es_request(
+            "POST", f"/{self.prune_indices(index, body)}/_search?allow_partial_search_results={partial}",
+            body, timeout=budget["http_timeout"]
+        )
 
-        return result
+    def cached_search(self, index: str, body: dict, args: Optional[dict] = None) -> dict:
+        """Run a _search through the result cache
 
-    def get_index_info(self, args: dict) -> dict:
-        """Get index information"""
-        index = args.get("index")
-        result = self.es_request("GET", f"/{index}")
+        Relative "now" ranges are snapped to cache_options["snap_seconds"]
+        and cached for relative_ttl; fixed windows entirely in the past are
+        cached for absolute_ttl. Failed and partial responses are never
+        cached. The search runs within its time budget.
 
-        if "status" not in result or result["status"] != "error":
-            return self.format_success(f"Index info for {index}", {"info": result})
+        Args:
+            index: Index name or pattern
+            body: Search body
+            args: Tool arguments with optional time_budget, allow_partial_results and terminate_after
+
+        Returns:
+            Raw search response (shared with the cache, do not modify)
+        """
+        options = self.cache_options
+        if not options["enabled"]:
+            return self.budgeted_search(index, body, args)
+
+        body, fixed_window = snap_time_ranges(body, options["snap_seconds"])
+        budget_key = {name: (args or {}).get(name) for name in BUDGET_PROPERTIES}
+        key = hashlib.sha1(
+            f"{self.active_connection()['url']}|{index}|{json.dumps([body, budget_key], sort_keys=True, separators=(',', ':'))}".encode()
+        ).hexdigest()
+
+        result = self.query_cache.get(key)
+        if result is not None:
+            self.record_call({
+                "cluster": self.active_connection()["name"],
+                "method": "POST",
+                "endpoint": f"/{index}/_search",
+                "query": body,
+                "cache": "hit",
+                "request_bytes": 0,
+                "response_bytes": 0
+            }, None, result)
+            return result
 
+        self.local.last_call = None
+        result = self.budgeted_search(index, body, args)
+        if getattr(self.local, "last_call", None) is not None:
+            self.local.last_call["cache"] = "miss"
+        if ("hits" in result or "aggregations" in result) and not partial_result_info(result):
+            ttl = options["absolute_ttl"] if fixed_window else options["relative_ttl"]
+            self.query_cache.put(key, result, ttl)
         return result
 
-    def search_logs(self, args: dict) -> dict:
-        """Search logs"""
-        index = args.get("index")
-        query_string = args.get("query", "*")
-        size = args.get("size", 10)
-        sort_field = args.get("sort_field", "@timestamp")
+    def build_log_query(self, args: dict) -> dict:
+        """Build the bool query shared by log search tools
 
-        # Build Elasticsearch query
+        Args:
+            args: Tool arguments with optional query, from_time and to_time
+
+        Returns:
+            Elasticsearch query clause
+        """
         query = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"query_string": {"query": query_string}}
-                    ]
-                }
-            },
-            "size": size,
-            "sort": [{sort_field: {"order": "desc"}}]
+            "bool": {
+                "must": [
+                    {"query_string": {"query": args.get("query", "*")}}
+                ]
+            }
         }
 
         # Add time range if provided
@@ -402,93 +2393,1910 @@ class ELKMCPServer(BaseMCPServer):
             if args.get("to_time"):
                 time_range["lte"] = args["to_time"]
 
-            query["query"]["bool"]["must"].append({
+            query["bool"]["must"].append({
                 "range": {
                     "@timestamp": time_range
                 }
             })
 
-        result = self.es_request("POST", f"/{index}/_search", query)
+        return query
 
-        if "hits" in result:
-            hits = result["hits"]["hits"]
-            return self.format_success(
-                f"Found {result['hits']['total']['value']} results (showing {len(hits)})",
-                {
-                    "total": result["hits"]["total"]["value"],
-                    "count": len(hits),
-                    "results": hits
-                }
-            )
+    def source_filter(self, args: dict, default_fields: Optional[List[str]] = None) -> Any:
+        """Build a _source filter from projection arguments
+
+        Args:
+            args: Tool arguments with optional fields, exclude_fields and full_source
+            default_fields: Fields to include when none are requested
+
+        Returns:
+            _source value for a search body, or None for the whole document
+        """
+        includes = args.get("fields") or ([] if args.get("full_source") else default_fields or [])
+        excludes = args.get("exclude_fields") or []
+        if not includes and not excludes:
+            return None
+        source = {}
+        if includes:
+            source["includes"] = includes
+        if excludes:
+            source["excludes"] = excludes
+        return source
+
+    def project_hits(self, hits: List[dict], args: dict) -> List[dict]:
+        """Slim search hits down to index, id, source and sort values
+
+        Long string values are truncated when max_field_length is given.
+        """
+        max_length = args.get("max_field_length")
+        projected = []
+        for hit in hits:
+            entry = {"_index": hit.get("_index"), "_id": hit.get("_id"), "_source": hit.get("_source", {})}
+            if max_length:
+                entry["_source"] = truncate_source(entry["_source"], max_length)
+            if "sort" in hit:
+                entry["sort"] = hit["sort"]
+            projected.append(entry)
+        return projected
+
+    def open_point_in_time(self, index: str, keep_alive: str = DEFAULT_PIT_KEEP_ALIVE,
+                           body: Optional[dict] = None) -> str:
+        """Open a point in time over an index
+
+        When the search body is given, indices outside its time range are
+        left out of the point in time.
 
+        Raises:
+            ESRequestError: If the point in time could not be opened
+        """
+        if body is not None:
+            index = self.prune_indices(index, body)
+        result = self.es_request("POST", f"/{index}/_pit?keep_alive={keep_alive}")
+        if "id" not in result:
+            raise ESRequestError(result)
+        return result["id"]
+
+    def close_point_in_time(self, pit_id: str):
+        """Release a point in time, ignoring failures"""
+        self.es_request("DELETE", "/_pit", {"id": pit_id})
+
+    def pit_search_page(self, body: dict, pit_id: str, keep_alive: str = DEFAULT_PIT_KEEP_ALIVE,
+                        search_after: Optional[list] = None) -> dict:
+        """Fetch one page of a point-in-time search
+
+        Args:
+            body: Search body with query, sort and size (no index)
+            pit_id: Point in time ID
+            keep_alive: Point in time keep-alive extension
+            search_after: Sort values of the last hit of the previous page
+
+        Returns:
+            Raw search response
+
+        Raises:
+            ESRequestError: If the search failed
+        """
+        page_body = dict(body, pit={"id": pit_id, "keep_alive": keep_alive})
+        if search_after:
+            page_body["search_after"] = search_after
+
+        result = self.es_request("POST", "/_search", page_body)
+        if "hits" not in result:
+            raise ESRequestError(result)
         return result
 
-    def aggregated_search(self, args: dict) -> dict:
-        """Perform aggregated search"""
-        index = args.get("index")
-        field = args.get("field")
-        agg_type = args.get("agg_type", "terms")
-        size = args.get("size", 10)
-
-        # Build aggregation query
-        agg_body = {}
-        if agg_type == "terms":
-            agg_body = {
-                "terms": {
-                    "field": field,
-                    "size": size
+    def iter_search_pages(self, index: str, body: dict, page_size: int = 1000,
+                          keep_alive: str = DEFAULT_PIT_KEEP_ALIVE) -> Iterator[List[dict]]:
+        """Walk every hit of a search page by page with bounded memory
+
+        Uses a point in time with search_after, so there is no 10k window
+        limit. The point in time is closed when the generator finishes or
+        is closed early.
+
+        Args:
+            index: Index name or pattern
+            body: Search body with query and sort
+            page_size: Hits per page
+            keep_alive: Point in time keep-alive
+
+        Yields:
+            Lists of hits
+        """
+        pit_id = self.open_point_in_time(index, keep_alive, body)
+        search_after = None
+        try:
+            while True:
+                result = self.pit_search_page(dict(body, size=page_size), pit_id, keep_alive, search_after)
+                pit_id = result.get("pit_id", pit_id)
+                hits = result["hits"]["hits"]
+                if hits:
+                    yield hits
+                if len(hits) < page_size:
+                    return
+                search_after = hits[-1]["sort"]
+        finally:
+            self.close_point_in_time(pit_id)
+
+    def iter_search_hits(self, index: str, body: dict, page_size: int = 1000,
+                         keep_alive: str = DEFAULT_PIT_KEEP_ALIVE) -> Iterator[dict]:
+        """Walk every hit of a search one hit at a time (see iter_search_pages)"""
+        for page in self.iter_search_pages(index, body, page_size, keep_alive):
+            yield from page
+
+    def index_catalog(self, refresh: bool = False) -> dict:
+        """Return the cached index catalog of the active cluster
+
+        The catalog holds each index's _cat/indices row plus its min/max
+        @timestamp, and is rebuilt once older than catalog_options["ttl"].
+        Bounds come from a top-level min/max per index, batched through
+        _msearch, which Elasticsearch answers from index metadata instead
+        of visiting every document.
+
+        Args:
+            refresh: Rebuild even if the catalog is still fresh
+
+        Returns:
+            Dict with refreshed_at and indices (name -> row, min_ms, max_ms)
+
+        Raises:
+            ESRequestError: If the catalog could not be built
+        """
+        url = self.active_connection()["url"]
+        with self.catalog_lock:
+            catalog = self.index_catalogs.get(url)
+            if catalog and not refresh and time.time() - catalog["refreshed_at"] < self.catalog_options["ttl"]:
+                return catalog
+
+            rows = self.es_request("GET", "/_cat/indices?format=json&s=index")
+            if not isinstance(rows, list):
+                raise ESRequestError(rows)
+
+            bounds = {}
+            body = {
+                "size": 0,
+                "track_total_hits": False,
+                "aggs": {
+                    "min_ts": {"min": {"field": "@timestamp"}},
+                    "max_ts": {"max": {"field": "@timestamp"}}
                 }
             }
-        elif agg_type == "date_histogram":
-            agg_body = {
-                "date_histogram": {
-                    "field": field,
-                    "calendar_interval": "1h"
+            names = [row["index"] for row in rows]
+            for start in range(0, len(names), CATALOG_MSEARCH_CHUNK):
+                chunk = names[start:start + CATALOG_MSEARCH_CHUNK]
+                lines = []
+                for name in chunk:
+                    lines.extend([{"index": name, "ignore_unavailable": True}, body])
+                result = self.es_request("POST", "/_msearch", lines)
+                if "responses" not in result:
+                    raise ESRequestError(result)
+                # Indices that fail (e.g. closed) get no bounds and are never pruned
+                for name, response in zip(chunk, result["responses"]):
+                    bounds[name] = response.get("aggregations", {})
+
+            indices = {}
+            for row in rows:
+                bucket = bounds.get(row["index"], {})
+                indices[row["index"]] = {
+                    "row": row,
+                    "min_ms": bucket.get("min_ts", {}).get("value"),
+                    "max_ms": bucket.get("max_ts", {}).get("value"),
+                    "min_timestamp": bucket.get("min_ts", {}).get("value_as_string"),
+                    "max_timestamp": bucket.get("max_ts", {}).get("value_as_string"),
+                    "info": None
                 }
+
+            catalog = {"refreshed_at": time.time(), "indices": indices}
+            self.index_catalogs[url] = catalog
+            return catalog
+
+    def cached_index_catalog(self) -> Optional[dict]:
+        """Return the active cluster's index catalog if a fresh one is cached, without building it"""
+        catalog = self.index_catalogs.get(self.active_connection()["url"])
+        if catalog and time.time() - catalog["refreshed_at"] < self.catalog_options["ttl"]:
+            return catalog
+        return None
+
+    def field_catalog(self, index: str, refresh: bool = False) -> dict:
+        """Return the cached flattened field catalog of an index pattern
+
+        Built from _field_caps on the active cluster and rebuilt once older
+        than catalog_options["ttl"]. Approximate cardinalities added by
+        field_cardinality are kept with the catalog.
+
+        Returns:
+            Dict with refreshed_at, fields (see flatten_field_caps) and cardinality
+
+        Raises:
+            ESRequestError: If the field capabilities could not be read
+        """
+        key = (self.active_connection()["url"], index)
+        with self.catalog_lock:
+            catalog = self.field_catalogs.get(key)
+            if catalog and not refresh and time.time() - catalog["refreshed_at"] < self.catalog_options["ttl"]:
+                self.field_catalogs.move_to_end(key)
+                return catalog
+
+        result = self.es_request("GET", f"/{index}/_field_caps?fields=*&ignore_unavailable=true")
+        if "fields" not in result:
+            raise ESRequestError(result)
+
+        catalog = {"refreshed_at": time.time(), "fields": flatten_field_caps(result), "cardinality": {}}
+        with self.catalog_lock:
+            self.field_catalogs[key] = catalog
+            self.field_catalogs.move_to_end(key)
+            while len(self.field_catalogs) > FIELD_CATALOG_MAX_PATTERNS:
+                self.field_catalogs.popitem(last=False)
+        return catalog
+
+    def field_cardinality(self, index: str, catalog: dict, names: List[str], sample_size: int) -> dict:
+        """Estimate distinct values of fields from one sampled cardinality aggregation
+
+        Uses random_sampler where available and a per-shard sampler
+        otherwise; counts from a sample are lower bounds for the full
+        index. Results are stored in catalog["cardinality"].
+
+        Raises:
+            ESRequestError: If the aggregation failed
+        """
+        fields = catalog["fields"]
+        targets = {name: name if fields[name]["aggregatable"] else fields[name]["keyword"] for name in names}
+        unique = list(dict.fromkeys(targets.values()))
+        aggs = {f"f{position}": {"cardinality": {"field": target}} for position, target in enumerate(unique)}
+
+        body = {"size": 0, "track_total_hits": False}
+        sampled = True
+        if self.es_version() >= RANDOM_SAMPLER_MIN_VERSION:
+            try:
+                probability, _ = self.sampling_probability(index, None, {}, sample_size)
+            except ValueError as e:
+                raise ESRequestError(self.format_error(str(e)))
+            sampled = probability < 1
+            body["aggs"] = ({"sample": {"random_sampler": {"probability": probability, "seed": 0}, "aggs": aggs}}
+                            if sampled else aggs)
+        else:
+            body["aggs"] = {"sample": {"sampler": {"shard_size": sample_size}, "aggs": aggs}}
+
+        result = self.es_request("POST", f"/{index}/_search", body)
+        if "aggregations" not in result:
+            raise ESRequestError(result)
+        values = result["aggregations"].get("sample", result["aggregations"])
+
+        for name, target in targets.items():
+            catalog["cardinality"][name] = {
+                "value": values[f"f{unique.index(target)}"]["value"],
+                "sampled": sampled,
+                "sample_docs": values.get("doc_count")
             }
+        return {name: catalog["cardinality"][name] for name in targets}
 
-        query = {
-            "size": 0,
-            "aggs": {
-                "aggregation": agg_body
+    def prune_indices(self, index: str, body: dict) -> str:
+        """Narrow a wildcard index pattern to indices overlapping the query's time range
+
+        Indices whose @timestamp span lies entirely outside the range are
+        appended as -exclusions, so indices created since the catalog was
+        built still match. Indices without timestamps, or written to within
+        write_grace of the last refresh, are never excluded.
+
+        Args:
+            index: Index name or pattern
+            body: Search body
+
+        Returns:
+            Index expression to search
+        """
+        options = self.catalog_options
+        if not options["enabled"] or "*" not in index:
+            return index
+        lower, upper = query_time_bounds(body)
+        if lower is None and upper is None:
+            return index
+
+        try:
+            catalog = self.index_catalog()
+        except ESRequestError as e:
+            logger.warning(f"Index catalog unavailable, not pruning {index}: {e.result.get('message')}")
+            return index
+
+        still_written = (catalog["refreshed_at"] - options["write_grace"]) * 1000
+        target = index
+        for name in match_index_pattern(index, list(catalog["indices"])):
+            entry = catalog["indices"][name]
+            if entry["min_ms"] is None:
+                if entry["row"].get("docs.count") not in ("0", 0):
+                    continue
+            elif not ((upper is not None and entry["min_ms"] > upper) or
+                      (lower is not None and entry["max_ms"] < lower and entry["max_ms"] < still_written)):
+                continue
+            if len(target) + len(name) + 2 > options["max_target_length"]:
+                break
+            target += f",-{name}"
+        return target
+
+    def es_version(self) -> tuple:
+        """Return the (major, minor) version of the active cluster, (0, 0) if unknown"""
+        url = self.active_connection()["url"]
+        if url not in self.cluster_versions:
+            result = self.es_request("GET", "/")
+            number = result.get("version", {}).get("number", "")
+            if not number or result.get("version", {}).get("distribution") == "opensearch":
+                return (0, 0)
+            self.cluster_versions[url] = tuple(int(part) for part in number.split("-")[0].split(".")[:2])
+        return self.cluster_versions[url]
+
+    def count_matching(self, index: str, query: Optional[dict]) -> int:
+        """Count documents matching a query
+
+        Raises:
+            ESRequestError: If the count failed
+        """
+        body = {"query": query} if query else {}
+        result = self.es_request("POST", f"/{self.prune_indices(index, body)}/_count", body)
+        if "count" not in result:
+            raise ESRequestError(result)
+        return result["count"]
+
+    def sampling_probability(self, index: str, query: Optional[dict], args: dict, target: int) -> tuple:
+        """Choose the random_sampler probability for a search
+
+        random_sampler accepts probabilities up to 0.5 or exactly 1, so
+        targets above half the matches run unsampled.
+
+        Returns:
+            Tuple of the probability and the number of matching documents
+
+        Raises:
+            ValueError: If sample_probability is not in (0, 1]
+            ESRequestError: If the matches could not be counted
+        """
+        probability = args.get("sample_probability")
+        if probability is not None and not 0 < probability <= 1:
+            raise ValueError("sample_probability must be greater than 0 and at most 1")
+        total = self.count_matching(index, query)
+        if probability is None:
+            probability = args.get("sample_size", target) / total if total else 1.0
+        return (probability if probability <= 0.5 else 1.0), total
+
+    def sampled_search_logs(self, index: str, query: dict, args: dict) -> dict:
+        """Return a uniform random sample of matching logs
+
+        Uses a random_sampler aggregation with a top_hits sub-aggregation
+        when the cluster supports it, otherwise the top hits of a seeded
+        random_score query. Either way hits are ordered by random_score, so
+        top_hits picks random documents from the sampled set. top_hits
+        returns at most TOP_HITS_MAX_SIZE hits and random_score queries at
+        most RANDOM_SCORE_MAX_SIZE; a capped size is reported in sampling.
+        """
+        requested = query["size"]
+        use_sampler = self.es_version() >= RANDOM_SAMPLER_MIN_VERSION
+        size = min(requested, TOP_HITS_MAX_SIZE if use_sampler else RANDOM_SCORE_MAX_SIZE)
+        try:
+            # Aim slightly above size so the sampled set rarely comes up short
+            probability, total = self.sampling_probability(index, query["query"], args, math.ceil(size * 1.2))
+        except ValueError as e:
+            return self.format_error(str(e))
+        except ESRequestError as e:
+            return e.result
+
+        if probability < 1 and use_sampler:
+            top_hits = {"size": size}
+            if "_source" in query:
+                top_hits["_source"] = query["_source"]
+            body = {
+                "size": 0,
+                "track_total_hits": False,
+                "query": random_score_query(query["query"], args.get("seed", 0)),
+                "aggs": {
+                    "sampled": {
+                        "random_sampler": {"probability": probability, "seed": args.get("seed", 0)},
+                        "aggs": {"docs": {"top_hits": top_hits}}
+                    }
+                }
             }
-        }
+            result = self.cached_search(index, body, args)
+            if "aggregations" not in result:
+                return result
+            sampled = result["aggregations"]["sampled"]
+            hits = sampled["docs"]["hits"]["hits"]
+            sampling = {"method": "random_sampler", "probability": probability,
+                        "sampled_docs": sampled["doc_count"], **partial_result_info(result)}
+        else:
+            size = min(requested, RANDOM_SCORE_MAX_SIZE)
+            body = {
+                "size": size,
+                "track_total_hits": False,
+                "query": random_score_query(query["query"], args.get("seed", 0))
+            }
+            if "_source" in query:
+                body["_source"] = query["_source"]
+            result = self.cached_search(index, body, args)
+            if "hits" not in result:
+                return result
+            hits = result["hits"]["hits"]
+            sampling = {"method": "random_score",
+                        "probability": round(len(hits) / total, 6) if total else 1.0,
+                        **partial_result_info(result)}
 
-        result = self.es_request("POST", f"/{index}/_search", query)
+        hits = self.project_hits(hits, args)
+        sampling["rate"] = round(len(hits) / total, 6) if total else 1.0
+        if size < requested:
+            sampling["size_capped"] = {"requested": requested, "max": size}
+        return self.format_success(
+            f"Sampled {len(hits)} of {total} results" + (f" (size capped at {size})" if size < requested else ""),
+            {"total": total, "count": len(hits), "results": hits, "sampling": sampling}
+        )
 
-        if "aggregations" in result:
-            return self.format_success(
-                f"Aggregation results for {field}",
-                {"aggregations": result["aggregations"]}
-            )
+    def sampled_aggregated_search(self, index: str, query: dict, args: dict) -> dict:
+        """Run aggregations over a random sample of the matching documents
 
-        return result
+        Doc counts and metrics are computed over the sample only; multiply
+        counts by sampling.scale_factor to estimate the full totals. On
+        clusters without random_sampler, the field/agg_type terms shorthand
+        is answered from a random_score sample of documents instead.
+        """
+        try:
+            probability, total = self.sampling_probability(index, query.get("query"), args, 10000)
+        except ValueError as e:
+            return self.format_error(str(e))
+        except ESRequestError as e:
+            return e.result
 
-    def get_document(self, args: dict) -> dict:
-        """Get document by ID"""
-        index = args.get("index")
-        doc_id = args.get("doc_id")
+        if self.es_version() < RANDOM_SAMPLER_MIN_VERSION:
+            return self.random_score_terms(index, query, args, total)
+
+        if probability < 1:
+            query = dict(query, track_total_hits=False, aggs={
+                "sampled": {
+                    "random_sampler": {"probability": probability, "seed": args.get("seed", 0)},
+                    "aggs": query["aggs"]
+                }
+            })
+        result = self.cached_search(index, query, args)
+        if "aggregations" not in result:
+            return result
 
-        result = self.es_request("GET", f"/{index}/_doc/{doc_id}")
+        if probability < 1:
+            sampled = result["aggregations"]["sampled"]
+            sampled_docs = sampled["doc_count"]
+            result = dict(result, aggregations={
+                name: agg for name, agg in sampled.items() if name not in ("doc_count", "seed", "probability")
+            })
+        else:
+            sampled_docs = total
 
-        if "found" in result and result["found"]:
-            return self.format_success(
-                f"Found document {doc_id}",
-                {"document": result}
+        response = self.format_aggregation_result(result, args)
+        response["sampling"] = {
+            "method": "random_sampler",
+            "probability": probability,
+            "sampled_docs": sampled_docs,
+            "total_docs": total,
+            "scale_factor": round(1 / probability, 4),
+            "confidence": sampling_confidence(sampled_docs, probability)
+        }
+        return response
+
+    def random_score_terms(self, index: str, query: dict, args: dict, total: int) -> dict:
+        """Estimate a terms aggregation from a random_score sample of the matching documents"""
+        field = args.get("field")
+        if args.get("aggs") or args.get("agg_type", "terms") != "terms" or not field:
+            return self.format_error(
+                "Sampled aggregations need random_sampler (Elasticsearch 8.2+); "
+                "older clusters only support sampling the field/agg_type terms shorthand"
             )
-        elif "found" in result and not result["found"]:
-            return self.format_error(f"Document not found: {doc_id}")
 
-        return result
+        source_field = field.removesuffix(".keyword")
+        requested = args.get("sample_size", 10000)
+        body = {
+            "size": min(requested, RANDOM_SCORE_MAX_SIZE),
+            "track_total_hits": False,
+            "_source": {"includes": [source_field]},
+            "query": random_score_query(query.get("query"), args.get("seed", 0))
+        }
+        result = self.cached_search(index, body, args)
+        if "hits" not in result:
+            return result
+        hits = result["hits"]["hits"]
+
+        counts = {}
+        for hit in hits:
+            value = hit.get("_source", {})
+            for part in source_field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            for key in value if isinstance(value, list) else [value]:
+                if key is not None:
+                    counts[key] = counts.get(key, 0) + 1
+        buckets = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:args.get("size", 10)]
+
+        probability = len(hits) / total if total else 1.0
+        sampling = {
+            "method": "random_score",
+            "probability": round(probability, 6),
+            "sampled_docs": len(hits),
+            "total_docs": total,
+            **partial_result_info(result),
+            "scale_factor": round(total / len(hits), 4) if hits else None,
+            "confidence": sampling_confidence(len(hits), probability)
+        }
+        if body["size"] < requested:
+            sampling["size_capped"] = {"requested": requested, "max": body["size"]}
+        return self.format_success(
+            f"Aggregation results for {field} (random sample of {len(hits)} documents)",
+            {
+                "aggregations": {
+                    "aggregation": {"buckets": [{"key": key, "doc_count": count} for key, count in buckets]}
+                },
+                "sampling": sampling
+            }
+        )
+
+    def get_cache_stats(self, args: dict) -> dict:
+        """Get query result cache statistics"""
+        stats = self.query_cache.stats()
+        if args.get("clear"):
+            self.query_cache.clear()
+            return self.format_success("Cleared query cache", {"cache": stats, "cleared": True})
+
+        return self.format_success(
+            f"Query cache hit rate {stats['hit_rate']:.1%} over {stats['hits'] + stats['misses']} lookups",
+            {"cache": stats, "options": self.cache_options}
+        )
+
+    def get_query_profile(self, args: dict) -> dict:
+        """Report recent slow Elasticsearch calls and optionally profile a search"""
+        calls = list(self.call_history)
+        min_ms = args.get("min_ms", self.profile_options["slow_ms"])
+        selected = [
+            call for call in calls
+            if call["wall_ms"] >= min_ms and (args.get("include_cached") or call["cache"] != "hit")
+        ]
+        selected.sort(key=lambda call: call["wall_ms"], reverse=True)
+
+        timed = sorted(call["wall_ms"] for call in calls if call["cache"] != "hit")
+        cache_lookups = [call for call in calls if call["cache"]]
+        data = {
+            "summary": {
+                "calls": len(calls),
+                "errors": sum(1 for call in calls if call["error"]),
+                "p50_ms": timed[len(timed) // 2] if timed else None,
+                "p95_ms": timed[min(int(len(timed) * 0.95), len(timed) - 1)] if timed else None,
+                "max_ms": timed[-1] if timed else None,
+                "response_bytes": sum(call.get("response_bytes", 0) for call in calls),
+                "cache_hit_rate": round(
+                    sum(1 for call in cache_lookups if call["cache"] == "hit") / len(cache_lookups), 4
+                ) if cache_lookups else None
+            },
+            "slow_calls": selected[:args.get("limit", 20)]
+        }
+
+        if args.get("profile"):
+            index = args.get("index")
+            if not index:
+                return self.format_error("index is required to profile a search")
+            body = dict(args.get("body") or {"query": self.build_log_query(args), "size": 0})
+            body["profile"] = True
+            result = self.es_request("POST", f"/{self.prune_indices(index, body)}/_search", body)
+            if "profile" not in result:
+                return result
+            data["profile"] = {
+                "took_ms": result.get("took"),
+                "shards": result.get("_shards"),
+                "shard_profiles": summarize_profile(result["profile"])
+            }
+
+        if args.get("clear"):
+            self.call_history.clear()
+
+        return self.format_success(
+            f"{len(selected)} of {len(calls)} recent calls took at least {min_ms}ms",
+            data
+        )
+
+    def configure_elk(self, args: dict) -> dict:
+        """Configure Elasticsearch connection"""
+        if args.get("cluster"):
+            return self.configure_cluster(args)
+
+        self.es_url = args.get("elasticsearch_url")
+        self.username = args.get("username")
+        self.password=REDACTED_PASSWORDpassword")
+        self.save_configuration()
+        self.session = self.create_session()
+
+        # Test connection
+        result = self.es_request("GET", "/")
+        if "status" in result and result["status"] == "error":
+            return result
+
+        return self.format_success(
+            "Successfully configured Elasticsearch connection",
+            {"config_saved": str(self.config_file)}
+        )
+
+    def configure_cluster(self, args: dict) -> dict:
+        """Add or update a named cluster"""
+        name = args["cluster"]
+        cluster = {
+            "elasticsearch_url": args.get("elasticsearch_url"),
+            "username": args.get("username"),
+            "password": args.get("password", "")
+        }
+        if args.get("timeout"):
+            cluster["timeout"] = args["timeout"]
+        self.clusters[name] = cluster
+        self.cluster_sessions[name] = self.create_session(cluster)
+        self.save_configuration()
+
+        # Test connection
+        with self.use_cluster(name):
+            result = self.es_request("GET", "/")
+        if "status" in result and result["status"] == "error":
+            return result
+
+        return self.format_success(
+            f"Successfully configured cluster {name}",
+            {"config_saved": str(self.config_file), "clusters": self.cluster_names()}
+        )
+
+    def get_cluster_health(self, args: dict) -> dict:
+        """Get cluster health"""
+        result = self.es_request("GET", "/_cluster/health")
+
+        if "status" in result and result["status"] != "error":
+            return self.format_success(
+                f"Cluster status: {result.get('status', 'unknown')}",
+                {"health": result}
+            )
+
+        return result
+
+    def multi_cluster_health(self, args: dict) -> dict:
+        """Get health of several clusters concurrently"""
+        try:
+            fanned = self.fan_out(self.get_cluster_health, args)
+        except ValueError as e:
+            return self.format_error(str(e))
+
+        health = {name: result["health"] for name, result in fanned["results"].items()}
+        statuses = [entry.get("status") for entry in health.values()]
+        worst = next((colour for colour in HEALTH_ORDER if colour in statuses), "unknown")
+        return self.format_success(
+            f"Worst status {worst} across {len(health)} clusters"
+            + (f", {len(fanned['failed'])} unreachable" if fanned["failed"] else ""),
+            {"status_overall": worst, "clusters": health, "failed": fanned["failed"],
+             "partial": bool(fanned["failed"])}
+        )
+
+    def get_cluster_stats(self, args: dict) -> dict:
+        """Get cluster statistics"""
+        result = self.es_request("GET", "/_cluster/stats")
+
+        if "status" not in result or result["status"] != "error":
+            return self.format_success("Retrieved cluster statistics", {"stats": result})
+
+        return result
+
+    def list_indices(self, args: dict) -> dict:
+        """List indices"""
+        pattern = args.get("pattern", "*")
+        key = (self.active_connection()["url"], pattern)
+        with self.catalog_lock:
+            listing = self.index_listings.get(key)
+        if (self.catalog_options["enabled"] and listing and not args.get("refresh", False)
+                and time.time() - listing[0] < self.catalog_options["ttl"]):
+            result = listing[1]
+        else:
+            result = self.es_request("GET", f"/_cat/indices/{pattern}?format=json&s=index")
+            if not isinstance(result, list):
+                return result
+            if self.catalog_options["enabled"]:
+                with self.catalog_lock:
+                    self.index_listings[key] = (time.time(), result)
+
+        return self.format_success(
+            f"Found {len(result)} indices",
+            {
+                "count": len(result),
+                "indices": result
+            }
+        )
+
+    def get_index_info(self, args: dict) -> dict:
+        """Get index information
+
+        Catalog stats are attached only when a catalog is already cached (or
+        refresh rebuilds one); describing one index never pays for a full
+        catalog build, and works without _cat/indices or _msearch access.
+        """
+        index = args.get("index")
+        catalog = None
+        if self.catalog_options["enabled"]:
+            if args.get("refresh", False):
+                try:
+                    catalog = self.index_catalog(refresh=True)
+                except ESRequestError as e:
+                    logger.warning(f"Index catalog unavailable, describing {index} without stats: "
+                                   f"{e.result.get('message')}")
+            else:
+                catalog = self.cached_index_catalog()
+        entry = catalog["indices"].get(index) if catalog else None
+
+        if entry and entry["info"] is not None:
+            result = entry["info"]
+        else:
+            result = self.es_request("GET", f"/{index}")
+            if "status" in result and result["status"] == "error":
+                return result
+            if entry:
+                entry["info"] = result
+
+        data = {"info": result}
+        if entry:
+            data["stats"] = dict(entry["row"], min_timestamp=entry["min_timestamp"],
+                                 max_timestamp=entry["max_timestamp"])
+        return self.format_success(f"Index info for {index}", data)
+
+    def get_field_catalog(self, args: dict) -> dict:
+        """List the fields of an index pattern with type, keyword subfield and aggregatability"""
+        index = args.get("index")
+        try:
+            catalog = self.field_catalog(index, args.get("refresh", False))
+        except ESRequestError as e:
+            return e.result
+
+        fields = catalog["fields"]
+        names = sorted(fields)
+        if args.get("fields"):
+            names = match_index_pattern(",".join(args["fields"]), names)
+        if args.get("aggregatable_only"):
+            names = [name for name in names if fields[name]["aggregatable"] or fields[name]["keyword"]]
+
+        cardinality = {}
+        if args.get("include_cardinality"):
+            candidates = [name for name in names if fields[name]["aggregatable"] or fields[name]["keyword"]]
+            missing = [name for name in candidates if name not in catalog["cardinality"]]
+            if len(missing) > CARDINALITY_MAX_FIELDS:
+                return self.format_error(
+                    f"Cardinality requested for {len(missing)} fields; "
+                    f"narrow 'fields' to at most {CARDINALITY_MAX_FIELDS}"
+                )
+            try:
+                if missing:
+                    self.field_cardinality(index, catalog, missing, args.get("sample_size", 10000))
+            except ESRequestError as e:
+                return e.result
+            cardinality = {name: catalog["cardinality"][name] for name in candidates}
+
+        result = []
+        for name in names:
+            entry = dict(fields[name], name=name)
+            if name in cardinality:
+                entry["cardinality"] = cardinality[name]
+            result.append(entry)
+
+        return self.format_success(
+            f"Found {len(result)} fields in {index}",
+            {
+                "count": len(result),
+                "fields": result,
+                "cached_at": datetime.fromtimestamp(catalog["refreshed_at"], timezone.utc).isoformat()
+            }
+        )
+
+    def build_search_body(self, args: dict) -> dict:
+        """Build the search_logs request body from tool arguments"""
+        sort_field = args.get("sort_field", "@timestamp")
+
+        # Build Elasticsearch query
+        query = {
+            "query": self.build_log_query(args),
+            "size": args.get("size", 10),
+            "sort": [{sort_field: {"order": "desc"}}]
+        }
+
+        source = self.source_filter(args, self.default_source_fields)
+        if source:
+            query["_source"] = source
+
+        return query
+
+    def format_search_result(self, result: dict, args: dict) -> dict:
+        """Format a raw search response the way search_logs returns it"""
+        if "hits" in result:
+            hits = self.project_hits(result["hits"]["hits"], args)
+            return self.format_success(
+                f"Found {result['hits']['total']['value']} results (showing {len(hits)})"
+                + (" [partial]" if partial_result_info(result) else ""),
+                {
+                    "total": result["hits"]["total"]["value"],
+                    "count": len(hits),
+                    "results": hits,
+                    **partial_result_info(result)
+                }
+            )
+
+        return result
+
+    def search_logs(self, args: dict) -> dict:
+        """Search logs"""
+        index = args.get("index")
+        query = self.build_search_body(args)
+
+        if args.get("sample") or args.get("sample_probability"):
+            return self.sampled_search_logs(index, query, args)
+
+        if args.get("paginate") or args.get("cursor"):
+            return self.search_logs_page(index, query, args)
+
+        result = self.cached_search(index, query, args)
+        return self.format_search_result(result, args)
+
+    def multi_cluster_search_logs(self, args: dict) -> dict:
+        """Search logs on several clusters concurrently and merge hits by timestamp"""
+        if args.get("paginate") or args.get("cursor"):
+            return self.format_error("Pagination is not supported across clusters")
+        try:
+            fanned = self.fan_out(self.search_logs, args)
+        except ValueError as e:
+            return self.format_error(str(e))
+
+        merged = []
+        for name, result in fanned["results"].items():
+            for hit in result["results"]:
+                merged.append(dict(hit, _cluster=name))
+        # Hits are sorted newest first by sort_field; its value is the first sort key
+        merged.sort(key=lambda hit: (hit.get("sort") or [0])[0], reverse=True)
+        merged = merged[:args.get("size", 10)]
+
+        return self.format_success(
+            f"Found {sum(result['total'] for result in fanned['results'].values())} results "
+            f"across {len(fanned['results'])} clusters (showing {len(merged)})",
+            {
+                "totals": {name: result["total"] for name, result in fanned["results"].items()},
+                "count": len(merged),
+                "results": merged,
+                "failed": fanned["failed"],
+                "partial": bool(fanned["failed"])
+            }
+        )
+
+    def multi_cluster_log_stats(self, args: dict) -> dict:
+        """Get log statistics from several clusters concurrently"""
+        try:
+            fanned = self.fan_out(self.get_log_stats, args)
+        except ValueError as e:
+            return self.format_error(str(e))
+
+        stats = {name: {key: value for key, value in result.items() if key not in ("status", "message")}
+                 for name, result in fanned["results"].items()}
+        return self.format_success(
+            f"Log statistics from {len(stats)} clusters",
+            {"clusters": stats, "failed": fanned["failed"], "partial": bool(fanned["failed"])}
+        )
+
+    def search_logs_page(self, index: str, query: dict, args: dict) -> dict:
+        """Return one point-in-time page of search_logs with a continuation token"""
+        cursor = args.get("cursor")
+        try:
+            if cursor:
+                state = decode_cursor(cursor)
+            else:
+                state = {"pit_id": self.open_point_in_time(index, body=query), "search_after": None}
+
+            result = self.pit_search_page(query, state["pit_id"], search_after=state["search_after"])
+        except ESRequestError as e:
+            return e.result
+        except (ValueError, KeyError):
+            return self.format_error("Invalid cursor")
+
+        pit_id = result.get("pit_id", state["pit_id"])
+        hits = result["hits"]["hits"]
+        next_cursor = None
+        if hits and len(hits) == query["size"]:
+            next_cursor = encode_cursor({"pit_id": pit_id, "search_after": hits[-1]["sort"]})
+        else:
+            self.close_point_in_time(pit_id)
+
+        return self.format_success(
+            f"Found {result['hits']['total']['value']} results (showing {len(hits)})",
+            {
+                "total": result["hits"]["total"]["value"],
+                "count": len(hits),
+                "results": self.project_hits(hits, args),
+                "next_cursor": next_cursor
+            }
+        )
+
+    def tail_state(self, cursor: Optional[str]) -> dict:
+        """Look up (or recreate) the state behind a tail_logs cursor
+
+        Tails are kept in a bounded LRU. A cursor whose state was evicted
+        or lost on restart resumes right after the last hit it carries
+        (its horizon), only without the seen-set of earlier hits.
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = decode_cursor(cursor) if cursor else None
+        with self.state_lock:
+            if position:
+                state = self.tails.get(position["tail"])
+                if state is None:
+                    state = {"id": position["tail"], "after": position["after"], "floor": position["floor"],
+                             "last_sort": position.get("last_sort"), "horizon": position.get("last_sort"),
+                             "seen": OrderedDict()}
+            else:
+                state = {"id": f"{random.getrandbits(64):016x}", "after": None, "floor": None,
+                         "last_sort": None, "horizon": None, "seen": OrderedDict()}
+
+            self.tails[state["id"]] = state
+            self.tails.move_to_end(state["id"])
+            while len(self.tails) > TAIL_MAX_SESSIONS:
+                self.tails.popitem(last=False)
+        return state
+
+    @staticmethod
+    def tail_sort(args: dict, order: str = "asc") -> List[dict]:
+        """Sort of tail_logs searches: @timestamp, then the tiebreaker field if given"""
+        sort = [{"@timestamp": {"order": order}}]
+        if args.get("tiebreaker_field"):
+            sort.append({args["tiebreaker_field"]: {"order": order}})
+        return sort
+
+    def tail_poll(self, index: str, args: dict, state: dict) -> tuple:
+        """Fetch hits newer than the tail position, skipping ones already seen
+
+        The range starts lag_seconds before the last returned timestamp (but
+        never before the tail's starting point) so late-indexed documents are
+        still picked up; re-read hits are dropped by the seen-set. Hits the
+        seen-set may have forgotten (up to the tail's horizon sort values)
+        are skipped with search_after. A page of nothing but seen hits is
+        followed with search_after too, so a lag window holding more hits
+        than one page cannot stall the tail; without a tiebreaker_field the
+        boundary millisecond is read again, so hits sharing it are not
+        skipped. Partial results are refused, and should one still come back
+        the position is not advanced, so hits on slow shards are not skipped
+        for good.
+
+        Returns:
+            Tuple of new hits (oldest first) and whether more are waiting
+
+        Raises:
+            ESRequestError: If the search failed
+        """
+        size = args.get("size", 100)
+        query = self.build_log_query({"query": args.get("query", "*")})
+        source = self.source_filter(args, self.default_source_fields)
+
+        sort = self.tail_sort(args)
+        lower = max(int(state["after"] - args.get("lag_seconds", 2) * 1000), state["floor"])
+        horizon = state["horizon"]
+        if horizon and len(horizon) != len(sort):
+            # The tiebreaker changed since the horizon was taken, so fall back to its timestamp
+            lower, horizon = max(lower, horizon[0] + 1), None
+        query["bool"]["filter"] = [{"range": {"@timestamp": {"gte": lower, "format": "epoch_millis"}}}]
+        overlap = sum(1 for values in state["seen"].values() if values[0] >= lower)
+        fetch = min(size + overlap, 10000)
+        body = {"query": query, "size": fetch, "sort": sort, "track_total_hits": False}
+        if source:
+            body["_source"] = source
+        if horizon:
+            body["search_after"] = horizon
+
+        new = []
+        while True:
+            result = self.budgeted_search(index, body, dict(args, allow_partial_results=False))
+            if "hits" not in result:
+                raise ESRequestError(result)
+
+            hits = result["hits"]["hits"]
+            unseen = [hit for hit in hits if f"{hit['_index']}/{hit['_id']}" not in state["seen"]]
+            taken = unseen[:size - len(new)]
+            self.remember_tail_hits(state, taken, advance=not partial_result_info(result))
+            new.extend(taken)
+            if len(new) == size or len(hits) < fetch or partial_result_info(result):
+                break
+
+            last = hits[-1]["sort"]
+            if not args.get("tiebreaker_field") and hits[0]["sort"][0] < last[0]:
+                last = [last[0] - 1]
+            body["search_after"] = last
+
+        return new, len(new) == size and (len(unseen) > len(taken) or len(hits) >= fetch)
+
+    def remember_tail_hits(self, state: dict, hits: List[dict], advance: bool = True):
+        """Add hits to the tail's bounded seen-set, advancing its position unless told not to
+
+        Evicted hits raise the tail's horizon, so they are never read again
+        once the seen-set has forgotten them.
+        """
+        for hit in hits:
+            timestamp = hit["sort"][0]
+            state["seen"][f"{hit['_index']}/{hit['_id']}"] = hit["sort"]
+            if advance and timestamp >= (state["after"] or timestamp):
+                state["after"] = timestamp
+                state["last_sort"] = hit["sort"]
+        while len(state["seen"]) > TAIL_MAX_SEEN:
+            _, evicted = state["seen"].popitem(last=False)
+            if not state["horizon"] or evicted[0] >= state["horizon"][0]:
+                state["horizon"] = evicted
+
+    def tail_logs(self, args: dict) -> dict:
+        """Follow logs, returning only hits newer than the cursor"""
+        index = args.get("index")
+        try:
+            state = self.tail_state(args.get("cursor"))
+        except (ValueError, KeyError):
+            return self.format_error("Invalid cursor")
+
+        started = time.monotonic()
+        try:
+            if state["after"] is None and not args.get("from_time"):
+                # New tail: start from the newest size hits, like tail -n
+                body = self.build_search_body(dict(args, size=args.get("size", 100), sort_field="@timestamp"))
+                body["sort"] = self.tail_sort(args, "desc")
+                body["track_total_hits"] = False
+                result = self.es_request("POST", f"/{self.prune_indices(index, body)}/_search", body)
+                if "hits" not in result:
+                    raise ESRequestError(result)
+                hits = list(reversed(result["hits"]["hits"]))
+                self.remember_tail_hits(state, hits)
+                if state["after"] is None:
+                    state["after"] = int(time.time() * 1000)
+                state["floor"] = state["after"]
+                has_more = False
+            else:
+                if state["after"] is None:
+                    start = parse_es_time(args["from_time"])
+                    if start is None:
+                        return self.format_error(f"Invalid from_time: {args['from_time']}")
+                    state["after"] = state["floor"] = round(start)
+
+                # Long-poll with backoff until new hits arrive or wait_seconds passes
+                deadline = started + min(args.get("wait_seconds", 0), TAIL_MAX_WAIT)
+                interval = TAIL_POLL_INTERVAL
+                while True:
+                    hits, has_more = self.tail_poll(index, args, state)
+                    remaining = deadline - time.monotonic()
+                    if hits or remaining <= 0:
+                        break
+                    time.sleep(min(interval, remaining))
+                    interval = min(interval * 2, 5.0)
+        except ESRequestError as e:
+            return e.result
+
+        return self.format_success(
+            f"{len(hits)} new log entries" + (" (more waiting)" if has_more else ""),
+            {
+                "count": len(hits),
+                "results": self.project_hits(hits, args),
+                "has_more": has_more,
+                "waited_seconds": round(time.monotonic() - started, 2),
+                "cursor": encode_cursor({"tail": state["id"], "after": state["after"], "floor": state["floor"],
+                                         "last_sort": state["last_sort"]})
+            }
+        )
+
+    def track_async_search(self, search_id: str, kind: str, args: dict, keep_alive: str):
+        """Remember a submitted async search, deleting the oldest beyond the tracking limit"""
+        now = time.time()
+        evicted = []
+        with self.state_lock:
+            for tracked_id, entry in list(self.async_searches.items()):
+                if entry["expires_at"] <= now:
+                    self.async_searches.pop(tracked_id)
+
+            self.async_searches[search_id] = {
+                "cluster": self.active_connection()["name"],
+                "kind": kind,
+                "args": args,
+                "expires_at": now + parse_duration(keep_alive)
+            }
+            while len(self.async_searches) > ASYNC_SEARCH_MAX_TRACKED:
+                evicted.append(self.async_searches.popitem(last=False))
+
+        for oldest_id, oldest in evicted:
+            with self.use_cluster(oldest["cluster"]):
+                self.es_request("DELETE", f"/_async_search/{oldest_id}")
+
+    def format_async_search(self, result: dict, entry: Optional[dict]) -> dict:
+        """Format an async search response with progress and (partial) results"""
+        response = result.get("response", {})
+        shards = response.get("_shards", {})
+        done = sum(shards.get(key) or 0 for key in ("successful", "skipped", "failed"))
+        data = {
+            "id": result.get("id"),
+            "is_running": result.get("is_running", False),
+            "is_partial": result.get("is_partial", False),
+            "progress": {
+                "shards_total": shards.get("total"),
+                "shards_done": done,
+                "percent": round(100 * done / shards["total"], 1) if shards.get("total") else None
+            },
+            "started": result.get("start_time_in_millis"),
+            "expires": result.get("expiration_time_in_millis")
+        }
+
+        kind = entry["kind"] if entry else ("aggregation" if "aggregations" in response else "search")
+        args = entry["args"] if entry else {}
+        if kind == "aggregation" and "aggregations" in response:
+            formatted = self.format_aggregation_result(response, args)
+        elif "hits" in response:
+            formatted = self.format_search_result(response, args)
+        else:
+            formatted = {}
+        data.update({key: value for key, value in formatted.items() if key not in ("status", "message")})
+        return data
+
+    def submit_async_search(self, args: dict) -> dict:
+        """Submit a search or aggregation as an Elasticsearch async search"""
+        index = args.get("index")
+        kind = args.get("type", "aggregation")
+        try:
+            body = self.build_aggregation_body(args) if kind == "aggregation" else self.build_search_body(args)
+            wait = parse_duration(args.get("wait", "1s"))
+            keep_alive = args.get("keep_alive", DEFAULT_ASYNC_KEEP_ALIVE)
+            parse_duration(keep_alive)
+        except ValueError as e:
+            return self.format_error(str(e))
+
+        result = self.es_request(
+            "POST",
+            f"/{self.prune_indices(index, body)}/_async_search?wait_for_completion_timeout={int(wait * 1000)}ms"
+            f"&keep_on_completion=true&keep_alive={keep_alive}",
+            body, timeout=wait + self.active_connection()["timeout"]
+        )
+        if "id" not in result and "response" not in result:
+            return result
+
+        entry = {"kind": kind, "args": args}
+        data = self.format_async_search(result, entry)
+        if result.get("id"):
+            self.track_async_search(result["id"], kind, args, keep_alive)
+        state = "running" if data["is_running"] else "complete"
+        return self.format_success(f"Async search {state}; poll or fetch it by id", data)
+
+    def poll_async_search(self, args: dict) -> dict:
+        """Check progress of an async search, with partial results so far"""
+        search_id = args.get("id")
+        with self.state_lock:
+            entry = self.async_searches.get(search_id)
+        try:
+            wait = parse_duration(args.get("wait", 0))
+        except ValueError as e:
+            return self.format_error(str(e))
+
+        with self.use_cluster(entry["cluster"] if entry else args.get("cluster")):
+            result = self.es_request(
+                "GET", f"/_async_search/{search_id}?wait_for_completion_timeout={int(wait * 1000)}ms",
+                timeout=wait + self.active_connection()["timeout"]
+            )
+        if "response" not in result:
+            return result
+
+        data = self.format_async_search(result, entry)
+        progress = data["progress"]["percent"]
+        return self.format_success(
+            "Async search running" + (f" ({progress}% of shards done)" if progress is not None else "")
+            if data["is_running"] else "Async search complete",
+            data
+        )
+
+    def fetch_async_search(self, args: dict) -> dict:
+        """Fetch the results of an async search, deleting them once complete"""
+        result = self.poll_async_search(args)
+        if result.get("status") == "error" or result.get("is_running"):
+            return result
+
+        search_id = args.get("id")
+        if not args.get("keep"):
+            with self.state_lock:
+                entry = self.async_searches.pop(search_id, None)
+            with self.use_cluster(entry["cluster"] if entry else args.get("cluster")):
+                self.es_request("DELETE", f"/_async_search/{search_id}")
+            result["deleted"] = True
+        return result
+
+    def delete_async_search(self, args: dict) -> dict:
+        """Cancel a running async search or delete its stored results"""
+        search_id = args.get("id")
+        with self.state_lock:
+            entry = self.async_searches.pop(search_id, None)
+        with self.use_cluster(entry["cluster"] if entry else args.get("cluster")):
+            result = self.es_request("DELETE", f"/_async_search/{search_id}")
+        if result.get("status") == "error":
+            return result
+        return self.format_success(f"Deleted async search {search_id}", {"id": search_id})
+
+    def build_aggregation_body(self, args: dict) -> dict:
+        """Build the aggregated_search request body from tool arguments
+
+        Raises:
+            ValueError: If the aggregation arguments are invalid
+        """
+        specs = args.get("aggs")
+        if not specs:
+            field = args.get("field")
+            agg_type = args.get("agg_type", "terms")
+            if not field:
+                raise ValueError("Either field or aggs is required")
+
+            # Single aggregation from the field/agg_type shorthand
+            params = {"field": field}
+            if agg_type in ("terms", "significant_terms"):
+                params["size"] = args.get("size", 10)
+            elif agg_type in ("date_histogram", "histogram"):
+                params["interval"] = args.get("interval", "1h" if agg_type == "date_histogram" else 10)
+            specs = {"aggregation": {agg_type: params}}
+
+        aggs = {name: build_aggregation(spec) for name, spec in specs.items()}
+
+        # Aggregate text fields through their keyword multi-fields
+        if self.catalog_options["auto_keyword"] and args.get("index"):
+            try:
+                # Nested parameters still belong to the caller's spec, so resolve a copy
+                aggs = copy.deepcopy(aggs)
+                keyword_aggregation_fields(aggs, self.field_catalog(args["index"])["fields"])
+            except ESRequestError:
+                pass  # Fields are sent as given; Elasticsearch reports any that cannot be aggregated
+
+        # Resume composite aggregations from the after_key of the previous page
+        after_key = args.get("after_key")
+        if after_key:
+            composites = [name for name, agg in aggs.items() if "composite" in agg]
+            for name in composites:
+                aggs[name]["composite"]["after"] = after_key[name] if len(composites) > 1 else after_key
+
+        query = {
+            "size": 0,
+            "aggs": aggs
+        }
+
+        if args.get("query") or args.get("from_time") or args.get("to_time"):
+            query["query"] = self.build_log_query(args)
+
+        return query
+
+    def format_aggregation_result(self, result: dict, args: dict) -> dict:
+        """Format a raw search response the way aggregated_search returns it"""
+        if "aggregations" in result:
+            data = {"aggregations": result["aggregations"]}
+            after_keys = {
+                name: agg["after_key"]
+                for name, agg in result["aggregations"].items()
+                if isinstance(agg, dict) and "after_key" in agg
+            }
+            if after_keys:
+                data["after_key"] = next(iter(after_keys.values())) if len(after_keys) == 1 else after_keys
+            data.update(partial_result_info(result))
+            return self.format_success(
+                f"Aggregation results for {args.get('field') or ', '.join(args.get('aggs', {}))}",
+                data
+            )
+
+        return result
+
+    def export_logs(self, args: dict) -> dict:
+        """Stream all hits of a log query to a local NDJSON or CSV file"""
+        index = args.get("index")
+        export_format = args.get("format", "ndjson")
+        if export_format not in ("ndjson", "csv"):
+            return self.format_error("format must be 'ndjson' or 'csv'")
+
+        compress = args.get("compress", False)
+        page_size = args.get("page_size", 1000)
+        max_hits = args.get("max_hits")
+
+        path = args.get("path")
+        if path:
+            path = Path(path).expanduser()
+        else:
+            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+            name = "".join(c if c.isalnum() or c in "-_." else "_" for c in index)
+            path = self.config_dir / "exports" / f"{name}-{stamp}.{export_format}{'.gz' if compress else ''}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        body = {
+            "query": self.build_log_query(args),
+            "sort": [{args.get("sort_field", "@timestamp"): {"order": "asc"}}]
+        }
+        source = self.source_filter(args)
+        if source:
+            body["_source"] = source
+
+        written = 0
+        pages = 0
+        error = None
+        started = time.time()
+        opener = gzip.open if compress else open
+
+        # CSV rows are spooled to a temporary file until every column is known
+        spool = tempfile.TemporaryFile("w+t", encoding="utf-8") if export_format == "csv" else None
+        columns = set()
+        try:
+            # Only one page of hits is held in memory; the file buffer flushes as it fills
+            with opener(path, "wt", encoding="utf-8", newline="") as f:
+                try:
+                    for hits in self.iter_search_pages(index, body, page_size):
+                        pages += 1
+                        if max_hits:
+                            hits = hits[:max_hits - written]
+                        for hit in hits:
+                            if spool is None:
+                                f.write(json.dumps({"_index": hit["_index"], "_id": hit["_id"],
+                                                    **hit.get("_source", {})}))
+                                f.write("\n")
+                            else:
+                                row = dict(flatten_source(hit.get("_source", {})),
+                                           _index=hit["_index"], _id=hit["_id"])
+                                columns.update(row)
+                                spool.write(json.dumps(row, default=str))
+                                spool.write("\n")
+                        written += len(hits)
+                        if pages % 10 == 0:
+                            logger.info(f"export_logs {path}: {written} hits read ({pages} pages)")
+                        if max_hits and written >= max_hits:
+                            break
+                except ESRequestError as e:
+                    error = e
+
+                if spool is not None:
+                    writer = csv.DictWriter(f, fieldnames=csv_columns(columns, args.get("fields")))
+                    writer.writeheader()
+                    spool.seek(0)
+                    for line in spool:
+                        writer.writerow(json.loads(line))
+        finally:
+            if spool is not None:
+                spool.close()
+
+        if error is not None:
+            return self.format_error(f"Export stopped after {written} hits, written to {path}: {error}")
+
+        return self.format_success(
+            f"Exported {written} hits to {path}",
+            {
+                "path": str(path),
+                "format": export_format,
+                "compressed": compress,
+                "hits_written": written,
+                "pages": pages,
+                "bytes": path.stat().st_size,
+                "elapsed_seconds": round(time.time() - started, 2)
+            }
+        )
+
+    def mine_templates(self, index: str, query: dict, message_field: str = "message",
+                       max_messages: int = 10000, **miner_options) -> dict:
+        """Run the template miner over the newest messages matching a query
+
+        Args:
+            index: Index name or pattern
+            query: Query clause selecting the messages
+            message_field: Source field holding the log message
+            max_messages: Maximum number of messages to read
+            miner_options: LogTemplateMiner settings
+
+        Returns:
+            Dict with the miner, number of messages read and template count
+
+        Raises:
+            ESRequestError: If paging through the messages failed
+        """
+        miner = LogTemplateMiner(**miner_options)
+        body = {
+            "query": query,
+            "sort": [{"@timestamp": {"order": "desc"}}],
+            "_source": {"includes": [message_field, "@timestamp"]}
+        }
+
+        read = 0
+        hits = self.iter_search_hits(index, body, page_size=min(max_messages, 1000))
+        try:
+            for hit in hits:
+                source = hit.get("_source", {})
+                message = source
+                for part in message_field.split("."):
+                    message = message.get(part) if isinstance(message, dict) else None
+                if isinstance(message, str):
+                    miner.add(message, hit.get("_id"), source.get("@timestamp"))
+                read += 1
+                if read >= max_messages:
+                    break
+        finally:
+            hits.close()
+
+        return {"miner": miner, "messages_read": read, "template_count": len(miner.clusters)}
+
+    def mine_log_templates(self, args: dict) -> dict:
+        """Cluster log messages into templates"""
+        index = args.get("index")
+        query_args = dict(args, query=args.get("query", DEFAULT_ERROR_QUERY))
+        try:
+            mined = self.mine_templates(
+                index,
+                self.build_log_query(query_args),
+                message_field=args.get("message_field", "message"),
+                max_messages=args.get("max_messages", 10000),
+                similarity=args.get("similarity", 0.5),
+                depth=args.get("depth", 4)
+            )
+        except ESRequestError as e:
+            return e.result
+
+        templates = mined["miner"].top(args.get("top", 20))
+        return self.format_success(
+            f"Found {mined['template_count']} templates in {mined['messages_read']} messages",
+            {
+                "messages_read": mined["messages_read"],
+                "template_count": mined["template_count"],
+                "templates": templates
+            }
+        )
+
+    def aggregated_search(self, args: dict) -> dict:
+        """Perform aggregated search"""
+        index = args.get("index")
+        try:
+            query = self.build_aggregation_body(args)
+        except ValueError as e:
+            return self.format_error(str(e))
+
+        if args.get("sample") or args.get("sample_probability"):
+            return self.sampled_aggregated_search(index, query, args)
+
+        result = self.cached_search(index, query, args)
+        return self.format_aggregation_result(result, args)
+
+    def multi_search(self, args: dict) -> dict:
+        """Run several search_logs/aggregated_search specs in one _msearch request"""
+        specs = args.get("searches") or []
+        if not specs:
+            return self.format_error("At least one search spec is required")
+
+        try:
+            budget = self.search_budget(args)
+        except ValueError as e:
+            return self.format_error(str(e))
+
+        keys = []
+        lines = []
+        for position, spec in enumerate(specs):
+            spec = dict(spec)
+            if not spec.get("index"):
+                spec["index"] = args.get("index")
+            if not spec["index"]:
+                return self.format_error(f"Search spec {position} has no index")
+            if spec.get("type", "search") == "aggregation":
+                try:
+                    body = self.build_aggregation_body(spec)
+                except ValueError as e:
+                    return self.format_error(f"Search spec {position}: {e}")
+            else:
+                body = self.build_search_body(spec)
+            keys.append((str(spec.get("key", position)), spec))
+            body["timeout"] = f"{int(budget['seconds'] * 1000)}ms"
+            if budget["terminate_after"]:
+                body["terminate_after"] = budget["terminate_after"]
+            lines.append({"index": self.prune_indices(spec["index"], body),
+                          "allow_partial_search_results": budget["allow_partial"]})
+            lines.append(body)
+
+        result = self.es_request("POST", "/_msearch", lines, timeout=budget["http_timeout"])
+        if "responses" not in result:
+            return result
+
+        results = {}
+        for (key, spec), response in zip(keys, result["responses"]):
+            if "error" in response:
+                error = response["error"]
+                reason = error.get("reason", error) if isinstance(error, dict) else error
+                results[key] = self.format_error(f"Search failed: {reason}")
+            elif spec.get("type", "search") == "aggregation":
+                results[key] = self.format_aggregation_result(response, spec)
+            else:
+                results[key] = self.format_search_result(response, spec)
+
+        return self.format_success(
+            f"Ran {len(results)} searches in one request",
+            {"results": results}
+        )
+
+    def get_document(self, args: dict) -> dict:
+        """Get document by ID"""
+        index = args.get("index")
+        doc_id = args.get("doc_id")
+
+        endpoint = f"/{index}/_doc/{doc_id}"
+        source = self.source_filter(args) or {}
+        filters = []
+        if source.get("includes"):
+            filters.append(f"_source_includes={','.join(source['includes'])}")
+        if source.get("excludes"):
+            filters.append(f"_source_excludes={','.join(source['excludes'])}")
+        if filters:
+            endpoint += "?" + "&".join(filters)
+
+        result = self.es_request("GET", endpoint)
+
+        if "found" in result and result["found"]:
+            return self.format_success(
+                f"Found document {doc_id}",
+                {"document": self.project_hits([result], args)[0]}
+            )
+        elif "found" in result and not result["found"]:
+            return self.format_error(f"Document not found: {doc_id}")
+
+        return result
+
+    def get_documents(self, args: dict) -> dict:
+        """Get several documents in one _mget request, in input order"""
+        requested = args.get("documents") or []
+        if not requested:
+            return self.format_error("At least one document is required")
+        if len(requested) > MGET_MAX_DOCS:
+            return self.format_error(f"At most {MGET_MAX_DOCS} documents per call")
+
+        source = self.source_filter(args)
+        docs = []
+        for position, ref in enumerate(requested):
+            # Accept {index, id} pairs as well as hits straight from search_logs
+            index = ref.get("index") or ref.get("_index") or args.get("index")
+            doc_id = ref.get("id") or ref.get("_id")
+            if not index or not doc_id:
+                return self.format_error(f"Document {position} needs an index and an id")
+            doc = {"_index": index, "_id": doc_id}
+            if source:
+                doc["_source"] = source
+            docs.append(doc)
+
+        result = self.es_request("POST", "/_mget", {"docs": docs})
+        if "docs" not in result:
+            return result
+
+        documents = []
+        for doc in result["docs"]:
+            if doc.get("found"):
+                documents.append(dict(self.project_hits([doc], args)[0], found=True))
+            else:
+                missing = {"_index": doc.get("_index"), "_id": doc.get("_id"), "found": False}
+                if "error" in doc:
+                    error = doc["error"]
+                    missing["error"] = error.get("reason", error) if isinstance(error, dict) else error
+                documents.append(missing)
+
+        found = sum(1 for doc in documents if doc["found"])
+        return self.format_success(
+            f"Found {found} of {len(documents)} documents",
+            {"found": found, "missing": len(documents) - found, "documents": documents}
+        )
+
+    def build_log_stats_body(self, args: dict, errors_only: bool = False) -> dict:
+        """Build the single multi-aggregation request behind get_log_stats and analyze_errors
+
+        Counts by level, service and host, a date histogram over the whole
+        range, and top error messages, all in one size-0 search. The total
+        is summed from the histogram, so hit counting is switched off.
+
+        Args:
+            args: Tool arguments with time_range, optional query, top and field overrides
+            errors_only: Restrict every aggregation to error logs
+
+        Returns:
+            Search body
+
+        Raises:
+            ValueError: If time_range is invalid
+        """
+        span = parse_time_range(args.get("time_range", "24h"))
+        fields = dict(self.stats_fields)
+        fields.update({name: args[f"{name}_field"] for name in fields if args.get(f"{name}_field")})
+        top = args.get("top", 10)
+        error_query = {"query_string": {"query": args.get("error_query", DEFAULT_ERROR_QUERY)}}
+
+        query = self.build_log_query({
+            "query": args.get("query", "*"),
+            "from_time": f"now-{args.get('time_range', '24h')}",
+            "to_time": "now"
+        })
+        if errors_only:
+            query["bool"]["filter"] = [error_query]
+
+        top_messages = {"terms": {"field": fields["message"], "size": top}}
+        aggs = {
+            "log_levels": {"terms": {"field": fields["level"], "size": 20}},
+            "services": {"terms": {"field": fields["service"], "size": top}},
+            "hosts": {"terms": {"field": fields["host"], "size": top}},
+            "timeline": {
+                "date_histogram": {
+                    "field": "@timestamp",
+                    "fixed_interval": auto_interval(span),
+                    "min_doc_count": 0
+                }
+            }
+        }
+        if errors_only:
+            aggs["error_types"] = top_messages
+        else:
+            aggs["errors"] = {"filter": error_query, "aggs": {"error_types": top_messages}}
+
+        return {"size": 0, "track_total_hits": False, "query": query, "aggs": aggs}
+
+    def run_log_stats(self, args: dict, errors_only: bool = False) -> dict:
+        """Run the log statistics search and flatten its buckets
+
+        Returns:
+            Dict with total, interval and per-aggregation bucket lists
+
+        Raises:
+            ValueError: If time_range is invalid
+            ESRequestError: If the search failed
+        """
+        body = self.build_log_stats_body(args, errors_only)
+        result = self.cached_search(args.get("index"), body, args)
+        if "aggregations" not in result:
+            raise ESRequestError(result)
+
+        aggregations = result["aggregations"]
+        if "errors" in aggregations:
+            aggregations = dict(aggregations, error_types=aggregations["errors"]["error_types"],
+                                error_count=aggregations["errors"]["doc_count"])
+
+        def buckets(name: str) -> dict:
+            return {"buckets": [
+                {key: bucket[key] for key in ("key", "key_as_string", "doc_count") if key in bucket}
+                for bucket in aggregations[name]["buckets"]
+            ]}
+
+        stats = {name: buckets(name) for name in ("log_levels", "services", "hosts", "timeline", "error_types")}
+        total = sum(bucket["doc_count"] for bucket in aggregations["timeline"]["buckets"])
+        return {
+            "total": total,
+            "error_count": aggregations.get("error_count", total),
+            "interval": body["aggs"]["timeline"]["date_histogram"]["fixed_interval"],
+            "stats": stats,
+            "partial": partial_result_info(result)
+        }
+
+    def volume_histograms(self, args: dict, start: int, end: int, interval_ms: int) -> dict:
+        """Return per-service bucket counts from start up to and including the bucket at end
+
+        Complete buckets are cached per index, query and field. Later calls
+        only search from the end of the cached buckets (re-reading the last
+        VOLUME_REFETCH_BUCKETS for late logs), and cached services are
+        pinned with a terms include so one that went silent still reads as
+        zeros instead of dropping out of the top services.
+
+        Returns:
+            Dict with series (service -> {bucket ms: count}), fetched_from and partial
+
+        Raises:
+            ESRequestError: If the search failed
+        """
+        index = args.get("index")
+        field = args.get("service_field") or self.stats_fields["service"]
+        top = args.get("top", 20)
+        key = json.dumps([self.active_connection()["url"], index, args.get("query", "*"), field, interval_ms, top])
+
+        with self.state_lock:
+            entry = None if args.get("refresh") else self.volume_series.get(key)
+        if entry and entry["start"] <= start < entry["complete_until"]:
+            fetch_from = max(start, entry["complete_until"] - VOLUME_REFETCH_BUCKETS * interval_ms)
+        else:
+            entry = None
+            fetch_from = start
+
+        histogram = {
+            "date_histogram": {
+                "field": "@timestamp",
+                "fixed_interval": f"{interval_ms // 1000}s",
+                "min_doc_count": 0,
+                "extended_bounds": {"min": fetch_from, "max": end}
+            }
+        }
+        aggs = {
+            VOLUME_ALL_SERVICES: histogram,
+            "services": {"terms": {"field": field, "size": top}, "aggs": {"volume": histogram}}
+        }
+        tracked = [name for name in (entry["series"] if entry else {}) if name != VOLUME_ALL_SERVICES]
+        if tracked:
+            aggs["tracked"] = {"terms": {"field": field, "include": tracked, "size": len(tracked)},
+                               "aggs": {"volume": histogram}}
+
+        body = {
+            "size": 0,
+            "track_total_hits": False,
+            "query": self.build_log_query({"query": args.get("query", "*"), "from_time": fetch_from,
+                                           "to_time": end + interval_ms - 1}),
+            "aggs": aggs
+        }
+        result = self.budgeted_search(index, body, args)
+        if "aggregations" not in result:
+            raise ESRequestError(result)
+
+        fetched = {VOLUME_ALL_SERVICES: result["aggregations"][VOLUME_ALL_SERVICES]["buckets"]}
+        for name in ("services", "tracked"):
+            for bucket in result["aggregations"].get(name, {}).get("buckets", []):
+                fetched[str(bucket["key"])] = bucket["volume"]["buckets"]
+
+        # Keep cached buckets before fetch_from, replace the rest with what was just read
+        series = {}
+        for name in set(fetched) | set(entry["series"] if entry else ()):
+            counts = {bucket: value for bucket, value in (entry["series"].get(name, {}) if entry else {}).items()
+                      if start <= bucket < fetch_from}
+            counts.update({bucket["key"]: bucket["doc_count"] for bucket in fetched.get(name, [])
+                           if start <= bucket["key"] <= end})
+            if any(counts.values()):
+                series[name] = counts
+
+        partial = partial_result_info(result)
+        if not partial:
+            with self.state_lock:
+                self.volume_series[key] = {"start": start, "complete_until": end, "series": series}
+                self.volume_series.move_to_end(key)
+                while len(self.volume_series) > VOLUME_CACHE_MAX_ENTRIES:
+                    self.volume_series.popitem(last=False)
+        return {"series": series, "fetched_from": fetch_from, "partial": partial}
+
+    def detect_volume_anomalies(self, args: dict) -> dict:
+        """Rank service/time buckets whose log volume deviates from its rolling baseline"""
+        index = args.get("index")
+        time_range = args.get("time_range", "24h")
+        window = args.get("baseline_window", 12)
+        threshold = args.get("threshold", 3.0)
+        min_baseline = args.get("min_baseline", 5)
+        direction = args.get("direction", "both")
+        if direction not in ("both", "spike", "drop"):
+            return self.format_error("direction must be 'both', 'spike' or 'drop'")
+        if window < 2:
+            return self.format_error("baseline_window must be at least 2 buckets")
+
+        try:
+            span = parse_time_range(time_range)
+            interval = args.get("interval") or auto_interval(span)
+            interval_ms = int(parse_duration(interval) * 1000)
+        except ValueError as e:
+            return self.format_error(str(e))
+        if interval_ms < 1000 or interval_ms % 1000:
+            return self.format_error("interval must be a whole number of seconds")
+
+        buckets = math.ceil(span.total_seconds() * 1000 / interval_ms)
+        if buckets > VOLUME_MAX_BUCKETS:
+            return self.format_error(
+                f"{time_range} at {interval} is {buckets} buckets; use a larger interval "
+                f"(at most {VOLUME_MAX_BUCKETS} buckets)"
+            )
+
+        # The last bucket holds "now" and is still filling; it is compared to a pro-rated baseline
+        now_ms = int(time.time() * 1000)
+        end = now_ms // interval_ms * interval_ms
+        start = end - buckets * interval_ms
+        elapsed = (now_ms - end) / interval_ms
+
+        try:
+            histograms = self.volume_histograms(args, start, end, interval_ms)
+        except ESRequestError as e:
+            return e.result
+
+        keys = list(range(start, end + interval_ms, interval_ms))
+        anomalies = []
+        for service, counts in histograms["series"].items():
+            values = [counts.get(bucket, 0) for bucket in keys]
+            for position, baseline in enumerate(rolling_baselines(values, window)):
+                if baseline is None:
+                    continue
+                mean, std = baseline
+                if keys[position] == end:
+                    if elapsed < 0.25:
+                        continue
+                    mean, std = mean * elapsed, std * elapsed
+                value = values[position]
+                score = deviation_score(value, mean, std)
+                if abs(score) < threshold or (score < 0 and mean < min_baseline):
+                    continue
+                kind = "spike" if score > 0 else ("silent" if value == 0 else "drop")
+                if direction != "both" and (kind == "spike") != (direction == "spike"):
+                    continue
+                anomalies.append({
+                    "service": service,
+                    "timestamp": datetime.fromtimestamp(keys[position] / 1000, timezone.utc).isoformat(),
+                    "count": value,
+                    "baseline": round(mean, 1),
+                    "score": round(score, 2),
+                    "kind": kind,
+                    "in_progress": keys[position] == end
+                })
+
+        anomalies.sort(key=lambda anomaly: -abs(anomaly["score"]))
+        anomalies = anomalies[:args.get("limit", 20)]
+
+        data = {
+            "interval": interval,
+            "buckets": len(keys),
+            "services_checked": len(histograms["series"]),
+            "count": len(anomalies),
+            "anomalies": anomalies,
+            "searched_from": datetime.fromtimestamp(histograms["fetched_from"] / 1000, timezone.utc).isoformat(),
+            **histograms["partial"]
+        }
+        if args.get("include_series"):
+            data["series"] = {
+                service: [counts.get(bucket, 0) for bucket in keys]
+                for service, counts in histograms["series"].items()
+            }
+            data["series_start"] = datetime.fromtimestamp(start / 1000, timezone.utc).isoformat()
+
+        return self.format_success(
+            f"Found {len(anomalies)} volume anomalies in {index} over last {time_range}",
+            data
+        )
+
+    def get_log_stats(self, args: dict) -> dict:
+        """Get log statistics"""
+        index = args.get("index")
+        time_range = args.get("time_range", "24h")
+        try:
+            stats = self.run_log_stats(args)
+        except ValueError as e:
+            return self.format_error(str(e))
+        except ESRequestError as e:
+            return e.result
+
+        return self.format_success(
+            f"Log statistics for {index} over last {time_range}",
+            {
+                "total_logs": stats["total"],
+                "total_errors": stats["error_count"],
+                "interval": stats["interval"],
+                **stats["partial"],
+                "statistics": {
+                    "log_levels": stats["stats"]["log_levels"],
+                    "services": stats["stats"]["services"],
+                    "hosts": stats["stats"]["hosts"],
+                    "top_error_messages": stats["stats"]["error_types"],
+                    "timeline": stats["stats"]["timeline"]
+                }
+            }
+        )
 
     def analyze_errors(self, args: dict) -> dict:
         """Analyze error patterns"""
         index = args.get("index")
         time_range = args.get("time_range", "24h")
+        try:
+            stats = self.run_log_stats(args, errors_only=True)
+        except ValueError as e:
+            return self.format_error(str(e))
+        except ESRequestError as e:
+            return e.result
+
+        data = {
+            "total_errors": stats["total"],
+            "interval": stats["interval"],
+            **stats["partial"],
+            "analysis": {
+                "error_types": stats["stats"]["error_types"],
+                "error_timeline": stats["stats"]["timeline"],
+                "by_service": stats["stats"]["services"],
+                "by_host": stats["stats"]["hosts"],
+                "by_level": stats["stats"]["log_levels"]
+            }
+        }
+
+        if args.get("include_templates") and stats["total"]:
+            # Mine the same logs the error counts cover: the caller's query and error_query
+            query = self.build_log_stats_body(args, errors_only=True)["query"]
+            try:
+                mined = self.mine_templates(
+                    index, query,
+                    message_field=args.get("message_field", self.stats_fields["message"]).removesuffix(".keyword"),
+                    max_messages=args.get("max_messages", 10000)
+                )
+            except ESRequestError as e:
+                return e.result
+            data["analysis"]["templates"] = mined["miner"].top(args.get("top", 10))
+            data["analysis"]["messages_mined"] = mined["messages_read"]
+
+        return self.format_success(f"Error analysis for last {time_range}", data)
+
 
-        # Convert time range to timestamp
-        now = datetime.utcnow()
-        if time_range.endswith('h'):
-            hours = int(time_range[:-1])
-            from_time = now - timedelta(hours=hours)
-        elif time_range.endswith('d'):
+if __name__ == "__main__":
+    server = ELKMCPServer()
+    server.run()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pure helpers of the ELK MCP Server
+Run with: python -m pytest servers/elk
+"""
+
+import sys
+import math
+from pathlib import Path
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from server import (
+    LogTemplateMiner,
+    decode_cursor,
+    deviation_score,
+    encode_cursor,
+    keyword_aggregation_fields,
+    random_score_query,
+    rolling_baselines,
+    snap_time_ranges
+)
+
+# 2024-01-01T12:34:56Z
+NOW = 1704112496.0
+
+
+class TestSnapTimeRanges:
+    def test_now_bounds_are_snapped_to_anchor(self):
+        body = {"query": {"range": {"@timestamp": {"gte": "now-15m", "lte": "now"}}}}
+        snapped, fixed = snap_time_ranges(body, 60, NOW)
+        assert snapped["query"]["range"]["@timestamp"] == {
+            "gte": "2024-01-01T12:34:00Z||-15m",
+            "lte": "2024-01-01T12:34:00Z"
+        }
+        assert not fixed
+
+    def test_same_snap_interval_gives_identical_body(self):
+        body = {"query": {"range": {"@timestamp": {"gte": "now-1h"}}}}
+        assert snap_time_ranges(body, 300, NOW)[0] == snap_time_ranges(body, 300, NOW - 240)[0]
+
+    def test_nested_ranges_are_rewritten(self):
+        body = {"query": {"bool": {"filter": [{"range": {"@timestamp": {"gte": "now-1d/d"}}}]}}}
+        snapped, _ = snap_time_ranges(body, 60, NOW)
+        assert snapped["query"]["bool"]["filter"][0]["range"]["@timestamp"]["gte"] == \
+            "2024-01-01T12:34:00Z||-1d/d"
+
+    def test_past_absolute_window_is_fixed(self):
+        body = {"query": {"range": {"@timestamp": {"gte": "2023-12-31T00:00:00Z",
+                                                   "lt": "2024-01-01T00:00:00Z"}}}}
+        snapped, fixed = snap_time_ranges(body, 60, NOW)
+        assert snapped == body
+        assert fixed
+
+    def test_naive_upper_bound_is_utc(self):
+        past = {"query": {"range": {"@timestamp": {"lte": "2024-01-01T12:00:00"}}}}
+        future = {"query": {"range": {"@timestamp": {"lte": "2024-01-01T13:00:00"}}}}
+        assert snap_time_ranges(past, 60, NOW)[1]
+        assert not snap_time_ranges(future, 60, NOW)[1]
+
+    def test_open_ended_window_is_not_fixed(self):
+        body = {"query": {"range": {"@timestamp": {"gte": "2023-12-31T00:00:00Z"}}}}
+        assert not snap_time_ranges(body, 60, NOW)[1]
+
+    def test_unparseable_upper_bound_is_not_fixed(self):
+        body = {"query": {"range": {"@timestamp": {"lt": "2024-01-01||/d"}}}}
+        assert not snap_time_ranges(body, 60, NOW)[1]
+
+
+class TestCursor:
+    def test_round_trip(self):
+        state = {"pit": "abc", "search_after": [1704112496000, "doc-1"]}
+        assert decode_cursor(encode_cursor(state)) == state
+
+    @pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", "W10=", "MQ==", None])
+    def test_invalid_cursors_raise_value_error(self, cursor):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(cursor)
+
+
+class TestRandomScoreQuery:
+    def test_wraps_query_with_seeded_random_score(self):
+        query = {"term": {"level": "error"}}
+        wrapped = random_score_query(query, 42)["function_score"]
+        assert wrapped["query"] == query
+        assert wrapped["random_score"] == {"seed": 42, "field": "_seq_no"}
+        assert wrapped["boost_mode"] == "replace"
+
+    def test_missing_query_matches_all(self):
+        assert random_score_query(None, 1)["function_score"]["query"] == {"match_all": {}}
+
+
+class TestKeywordAggregationFields:
+    FIELDS = {
+        "message": {"aggregatable": False, "keyword": "message.keyword"},
+        "service": {"aggregatable": False, "keyword": "service.keyword"},
+        "body": {"aggregatable": False, "keyword": None},
+        "status": {"aggregatable": True, "keyword": None}
+    }
+
+    def test_terms_and_sub_aggregations(self):
+        aggs = {
+            "by_service": {
+                "terms": {"field": "service"},
+                "aggs": {"by_message": {"terms": {"field": "message"}},
+                         "by_status": {"terms": {"field": "status"}}}
+            },
+            "bodies": {"terms": {"field": "body"}}
+        }
+        replaced = keyword_aggregation_fields(aggs, self.FIELDS)
+        assert replaced == {"service": "service.keyword", "message": "message.keyword"}
+        assert aggs["by_service"]["terms"]["field"] == "service.keyword"
+        assert aggs["by_service"]["aggs"]["by_message"]["terms"]["field"] == "message.keyword"
+        assert aggs["by_service"]["aggs"]["by_status"]["terms"]["field"] == "status"
+        assert aggs["bodies"]["terms"]["field"] == "body"
+
+    def test_composite_sources(self):
+        aggs = {"pages": {"composite": {"sources": [
+            {"service": {"terms": {"field": "service"}}},
+            {"status": {"terms": {"field": "status"}}}
+        ]}}}
+        assert keyword_aggregation_fields(aggs, self.FIELDS) == {"service": "service.keyword"}
+        sources = aggs["pages"]["composite"]["sources"]
+        assert sources[0]["service"]["terms"]["field"] == "service.keyword"
+        assert sources[1]["status"]["terms"]["field"] == "status"
+
+    def test_multi_terms(self):
+        aggs = {"pairs": {"multi_terms": {"terms": [{"field": "service"}, {"field": "message"}]}}}
+        keyword_aggregation_fields(aggs, self.FIELDS)
+        assert aggs["pairs"]["multi_terms"]["terms"] == [
+            {"field": "service.keyword"}, {"field": "message.keyword"}
+        ]
+
+    def test_filter_queries_are_left_alone(self):
+        aggs = {"with_message": {"filter": {"exists": {"field": "message"}}}}
+        assert keyword_aggregation_fields(aggs, self.FIELDS) == {}
+        assert aggs["with_message"]["filter"]["exists"]["field"] == "message"
+
+
+class TestBaselines:
+    def test_short_history_has_no_baseline(self):
+        baselines = rolling_baselines([5, 5, 5, 5, 5], 4)
+        assert baselines[:2] == [None, None]
+        assert baselines[2] == (5.0, 0.0)
+
+    def test_window_mean_and_std(self):
+        counts = [1, 2, 3, 4, 100]
+        mean, std = rolling_baselines(counts, 4)[4]
+        assert mean == pytest.approx(2.5)
+        assert std == pytest.approx(math.sqrt(1.25))
+
+    def test_window_slides(self):
+        counts = [100, 100, 1, 1, 1, 1]
+        assert rolling_baselines(counts, 2)[5] == (1.0, 0.0)
+
+    def test_matches_direct_computation(self):
+        counts = [3, 7, 2, 9, 4, 4, 8, 1, 6, 5]
+        for position, baseline in enumerate(rolling_baselines(counts, 3)):
+            history = counts[max(0, position - 3):position]
+            if len(history) < 2:
+                assert baseline is None
+                continue
+            mean = sum(history) / len(history)
+            std = math.sqrt(sum((c - mean) ** 2 for c in history) / len(history))
+            assert baseline == (pytest.approx(mean), pytest.approx(std))
+
+    def test_deviation_score_uses_std(self):
+        assert deviation_score(20, 10, 5) == pytest.approx(2.0)
+
+    def test_deviation_score_floors_at_poisson_noise(self):
+        assert deviation_score(30, 25, 0) == pytest.approx(1.0)
+
+    def test_deviation_score_floors_at_one(self):
+        assert deviation_score(3, 0, 0) == pytest.approx(3.0)
+        assert deviation_score(0, 0.25, 0.1) == pytest.approx(-0.25)
+
+
+class TestLogTemplateMiner:
+    def test_number_heavy_messages_share_a_template(self):
+        miner = LogTemplateMiner()
+        for i in range(50):
+            miner.add(f"10.0.0.{i} - - 200 {512 + i}")
+        assert [(t["template"], t["count"]) for t in miner.top()] == [("<IP> - - <NUM> <NUM>", 50)]
+
+    def test_typed_placeholders(self):
+        miner = LogTemplateMiner()
+        assert miner.tokenize("job 3f2a9c1e-0b6d-4c5e-9a7f-123456789abc took 250ms on 10.0.0.1:9200 "
+                              "(deadbeef01, 20240101)") == \
+            ["job", "<UUID>", "took", "<NUM>", "on", "<IP>", "<HEX>", "<NUM>"]
+
+    def test_differing_tokens_become_wildcards(self):
+        miner = LogTemplateMiner()
+        for i in range(10):
+            miner.add(f"user u{i} logged in from 10.0.0.{i}", doc_id=str(i))
+        miner.add("disk full on /var")
+        top = miner.top()
+        assert top[0]["template"] == "user <*> logged in from <IP>"
+        assert top[0]["count"] == 10
+        assert top[0]["example_ids"] == ["0", "1", "2"]
+        assert top[1] == {"template": "disk full on /var", "count": 1, "example_ids": [],
+                          "first_seen": None, "last_seen": None}
@@ -12,8 +12,16 @@ License: MIT
 
 import os
 import json
+import bisect
+import calendar
+import hashlib
+import time
 import logging
-from typing import Any, Dict, List, Optional
+import math
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 from fastmcp import FastMCP
 from zabbix_utils import ZabbixAPI
 from dotenv import load_dotenv
@@ -34,6 +42,9 @@ mcp = FastMCP("Zabbix MCP Server")
 # Global Zabbix API client
 zabbix_api: Optional[ZabbixAPI] = None
 
+# Cached Zabbix API version as a (major, minor) tuple
+zabbix_api_version: Optional[Tuple[int, int]] = None
+
 
 def get_zabbix_client() -> ZabbixAPI:
     """Get or create Zabbix API client with proper authentication.
@@ -106,6 +117,45 @@ def validate_read_only() -> None:
         raise ValueError("Server is in read-only mode - write operations are not allowed")
 
 
+def get_api_version() -> Tuple[int, int]:
+    """Get the (major, minor) version of the connected Zabbix API.
+    
+    The version is queried once and cached for the lifetime of the process.
+    
+    Returns:
+        Tuple[int, int]: Major and minor API version, e.g. (6, 4)
+    """
+    global zabbix_api_version
+    
+    if zabbix_api_version is None:
+        client = get_zabbix_client()
+        parts = str(client.api_version()).split(".")
+        zabbix_api_version = (int(parts[0]), int(parts[1]) if len(parts) > 1 else 0)
+        logger.info(f"Detected Zabbix API version {zabbix_api_version[0]}.{zabbix_api_version[1]}")
+    
+    return zabbix_api_version
+
+
+def host_groups_param() -> str:
+    """Get the name of the host group selector for the connected API version.
+    
+    Zabbix 6.2 renamed ``selectGroups`` to ``selectHostGroups``.
+    
+    Returns:
+        str: Parameter name to request host groups with
+    """
+    return "selectHostGroups" if get_api_version() >= (6, 2) else "selectGroups"
+
+
+def host_groups_key() -> str:
+    """Get the result key holding host groups for the connected API version.
+    
+    Returns:
+        str: ``hostgroups`` on Zabbix 6.2+, ``groups`` otherwise
+    """
+    return "hostgroups" if get_api_version() >= (6, 2) else "groups"
+
+
 # HOST MANAGEMENT
 @mcp.tool()
 def host_get(hostids: Optional[List[str]] = None, 
@@ -714,7 +764,8 @@ def problem_get(eventids: Optional[List[str]] = None,
                 time_till: Optional[int] = None,
                 recent: bool = False,
                 severities: Optional[List[int]] = None,
-                limit: Optional[int] = None) -> str:
+                limit: Optional[int] = None,
+                in_maintenance: Optional[bool] = None) -> str:
     """Get problems from Zabbix with optional filtering.
     
     Args:
@@ -728,6 +779,8 @@ def problem_get(eventids: Optional[List[str]] = None,
         recent: Only recent problems
         severities: List of severity levels to filter by
         limit: Maximum number of results
+        in_maintenance: Keep only problems on hosts that are (True) or are not (False)
+            in maintenance now, using the maintenance index; applied after limit
         
     Returns:
         str: JSON formatted list of problems
@@ -753,8 +806,26 @@ def problem_get(eventids: Optional[List[str]] = None,
         params["severities"] = severities
     if limit:
         params["limit"] = limit
+    # The maintenance filter needs each problem's trigger; request it and strip it again afterwards
+    added_objectid = in_maintenance is not None and output != "extend" and (
+        not isinstance(output, list) or "objectid" not in output
+    )
+    if added_objectid:
+        params["output"] = (output if isinstance(output, list) else ["eventid"]) + ["objectid"]
     
     result = client.problem.get(**params)
+    
+    if in_maintenance is not None and result:
+        # problem.get cannot select hosts, so resolve them through the triggers
+        triggers = client.trigger.get(triggerids=list({p["objectid"] for p in result}),
+                                      output=["triggerid"], selectHosts=["hostid"])
+        trigger_hosts = {t["triggerid"]: [h["hostid"] for h in t.get("hosts", [])] for t in triggers}
+        maintained = hosts_in_maintenance(list({h for hosts in trigger_hosts.values() for h in hosts}))
+        result = [p for p in result
+                  if any(h in maintained for h in trigger_hosts.get(p["objectid"], [])) == in_maintenance]
+    if added_objectid:
+        result = [{key: value for key, value in p.items() if key != "objectid"} for p in result]
+    
     return format_response(result)
 
 
@@ -1147,6 +1218,1340 @@ def maintenance_delete(maintenanceids: List[str]) -> str:
     return format_response(result)
 
 
+# AVAILABILITY REPORTING
+SECONDS_PER_DAY = 86400
+
+# Maximum number of cached daily availability rollups
+AVAILABILITY_CACHE_SIZE = int(os.getenv("AVAILABILITY_CACHE_SIZE", "100000"))
+
+# Daily rollups keyed by (scope, hostid, day_start) -> (downtime_seconds, incidents_started)
+_availability_cache: "OrderedDict[Tuple[Any, ...], Tuple[int, int]]" = OrderedDict()
+
+
+def _merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping or touching intervals.
+    
+    Args:
+        intervals: (start, end) pairs in any order
+        
+    Returns:
+        List[Tuple[int, int]]: Sorted, disjoint intervals
+    """
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract_intervals(intervals: List[Tuple[int, int]],
+                        holes: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Remove the holes from a set of intervals.
+    
+    Args:
+        intervals: Sorted, disjoint intervals
+        holes: Sorted, disjoint intervals to cut out
+        
+    Returns:
+        List[Tuple[int, int]]: Sorted, disjoint remainder
+    """
+    result: List[Tuple[int, int]] = []
+    first = 0
+    for start, end in intervals:
+        while first < len(holes) and holes[first][1] <= start:
+            first += 1
+        cursor = start
+        index = first
+        while index < len(holes) and holes[index][0] < end:
+            if holes[index][0] > cursor:
+                result.append((cursor, holes[index][0]))
+            cursor = max(cursor, holes[index][1])
+            index += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def _interval_overlap(intervals: List[Tuple[int, int]], start: int, end: int) -> Tuple[int, int]:
+    """Measure how much of a window is covered by a set of intervals.
+    
+    Args:
+        intervals: Sorted, disjoint intervals
+        start: Window start (Unix timestamp)
+        end: Window end (Unix timestamp)
+        
+    Returns:
+        Tuple[int, int]: Covered seconds and number of intervals starting inside the window
+    """
+    covered = 0
+    started = 0
+    for interval_start, interval_end in intervals:
+        if interval_start >= end:
+            break
+        if interval_end <= start:
+            continue
+        covered += min(interval_end, end) - max(interval_start, start)
+        if interval_start >= start:
+            started += 1
+    return covered, started
+
+
+def _maintenance_tz() -> ZoneInfo:
+    """Get the timezone used to interpret maintenance time periods.
+    
+    Returns:
+        ZoneInfo: Timezone from ZABBIX_TIMEZONE, defaulting to UTC
+    """
+    return ZoneInfo(os.getenv("ZABBIX_TIMEZONE", "UTC"))
+
+
+def _timeperiod_matches(timeperiod: Dict[str, Any], day: date, anchor: date) -> bool:
+    """Check whether a recurring maintenance time period starts on a given day.
+    
+    Args:
+        timeperiod: Zabbix maintenance time period definition
+        day: Candidate day
+        anchor: Day the maintenance became active
+        
+    Returns:
+        bool: True if the period has an occurrence starting on ``day``
+    """
+    tp_type = int(timeperiod.get("timeperiod_type", 0))
+    every = max(int(timeperiod.get("every", 1) or 1), 1)
+    dayofweek = int(timeperiod.get("dayofweek", 0) or 0)
+    weekday_bit = 1 << day.weekday()
+    
+    if tp_type == 2:
+        return (day - anchor).days % every == 0
+    if tp_type == 3:
+        anchor_week = anchor - timedelta(days=anchor.weekday())
+        weeks = (day - anchor_week).days // 7
+        return bool(dayofweek & weekday_bit) and weeks % every == 0
+    if tp_type == 4:
+        months = int(timeperiod.get("month", 0) or 0)
+        if not months & (1 << (day.month - 1)):
+            return False
+        day_of_month = int(timeperiod.get("day", 0) or 0)
+        if day_of_month:
+            return day.day == day_of_month
+        if not dayofweek & weekday_bit:
+            return False
+        if every == 5:
+            return day.day + 7 > calendar.monthrange(day.year, day.month)[1]
+        return (day.day - 1) // 7 + 1 == every
+    return False
+
+
+def _expand_timeperiod(timeperiod: Dict[str, Any], active_since: int, active_till: int,
+                       start: int, end: int, tz: ZoneInfo) -> List[Tuple[int, int]]:
+    """Expand a maintenance time period into concrete intervals.
+    
+    Args:
+        timeperiod: Zabbix maintenance time period definition
+        active_since: Maintenance activation time (Unix timestamp)
+        active_till: Maintenance expiry time (Unix timestamp)
+        start: Window start (Unix timestamp)
+        end: Window end (Unix timestamp)
+        tz: Timezone the Zabbix server evaluates periods in
+        
+    Returns:
+        List[Tuple[int, int]]: Intervals clipped to the window and the active range
+    """
+    period = int(timeperiod.get("period", 0) or 0)
+    lower = max(start, active_since)
+    upper = min(end, active_till)
+    if period <= 0 or lower >= upper:
+        return []
+    
+    windows: List[Tuple[int, int]] = []
+    if int(timeperiod.get("timeperiod_type", 0)) == 0:
+        begin = int(timeperiod.get("start_date", 0) or 0)
+        windows.append((begin, begin + period))
+    else:
+        start_time = int(timeperiod.get("start_time", 0) or 0)
+        anchor = datetime.fromtimestamp(active_since, tz).date()
+        day = datetime.fromtimestamp(lower - period - start_time, tz).date()
+        last = datetime.fromtimestamp(upper, tz).date()
+        while day <= last:
+            if _timeperiod_matches(timeperiod, day, anchor):
+                midnight = int(datetime(day.year, day.month, day.day, tzinfo=tz).timestamp())
+                windows.append((midnight + start_time, midnight + start_time + period))
+            day += timedelta(days=1)
+    
+    return [(max(s, lower), min(e, upper)) for s, e in windows if s < upper and e > lower]
+
+
+def _maintenance_windows(maintenance: Dict[str, Any], start: int, end: int,
+                         tz: ZoneInfo) -> List[Tuple[int, int]]:
+    """Expand all time periods of a maintenance into merged intervals.
+    
+    Args:
+        maintenance: Zabbix maintenance with ``timeperiods`` selected
+        start: Window start (Unix timestamp)
+        end: Window end (Unix timestamp)
+        tz: Timezone the Zabbix server evaluates periods in
+        
+    Returns:
+        List[Tuple[int, int]]: Sorted, disjoint maintenance intervals
+    """
+    active_since = int(maintenance.get("active_since", 0) or 0)
+    active_till = int(maintenance.get("active_till", 0) or 0)
+    windows: List[Tuple[int, int]] = []
+    for timeperiod in maintenance.get("timeperiods", []):
+        windows.extend(_expand_timeperiod(timeperiod, active_since, active_till, start, end, tz))
+    return _merge_intervals(windows)
+
+
+def _host_maintenance_windows(client: ZabbixAPI, hostids: List[str],
+                              start: int, end: int) -> Dict[str, List[Tuple[int, int]]]:
+    """Get merged maintenance intervals for each host, including group assignments.
+    
+    Args:
+        client: Zabbix API client
+        hostids: Host IDs to resolve maintenance for
+        start: Window start (Unix timestamp)
+        end: Window end (Unix timestamp)
+        
+    Returns:
+        Dict[str, List[Tuple[int, int]]]: Maintenance intervals per host ID
+    """
+    groups_param = host_groups_param()
+    groups_key = host_groups_key()
+    tz = _maintenance_tz()
+    
+    group_hosts: Dict[str, List[str]] = {}
+    for host in client.host.get(hostids=hostids, output=["hostid"], **{groups_param: ["groupid"]}):
+        for group in host.get(groups_key, []):
+            group_hosts.setdefault(group["groupid"], []).append(host["hostid"])
+    
+    maintenances = client.maintenance.get(
+        hostids=hostids,
+        output=["maintenanceid", "active_since", "active_till"],
+        selectHosts=["hostid"],
+        selectTimeperiods="extend",
+        **{groups_param: ["groupid"]}
+    )
+    
+    windows: Dict[str, List[Tuple[int, int]]] = {hostid: [] for hostid in hostids}
+    for maintenance in maintenances:
+        intervals = _maintenance_windows(maintenance, start, end, tz)
+        if not intervals:
+            continue
+        affected = {host["hostid"] for host in maintenance.get("hosts", [])}
+        for group in maintenance.get(groups_key, []):
+            affected.update(group_hosts.get(group["groupid"], []))
+        for hostid in affected:
+            if hostid in windows:
+                windows[hostid].extend(intervals)
+    
+    return {hostid: _merge_intervals(intervals) for hostid, intervals in windows.items()}
+
+
+def _iter_event_pages(client: ZabbixAPI, params: Dict[str, Any],
+                      page_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """Stream events in event ID order, one page at a time.
+    
+    Args:
+        client: Zabbix API client
+        params: event.get parameters without sorting or paging options
+        page_size: Number of events per request
+        
+    Yields:
+        List[Dict[str, Any]]: One page of events
+    """
+    eventid_from = None
+    while True:
+        page_params = dict(params, sortfield="eventid", sortorder="ASC", limit=page_size)
+        if eventid_from:
+            page_params["eventid_from"] = eventid_from
+        page = client.event.get(**page_params)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        eventid_from = str(int(page[-1]["eventid"]) + 1)
+
+
+def _host_downtime(client: ZabbixAPI, hostids: List[str], start: int, end: int,
+                   triggerids: Optional[List[str]] = None,
+                   severities: Optional[List[int]] = None,
+                   lookback: int = 7 * SECONDS_PER_DAY) -> Dict[str, List[Tuple[int, int]]]:
+    """Pair problem and recovery events into problem intervals per host.
+    
+    Args:
+        client: Zabbix API client
+        hostids: Host IDs to compute downtime for
+        start: Window start (Unix timestamp)
+        end: Window end (Unix timestamp)
+        triggerids: Only consider problems of these triggers
+        severities: Only consider problems of these severities
+        lookback: How far before ``start`` to look for problems still open at ``start``
+        
+    Returns:
+        Dict[str, List[Tuple[int, int]]]: (problem clock, recovery clock) intervals per host ID,
+        sorted by problem clock and not merged, so callers can still filter them by when
+        the problem started
+    """
+    params = {
+        "output": ["eventid", "clock", "r_eventid"],
+        "source": 0,
+        "object": 0,
+        "value": 1,
+        "hostids": hostids,
+        "time_from": start - lookback,
+        "time_till": end,
+        "selectHosts": ["hostid"]
+    }
+    if triggerids:
+        params["objectids"] = triggerids
+    if severities:
+        params["severities"] = severities
+    
+    now = int(time.time())
+    intervals: Dict[str, List[Tuple[int, int]]] = {hostid: [] for hostid in hostids}
+    for page in _iter_event_pages(client, params):
+        recovery_ids = [event["r_eventid"] for event in page if event.get("r_eventid", "0") != "0"]
+        recovered = {}
+        if recovery_ids:
+            for event in client.event.get(eventids=recovery_ids, output=["eventid", "clock"]):
+                recovered[event["eventid"]] = int(event["clock"])
+        
+        for event in page:
+            finish = recovered.get(event.get("r_eventid"), now)
+            if finish <= start:
+                continue
+            for host in event.get("hosts", []):
+                if host["hostid"] in intervals:
+                    intervals[host["hostid"]].append((int(event["clock"]), finish))
+    
+    return {hostid: sorted(host_intervals) for hostid, host_intervals in intervals.items()}
+
+
+def _cache_availability_rollup(key: Tuple[Any, ...], rollup: Tuple[int, int]) -> None:
+    """Store a daily availability rollup, evicting the oldest entries when full.
+    
+    Args:
+        key: (scope, hostid, day_start) cache key
+        rollup: Downtime seconds and incidents started during the day
+    """
+    _availability_cache[key] = rollup
+    _availability_cache.move_to_end(key)
+    while len(_availability_cache) > AVAILABILITY_CACHE_SIZE:
+        _availability_cache.popitem(last=False)
+
+
+@mcp.tool()
+def availability_report(time_from: int,
+                        time_till: Optional[int] = None,
+                        hostids: Optional[List[str]] = None,
+                        groupids: Optional[List[str]] = None,
+                        triggerids: Optional[List[str]] = None,
+                        severities: Optional[List[int]] = None,
+                        exclude_maintenance: bool = True,
+                        lookback_days: int = 7) -> str:
+    """Compute per-host availability percentages from problem events.
+    
+    Problem events are streamed page by page, paired with their recovery
+    events and merged into downtime intervals per host. Maintenance windows
+    are subtracted when requested. Complete past days (UTC) are cached as
+    daily rollups, so overlapping reports only query the days not yet seen.
+    
+    Args:
+        time_from: Start time (Unix timestamp)
+        time_till: End time (Unix timestamp), defaults to now
+        hostids: List of host IDs to report on
+        groupids: List of host group IDs to report on
+        triggerids: Only count problems raised by these triggers
+        severities: Only count problems with these severity levels
+        exclude_maintenance: Do not count downtime during maintenance windows
+        lookback_days: Days before the start of each day (and of time_from) to search for
+            problems still open at that start
+        
+    Returns:
+        str: JSON formatted availability per host, lowest availability first
+    """
+    if not hostids and not groupids and not triggerids:
+        raise ValueError("At least one of hostids, groupids or triggerids is required")
+    
+    now = int(time.time())
+    time_till = time_till or now
+    if time_till <= time_from:
+        raise ValueError("time_till must be greater than time_from")
+    
+    client = get_zabbix_client()
+    host_params = {"output": ["hostid", "name"]}
+    if hostids:
+        host_params["hostids"] = hostids
+    if groupids:
+        host_params["groupids"] = groupids
+    if triggerids:
+        host_params["triggerids"] = triggerids
+    hosts = {host["hostid"]: host["name"] for host in client.host.get(**host_params)}
+    
+    # lookback_days decides which problems open before each day are attributed, so it scopes the cache too
+    scope = (tuple(sorted(triggerids or [])), tuple(sorted(severities or [])), exclude_maintenance, lookback_days)
+    
+    # Split the range at UTC midnight so whole past days can be served from the cache
+    segments = []
+    segment_start = time_from
+    while segment_start < time_till:
+        segment_end = min((segment_start // SECONDS_PER_DAY + 1) * SECONDS_PER_DAY, time_till)
+        segments.append((segment_start, segment_end))
+        segment_start = segment_end
+    
+    def cacheable(segment: Tuple[int, int]) -> bool:
+        return segment[1] - segment[0] == SECONDS_PER_DAY and segment[1] <= now
+    
+    totals = {hostid: [0, 0] for hostid in hosts}
+    missing = []
+    cached_days = 0
+    for segment in segments:
+        keys = [(scope, hostid, segment[0]) for hostid in hosts]
+        if hosts and cacheable(segment) and all(key in _availability_cache for key in keys):
+            for key in keys:
+                downtime, incidents = _availability_cache[key]
+                _availability_cache.move_to_end(key)
+                totals[key[1]][0] += downtime
+                totals[key[1]][1] += incidents
+            cached_days += 1
+        else:
+            missing.append(segment)
+    
+    if missing and hosts:
+        span_start, span_end = missing[0][0], missing[-1][1]
+        lookback = lookback_days * SECONDS_PER_DAY
+        problem_intervals = _host_downtime(client, list(hosts), span_start, span_end,
+                                           triggerids=triggerids, severities=severities,
+                                           lookback=lookback)
+        windows = _host_maintenance_windows(client, list(hosts), span_start, span_end) \
+            if exclude_maintenance else {}
+        
+        for segment in missing:
+            # Look back from each segment rather than from the span, so a day's rollup
+            # is the same whichever request computed it
+            earliest = segment[0] - lookback
+            for hostid in hosts:
+                downtime = _merge_intervals([
+                    (clock, finish) for clock, finish in problem_intervals[hostid]
+                    if earliest <= clock < segment[1] and finish > segment[0]
+                ])
+                if exclude_maintenance:
+                    downtime = _subtract_intervals(downtime, windows.get(hostid, []))
+                rollup = _interval_overlap(downtime, *segment)
+                totals[hostid][0] += rollup[0]
+                totals[hostid][1] += rollup[1]
+                if cacheable(segment):
+                    _cache_availability_rollup((scope, hostid, segment[0]), rollup)
+    
+    total_seconds = time_till - time_from
+    report = []
+    for hostid, name in hosts.items():
+        downtime, incidents = totals[hostid]
+        report.append({
+            "hostid": hostid,
+            "name": name,
+            "downtime_seconds": downtime,
+            "incidents_started": incidents,
+            "availability_pct": round(100.0 * (1 - downtime / total_seconds), 4)
+        })
+    report.sort(key=lambda entry: entry["availability_pct"])
+    
+    return format_response({
+        "time_from": time_from,
+        "time_till": time_till,
+        "exclude_maintenance": exclude_maintenance,
+        "days_from_cache": cached_days,
+        "segments_computed": len(missing),
+        "hosts": report
+    })
+
+
+# CONFIGURATION DRIFT DETECTION
+# Configuration fields hashed for drift detection; runtime fields such as
+# lastvalue or state are left out so they never register as drift
+DRIFT_ITEM_FIELDS = ["itemid", "hostid", "name", "key_", "type", "value_type", "delay",
+                     "units", "history", "trends", "status", "params", "templateid",
+                     "master_itemid"]
+DRIFT_TRIGGER_FIELDS = ["triggerid", "description", "expression", "priority", "status",
+                        "recovery_mode", "recovery_expression", "manual_close", "templateid"]
+
+# Number of hosts fetched per API request during drift checks
+DRIFT_HOST_CHUNK = 100
+
+# Drift baseline storage
+DRIFT_BASELINE_FILE = os.path.expanduser(
+    os.getenv("DRIFT_BASELINE_FILE", "~/.zabbix-mcp/drift_baseline.json")
+)
+_drift_baselines: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+def _chunks(values: List[Any], size: int) -> Iterator[List[Any]]:
+    """Split a list into consecutive chunks.
+    
+    Args:
+        values: List to split
+        size: Maximum chunk size
+        
+    Yields:
+        List[Any]: Consecutive slices of at most ``size`` elements
+    """
+    for index in range(0, len(values), size):
+        yield values[index:index + size]
+
+
+def _content_hash(data: Any) -> str:
+    """Compute a short, stable hash of JSON-serializable data.
+    
+    Args:
+        data: Data to hash
+        
+    Returns:
+        str: 16 character hex digest
+    """
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def _load_drift_baselines() -> Dict[str, Dict[str, Any]]:
+    """Load stored drift baselines, reading the baseline file on first use.
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: Baseline hashes per host ID
+    """
+    global _drift_baselines
+    
+    if _drift_baselines is None:
+        _drift_baselines = {}
+        if os.path.exists(DRIFT_BASELINE_FILE):
+            with open(DRIFT_BASELINE_FILE, "r") as f:
+                _drift_baselines = json.load(f)
+    
+    return _drift_baselines
+
+
+def _save_drift_baselines() -> None:
+    """Persist drift baselines to the baseline file."""
+    os.makedirs(os.path.dirname(DRIFT_BASELINE_FILE), exist_ok=True)
+    with open(DRIFT_BASELINE_FILE, "w") as f:
+        json.dump(_load_drift_baselines(), f)
+
+
+def _diff_hashes(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    """Compare two ID-to-hash maps.
+    
+    Args:
+        old: Baseline hashes
+        new: Fresh hashes
+        
+    Returns:
+        Dict[str, List[str]]: Added, removed and changed IDs
+    """
+    return {
+        "added": sorted(set(new) - set(old)),
+        "removed": sorted(set(old) - set(new)),
+        "changed": sorted(key for key in set(old) & set(new) if old[key] != new[key])
+    }
+
+
+def _fresh_config_hashes(client: ZabbixAPI, hostids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch the hashed configuration fields of hosts, items and triggers.
+    
+    Args:
+        client: Zabbix API client
+        hostids: Host IDs to hash
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Template, item and trigger hashes per host ID
+    """
+    fresh: Dict[str, Dict[str, Any]] = {}
+    for chunk in _chunks(hostids, DRIFT_HOST_CHUNK):
+        for host in client.host.get(hostids=chunk, output=["hostid", "host"],
+                                    selectParentTemplates=["templateid"]):
+            templateids = sorted(t["templateid"] for t in host.get("parentTemplates", []))
+            fresh[host["hostid"]] = {
+                "host": host["host"],
+                "templateids": templateids,
+                "templates": _content_hash(templateids),
+                "items": {},
+                "triggers": {}
+            }
+        
+        for item in client.item.get(hostids=chunk, output=DRIFT_ITEM_FIELDS):
+            if item["hostid"] in fresh:
+                fresh[item["hostid"]]["items"][item["itemid"]] = _content_hash(item)
+        
+        for trigger in client.trigger.get(hostids=chunk, output=DRIFT_TRIGGER_FIELDS,
+                                          selectHosts=["hostid"]):
+            trigger_hash = _content_hash({k: v for k, v in trigger.items() if k != "hosts"})
+            for host in trigger.get("hosts", []):
+                if host["hostid"] in fresh:
+                    fresh[host["hostid"]]["triggers"][trigger["triggerid"]] = trigger_hash
+    
+    return fresh
+
+
+@mcp.tool()
+def config_drift_check(hostids: Optional[List[str]] = None,
+                       groupids: Optional[List[str]] = None,
+                       update_baseline: bool = False,
+                       include_details: bool = True) -> str:
+    """Detect configuration drift of hosts against stored content hashes.
+    
+    Only the configuration fields of items and triggers are fetched and
+    hashed; full object detail is requested just for objects whose hash
+    changed or which were added. Hosts without a baseline get one recorded.
+    
+    Args:
+        hostids: List of host IDs to check
+        groupids: List of host group IDs to check
+        update_baseline: Replace the stored baseline with the current configuration
+        include_details: Fetch full detail for added and changed items and triggers
+        
+    Returns:
+        str: JSON formatted drift report per host
+    """
+    if not hostids and not groupids:
+        raise ValueError("At least one of hostids or groupids is required")
+    
+    client = get_zabbix_client()
+    if groupids:
+        group_hosts = client.host.get(groupids=groupids, output=["hostid"])
+        hostids = sorted(set(hostids or []) | {host["hostid"] for host in group_hosts})
+    
+    baselines = _load_drift_baselines()
+    fresh = _fresh_config_hashes(client, hostids)
+    
+    drifted = []
+    new_baselines = []
+    changed_itemids: List[str] = []
+    changed_triggerids: List[str] = []
+    for hostid, current in fresh.items():
+        baseline = baselines.get(hostid)
+        if baseline is None:
+            new_baselines.append(hostid)
+            continue
+        
+        item_diff = _diff_hashes(baseline["items"], current["items"])
+        trigger_diff = _diff_hashes(baseline["triggers"], current["triggers"])
+        templates_changed = baseline["templates"] != current["templates"]
+        if not templates_changed and not any(item_diff.values()) and not any(trigger_diff.values()):
+            continue
+        
+        entry = {"hostid": hostid, "host": current["host"], "items": item_diff, "triggers": trigger_diff}
+        if templates_changed:
+            entry["templates"] = {
+                "linked": sorted(set(current["templateids"]) - set(baseline["templateids"])),
+                "unlinked": sorted(set(baseline["templateids"]) - set(current["templateids"]))
+            }
+        drifted.append(entry)
+        changed_itemids.extend(item_diff["added"] + item_diff["changed"])
+        changed_triggerids.extend(trigger_diff["added"] + trigger_diff["changed"])
+    
+    details: Dict[str, Any] = {}
+    if include_details and (changed_itemids or changed_triggerids):
+        details["items"] = client.item.get(itemids=changed_itemids, output="extend") if changed_itemids else []
+        details["triggers"] = client.trigger.get(triggerids=changed_triggerids, output="extend") if changed_triggerids else []
+    
+    missing = sorted(set(hostids) - set(fresh))
+    for hostid in new_baselines:
+        baselines[hostid] = fresh[hostid]
+    if update_baseline:
+        baselines.update(fresh)
+        for hostid in missing:
+            baselines.pop(hostid, None)
+    if new_baselines or update_baseline:
+        _save_drift_baselines()
+    
+    return format_response({
+        "hosts_checked": len(fresh),
+        "hosts_drifted": len(drifted),
+        "baselines_created": new_baselines,
+        "baseline_updated": update_baseline,
+        "missing_hosts": missing,
+        "drift": drifted,
+        "details": details
+    })
+
+
+# CAPACITY FORECASTING
+# Number of items fetched per trend.get request
+FORECAST_ITEM_CHUNK = 50
+
+
+def _fit_linear(xs: List[float], ys: List[float]) -> Tuple[float, float]:
+    """Least-squares fit of ``y = intercept + slope * x``.
+    
+    Args:
+        xs: Sample positions
+        ys: Sample values
+        
+    Returns:
+        Tuple[float, float]: Slope and intercept
+    """
+    n = len(xs)
+    sum_x = math.fsum(xs)
+    sum_y = math.fsum(ys)
+    sum_xx = math.fsum(x * x for x in xs)
+    sum_xy = math.fsum(x * y for x, y in zip(xs, ys))
+    denominator = n * sum_xx - sum_x * sum_x
+    if n < 2 or denominator == 0:
+        return 0.0, sum_y / n if n else 0.0
+    slope = (n * sum_xy - sum_x * sum_y) / denominator
+    return slope, (sum_y - slope * sum_x) / n
+
+
+def _r_squared(ys: List[float], fitted: List[float]) -> Optional[float]:
+    """Coefficient of determination of a fit.
+    
+    Args:
+        ys: Observed values
+        fitted: Values predicted by the model
+        
+    Returns:
+        Optional[float]: R squared, or None when the data has no variance
+    """
+    mean = math.fsum(ys) / len(ys)
+    total = math.fsum((y - mean) ** 2 for y in ys)
+    if total == 0:
+        return None
+    residual = math.fsum((y - f) ** 2 for y, f in zip(ys, fitted))
+    return 1 - residual / total
+
+
+def _forecast_series(clocks: List[int], values: List[float], model: str, season_hours: int,
+                     threshold: float, direction: str, now: int) -> Dict[str, Any]:
+    """Fit a trend model to hourly averages and project the threshold crossing.
+    
+    Args:
+        clocks: Trend timestamps (Unix timestamps, hourly)
+        values: Hourly average values
+        model: ``linear`` or ``seasonal`` (linear trend plus hour-of-period profile)
+        season_hours: Length of the seasonal cycle in hours
+        threshold: Value whose crossing is projected
+        direction: ``above`` for rising metrics, ``below`` for falling ones
+        now: Reference time for the projection (Unix timestamp)
+        
+    Returns:
+        Dict[str, Any]: Fitted slope, current level, fit quality and days until crossing
+        
+    Raises:
+        ValueError: If season_hours is below 1
+    """
+    if season_hours < 1:
+        raise ValueError("season_hours must be at least 1")
+    origin = clocks[0]
+    xs = [(clock - origin) / SECONDS_PER_DAY for clock in clocks]
+    slope, intercept = _fit_linear(xs, values)
+    fitted = [intercept + slope * x for x in xs]
+    
+    offset = 0.0
+    if model == "seasonal":
+        buckets: Dict[int, List[float]] = {}
+        for clock, value, trend in zip(clocks, values, fitted):
+            buckets.setdefault((clock // 3600) % season_hours, []).append(value - trend)
+        profile = {bucket: math.fsum(r) / len(r) for bucket, r in buckets.items()}
+        fitted = [trend + profile[(clock // 3600) % season_hours] for clock, trend in zip(clocks, fitted)]
+        # Project with the seasonal peak (or trough) so the first crossing is reported
+        offset = max(profile.values()) if direction == "above" else min(profile.values())
+    
+    x_now = (now - origin) / SECONDS_PER_DAY
+    level = intercept + slope * x_now + offset
+    if (direction == "above" and level >= threshold) or (direction == "below" and level <= threshold):
+        days = 0.0
+    elif (direction == "above" and slope > 0) or (direction == "below" and slope < 0):
+        days = (threshold - level) / slope
+    else:
+        days = None
+    
+    r_squared = _r_squared(values, fitted)
+    return {
+        "slope_per_day": round(slope, 6),
+        "current_level": round(level, 4),
+        "last_value": values[-1],
+        "r_squared": round(r_squared, 4) if r_squared is not None else None,
+        "samples": len(values),
+        "days_to_threshold": round(days, 2) if days is not None else None,
+        "threshold_time": int(now + days * SECONDS_PER_DAY) if days is not None else None
+    }
+
+
+@mcp.tool()
+def forecast_item(threshold: float,
+                  itemids: Optional[List[str]] = None,
+                  hostids: Optional[List[str]] = None,
+                  groupids: Optional[List[str]] = None,
+                  search: Optional[Dict[str, str]] = None,
+                  direction: str = "above",
+                  model: str = "linear",
+                  history_days: int = 30,
+                  season_hours: int = 24,
+                  min_samples: int = 24,
+                  limit: int = 50) -> str:
+    """Forecast when numeric items will cross a threshold, ranked across hosts.
+    
+    Trends are fetched for many items per request and a linear or seasonal
+    model is fitted to each item's hourly averages.
+    
+    Args:
+        threshold: Value whose crossing is projected (e.g. 95 for vfs.fs.size[*,pused])
+        itemids: List of item IDs to forecast
+        hostids: List of host IDs whose items are forecast
+        groupids: List of host group IDs whose items are forecast
+        search: Item search criteria (e.g. {"key_": "vfs.fs.size"})
+        direction: above for rising metrics, below for falling ones (e.g. free space)
+        model: linear or seasonal (linear trend plus daily profile)
+        history_days: Days of trend history to fit
+        season_hours: Length of the seasonal cycle in hours
+        min_samples: Minimum number of hourly trend rows needed to forecast an item
+            (at least two cycles of season_hours for the seasonal model)
+        limit: Maximum number of results
+        
+    Returns:
+        str: JSON formatted forecasts, soonest threshold crossing first
+    """
+    if direction not in ("above", "below"):
+        raise ValueError("direction must be 'above' or 'below'")
+    if model not in ("linear", "seasonal"):
+        raise ValueError("model must be 'linear' or 'seasonal'")
+    if season_hours < 1:
+        raise ValueError("season_hours must be at least 1")
+    if model == "seasonal" and history_days * 24 < 2 * season_hours:
+        raise ValueError("history_days must cover at least two seasonal cycles (2 * season_hours)")
+    if not itemids and not hostids and not groupids:
+        raise ValueError("At least one of itemids, hostids or groupids is required")
+    
+    client = get_zabbix_client()
+    item_params = {
+        "output": ["itemid", "hostid", "name", "key_", "units"],
+        "selectHosts": ["host"],
+        "filter": {"value_type": [0, 3]}
+    }
+    if itemids:
+        item_params["itemids"] = itemids
+    if hostids:
+        item_params["hostids"] = hostids
+    if groupids:
+        item_params["groupids"] = groupids
+    if search:
+        item_params["search"] = search
+    items = {item["itemid"]: item for item in client.item.get(**item_params)}
+    
+    now = int(time.time())
+    series: Dict[str, Tuple[List[int], List[float]]] = {}
+    for chunk in _chunks(list(items), FORECAST_ITEM_CHUNK):
+        rows = client.trend.get(itemids=chunk, time_from=now - history_days * SECONDS_PER_DAY,
+                                output=["itemid", "clock", "value_avg"])
+        for row in sorted(rows, key=lambda r: int(r["clock"])):
+            clocks, values = series.setdefault(row["itemid"], ([], []))
+            clocks.append(int(row["clock"]))
+            values.append(float(row["value_avg"]))
+    
+    forecasts = []
+    skipped = 0
+    for itemid, (clocks, values) in series.items():
+        # The seasonal profile needs every hour of the cycle seen at least twice
+        needed = max(min_samples, 2, 2 * season_hours if model == "seasonal" else 0)
+        if len(values) < needed:
+            skipped += 1
+            continue
+        item = items[itemid]
+        forecast = _forecast_series(clocks, values, model, season_hours, threshold, direction, now)
+        forecast.update({
+            "itemid": itemid,
+            "hostid": item["hostid"],
+            "host": item["hosts"][0]["host"] if item.get("hosts") else None,
+            "name": item["name"],
+            "key_": item["key_"],
+            "units": item.get("units", "")
+        })
+        forecasts.append(forecast)
+    
+    forecasts.sort(key=lambda f: (f["days_to_threshold"] is None, f["days_to_threshold"] or 0))
+    
+    return format_response({
+        "threshold": threshold,
+        "direction": direction,
+        "model": model,
+        "items_forecast": len(forecasts),
+        "items_skipped": skipped + len(items) - len(series),
+        "forecasts": forecasts[:limit]
+    })
+
+
+# AGGREGATION
+# trend.get, which exposes the server's hourly min/avg/max/num rollups, is available from this API version
+TRENDS_MIN_API_VERSION = (3, 0)
+
+# Number of items per request and rows per page when reducing raw history locally
+AGGREGATE_ITEM_CHUNK = 50
+AGGREGATE_HISTORY_PAGE = 10000
+
+AGGREGATE_FUNCTIONS = ("avg", "min", "max", "sum", "count")
+
+
+def _new_accumulator() -> Dict[str, float]:
+    """Create an empty aggregate accumulator.
+    
+    Returns:
+        Dict[str, float]: Accumulator with count, sum, min and max
+    """
+    return {"count": 0, "sum": 0.0, "min": math.inf, "max": -math.inf}
+
+
+def _accumulate(acc: Dict[str, float], count: int, total: float, low: float, high: float) -> None:
+    """Fold a partial aggregate into an accumulator.
+    
+    Args:
+        acc: Accumulator to update
+        count: Number of samples in the partial aggregate
+        total: Sum of the samples
+        low: Minimum of the samples
+        high: Maximum of the samples
+    """
+    acc["count"] += count
+    acc["sum"] += total
+    acc["min"] = min(acc["min"], low)
+    acc["max"] = max(acc["max"], high)
+
+
+def _aggregate_value(acc: Dict[str, float], function: str) -> Optional[float]:
+    """Read a function result out of an accumulator.
+    
+    Args:
+        acc: Accumulator
+        function: One of AGGREGATE_FUNCTIONS
+        
+    Returns:
+        Optional[float]: Aggregate value, or None when there were no samples
+    """
+    if function == "count":
+        return acc["count"]
+    if not acc["count"]:
+        return None
+    if function == "avg":
+        return acc["sum"] / acc["count"]
+    return acc[function]
+
+
+def _reduce_history(client: ZabbixAPI, items: Dict[str, Dict[str, Any]],
+                    accumulators: Dict[str, Dict[str, float]],
+                    time_from: int, time_till: int) -> int:
+    """Stream raw history in pages and fold it into per-item accumulators.
+    
+    Args:
+        client: Zabbix API client
+        items: Items to reduce, keyed by item ID (value_type must be 0 or 3)
+        accumulators: Per-item accumulators to update
+        time_from: Start time (Unix timestamp, inclusive)
+        time_till: End time (Unix timestamp, inclusive)
+        
+    Returns:
+        int: Number of history rows transferred
+    """
+    rows_read = 0
+    by_type: Dict[int, List[str]] = {}
+    for itemid, item in items.items():
+        by_type.setdefault(int(item["value_type"]), []).append(itemid)
+    
+    for value_type, type_itemids in by_type.items():
+        for chunk in _chunks(type_itemids, AGGREGATE_ITEM_CHUNK):
+            page_from = time_from
+            boundary: set = set()
+            while True:
+                page = client.history.get(itemids=chunk, history=value_type,
+                                          time_from=page_from, time_till=time_till,
+                                          output=["itemid", "clock", "ns", "value"],
+                                          sortfield="clock", sortorder="ASC",
+                                          limit=AGGREGATE_HISTORY_PAGE)
+                rows_read += len(page)
+                for row in page:
+                    key = (row["itemid"], row["clock"], row.get("ns"))
+                    if key in boundary:
+                        continue
+                    value = float(row["value"])
+                    _accumulate(accumulators[row["itemid"]], 1, value, value, value)
+                if len(page) < AGGREGATE_HISTORY_PAGE:
+                    break
+                # Restart at the last clock, skipping rows already counted at that second
+                page_from = int(page[-1]["clock"])
+                boundary = {(row["itemid"], row["clock"], row.get("ns"))
+                            for row in page if int(row["clock"]) == page_from}
+    
+    return rows_read
+
+
+def _reduce_trends(client: ZabbixAPI, itemids: List[str],
+                   accumulators: Dict[str, Dict[str, float]],
+                   time_from: int, time_till: int) -> int:
+    """Fold the server's hourly trend rollups into per-item accumulators.
+    
+    Args:
+        client: Zabbix API client
+        itemids: Item IDs to reduce
+        accumulators: Per-item accumulators to update
+        time_from: Start of the first full hour (Unix timestamp)
+        time_till: End of the last full hour (Unix timestamp, exclusive)
+        
+    Returns:
+        int: Number of trend rows transferred
+    """
+    rows_read = 0
+    for chunk in _chunks(itemids, AGGREGATE_ITEM_CHUNK):
+        rows = client.trend.get(itemids=chunk, time_from=time_from, time_till=time_till - 1,
+                                output=["itemid", "clock", "num", "value_min", "value_avg", "value_max"])
+        rows_read += len(rows)
+        for row in rows:
+            num = int(row["num"])
+            _accumulate(accumulators[row["itemid"]], num, float(row["value_avg"]) * num,
+                        float(row["value_min"]), float(row["value_max"]))
+    return rows_read
+
+
+@mcp.tool()
+def aggregate_get(time_from: int,
+                  time_till: Optional[int] = None,
+                  function: str = "avg",
+                  itemids: Optional[List[str]] = None,
+                  hostids: Optional[List[str]] = None,
+                  groupids: Optional[List[str]] = None,
+                  key_: Optional[str] = None,
+                  search: Optional[Dict[str, str]] = None,
+                  strategy: str = "auto") -> str:
+    """Aggregate numeric item values over a time range without pulling raw history.
+    
+    With the ``trends`` strategy, full hours are read from the server's hourly
+    trend rollups and only the partial hours at the edges come from raw
+    history. The ``history`` strategy reduces raw history locally in
+    bounded pages. ``auto`` uses trends when the API version provides
+    trend.get and the range spans at least one full hour.
+    
+    Args:
+        time_from: Start time (Unix timestamp)
+        time_till: End time (Unix timestamp), defaults to now
+        function: Aggregate function (avg, min, max, sum, count)
+        itemids: List of item IDs to aggregate
+        hostids: List of host IDs whose items are aggregated
+        groupids: List of host group IDs whose items are aggregated
+        key_: Exact item key to aggregate (e.g. system.cpu.util)
+        search: Item search criteria
+        strategy: auto, trends or history
+        
+    Returns:
+        str: JSON formatted aggregate per item and across all matched items
+    """
+    if function not in AGGREGATE_FUNCTIONS:
+        raise ValueError(f"function must be one of: {', '.join(AGGREGATE_FUNCTIONS)}")
+    if strategy not in ("auto", "trends", "history"):
+        raise ValueError("strategy must be 'auto', 'trends' or 'history'")
+    if not itemids and not hostids and not groupids:
+        raise ValueError("At least one of itemids, hostids or groupids is required")
+    
+    now = int(time.time())
+    time_till = min(time_till or now, now)
+    if time_till <= time_from:
+        raise ValueError("time_till must be greater than time_from")
+    
+    client = get_zabbix_client()
+    item_params = {
+        "output": ["itemid", "hostid", "name", "key_", "units", "value_type", "trends"],
+        "selectHosts": ["host"],
+        "filter": {"value_type": [0, 3]}
+    }
+    if itemids:
+        item_params["itemids"] = itemids
+    if hostids:
+        item_params["hostids"] = hostids
+    if groupids:
+        item_params["groupids"] = groupids
+    if key_:
+        item_params["filter"]["key_"] = key_
+    if search:
+        item_params["search"] = search
+    items = {item["itemid"]: item for item in client.item.get(**item_params)}
+    accumulators = {itemid: _new_accumulator() for itemid in items}
+    
+    # Trends hold full hours only, and the current hour is written once it completes
+    first_hour = -(-time_from // 3600) * 3600
+    last_hour = min(time_till + 1, now) // 3600 * 3600
+    if strategy == "auto":
+        use_trends = get_api_version() >= TRENDS_MIN_API_VERSION and last_hour > first_hour
+        strategy = "trends" if use_trends else "history"
+    elif strategy == "trends" and last_hour <= first_hour:
+        strategy = "history"
+    
+    rows_read = 0
+    if strategy == "trends":
+        trend_items = [itemid for itemid, item in items.items() if item.get("trends", "1") not in ("0", "")]
+        history_only = {itemid: item for itemid, item in items.items() if itemid not in trend_items}
+        rows_read += _reduce_trends(client, trend_items, accumulators, first_hour, last_hour)
+        edges = {itemid: items[itemid] for itemid in trend_items}
+        if first_hour > time_from:
+            rows_read += _reduce_history(client, edges, accumulators, time_from, first_hour - 1)
+        if time_till >= last_hour:
+            rows_read += _reduce_history(client, edges, accumulators, last_hour, time_till)
+        if history_only:
+            rows_read += _reduce_history(client, history_only, accumulators, time_from, time_till)
+    else:
+        rows_read += _reduce_history(client, items, accumulators, time_from, time_till)
+    
+    overall = _new_accumulator()
+    results = []
+    for itemid, acc in accumulators.items():
+        item = items[itemid]
+        if acc["count"]:
+            _accumulate(overall, acc["count"], acc["sum"], acc["min"], acc["max"])
+        results.append({
+            "itemid": itemid,
+            "hostid": item["hostid"],
+            "host": item["hosts"][0]["host"] if item.get("hosts") else None,
+            "key_": item["key_"],
+            "units": item.get("units", ""),
+            "samples": acc["count"],
+            "value": _aggregate_value(acc, function)
+        })
+    
+    return format_response({
+        "function": function,
+        "strategy": strategy,
+        "time_from": time_from,
+        "time_till": time_till,
+        "rows_transferred": rows_read,
+        "overall": {"samples": overall["count"], "value": _aggregate_value(overall, function)},
+        "items": results
+    })
+
+
+# MAINTENANCE INDEX
+# Seconds between automatic index refreshes
+MAINTENANCE_INDEX_TTL = int(os.getenv("MAINTENANCE_INDEX_TTL", "300"))
+
+# How far ahead maintenance windows are expanded, in seconds
+MAINTENANCE_INDEX_HORIZON = int(os.getenv("MAINTENANCE_INDEX_HORIZON", str(7 * SECONDS_PER_DAY)))
+
+# Precomputed maintenance intervals. "maintenances" holds each definition's hash,
+# expanded intervals and assignments; "hosts" and "groups" hold parallel sorted
+# lists of merged interval starts and ends for bisect lookups.
+_maintenance_index: Dict[str, Any] = {
+    "refreshed_at": 0,
+    "window": (0, 0),
+    "maintenances": {},
+    "group_hosts": {},
+    "hosts": {},
+    "groups": {}
+}
+
+
+def _index_entry(intervals: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """Build a bisectable index entry from intervals.
+    
+    Args:
+        intervals: Intervals in any order
+        
+    Returns:
+        Tuple[List[int], List[int]]: Sorted starts and matching ends of the merged intervals
+    """
+    merged = _merge_intervals(intervals)
+    return [start for start, _ in merged], [end for _, end in merged]
+
+
+def _lookup_maintenance(entry: Optional[Tuple[List[int], List[int]]],
+                        at_time: int) -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+    """Find the maintenance interval active at a time and the next one after it.
+    
+    Args:
+        entry: Index entry from _index_entry
+        at_time: Time to check (Unix timestamp)
+        
+    Returns:
+        Tuple: Active (start, end) interval or None, and next (start, end) interval or None
+    """
+    if not entry:
+        return None, None
+    starts, ends = entry
+    position = bisect.bisect_right(starts, at_time)
+    active = None
+    if position and at_time < ends[position - 1]:
+        active = (starts[position - 1], ends[position - 1])
+    upcoming = (starts[position], ends[position]) if position < len(starts) else None
+    return active, upcoming
+
+
+def refresh_maintenance_index(force: bool = False) -> Dict[str, Any]:
+    """Refresh the maintenance index, re-expanding only changed maintenances.
+    
+    Definitions are fetched on every refresh but only new or changed ones,
+    or ones whose expansion no longer covers the index window, are expanded
+    again. Host and group entries are rebuilt only when one of their
+    maintenances or their group membership changed.
+    
+    Args:
+        force: Refresh even if the index is younger than MAINTENANCE_INDEX_TTL
+        
+    Returns:
+        Dict[str, Any]: The maintenance index
+    """
+    index = _maintenance_index
+    now = int(time.time())
+    if not force and now - index["refreshed_at"] < MAINTENANCE_INDEX_TTL:
+        return index
+    
+    client = get_zabbix_client()
+    groups_param = host_groups_param()
+    groups_key = host_groups_key()
+    tz = _maintenance_tz()
+    window = (now - SECONDS_PER_DAY, now + MAINTENANCE_INDEX_HORIZON)
+    
+    definitions = client.maintenance.get(output="extend", selectHosts=["hostid"],
+                                         selectTimeperiods="extend", **{groups_param: ["groupid"]})
+    
+    previous = index["maintenances"]
+    current: Dict[str, Dict[str, Any]] = {}
+    dirty_hosts: set = set()
+    dirty_groups: set = set()
+    for definition in definitions:
+        maintenanceid = definition["maintenanceid"]
+        entry = {
+            "hash": _content_hash(definition),
+            "name": definition.get("name"),
+            "hostids": sorted(h["hostid"] for h in definition.get("hosts", [])),
+            "groupids": sorted(g["groupid"] for g in definition.get(groups_key, []))
+        }
+        old = previous.get(maintenanceid)
+        if old and old["hash"] == entry["hash"] and old["expanded_till"] >= window[1]:
+            entry["intervals"] = old["intervals"]
+            entry["expanded_till"] = old["expanded_till"]
+        else:
+            # Expand a full horizon past the window so later refreshes can reuse it
+            expanded_till = window[1] + MAINTENANCE_INDEX_HORIZON
+            entry["intervals"] = _maintenance_windows(definition, window[0], expanded_till, tz)
+            entry["expanded_till"] = expanded_till
+            dirty_hosts.update(entry["hostids"])
+            dirty_groups.update(entry["groupids"])
+            if old:
+                dirty_hosts.update(old["hostids"])
+                dirty_groups.update(old["groupids"])
+        current[maintenanceid] = entry
+    
+    for maintenanceid in set(previous) - set(current):
+        dirty_hosts.update(previous[maintenanceid]["hostids"])
+        dirty_groups.update(previous[maintenanceid]["groupids"])
+    
+    # Resolve group assignments to hosts so host lookups need a single bisect
+    groupids = sorted({g for entry in current.values() for g in entry["groupids"]})
+    group_hosts: Dict[str, List[str]] = {groupid: [] for groupid in groupids}
+    if groupids:
+        for host in client.host.get(groupids=groupids, output=["hostid"], **{groups_param: ["groupid"]}):
+            for group in host.get(groups_key, []):
+                if group["groupid"] in group_hosts:
+                    group_hosts[group["groupid"]].append(host["hostid"])
+    for groupid in set(group_hosts) | set(index["group_hosts"]):
+        old_members = set(index["group_hosts"].get(groupid, []))
+        new_members = set(group_hosts.get(groupid, []))
+        if old_members != new_members:
+            dirty_hosts.update(old_members ^ new_members)
+        if groupid in dirty_groups:
+            dirty_hosts.update(old_members | new_members)
+    
+    host_intervals: Dict[str, List[Tuple[int, int]]] = {hostid: [] for hostid in dirty_hosts}
+    group_intervals: Dict[str, List[Tuple[int, int]]] = {groupid: [] for groupid in dirty_groups}
+    for entry in current.values():
+        for groupid in entry["groupids"]:
+            if groupid in group_intervals:
+                group_intervals[groupid].extend(entry["intervals"])
+            for hostid in group_hosts.get(groupid, []):
+                if hostid in host_intervals:
+                    host_intervals[hostid].extend(entry["intervals"])
+        for hostid in entry["hostids"]:
+            if hostid in host_intervals:
+                host_intervals[hostid].extend(entry["intervals"])
+    
+    for key, intervals_by_key in (("hosts", host_intervals), ("groups", group_intervals)):
+        for object_id, intervals in intervals_by_key.items():
+            if intervals:
+                index[key][object_id] = _index_entry(intervals)
+            else:
+                index[key].pop(object_id, None)
+    
+    index.update({
+        "refreshed_at": now,
+        "window": window,
+        "maintenances": current,
+        "group_hosts": group_hosts
+    })
+    logger.info(f"Maintenance index refreshed: {len(current)} maintenances, "
+                f"{len(dirty_hosts)} hosts and {len(dirty_groups)} groups rebuilt")
+    return index
+
+
+def hosts_in_maintenance(hostids: List[str], at_time: Optional[int] = None) -> set:
+    """Return the subset of hosts that are in maintenance at a given time.
+    
+    Args:
+        hostids: Host IDs to check
+        at_time: Time to check (Unix timestamp), defaults to now
+        
+    Returns:
+        set: Host IDs in maintenance
+    """
+    index = refresh_maintenance_index()
+    at_time = at_time or int(time.time())
+    return {hostid for hostid in hostids
+            if _lookup_maintenance(index["hosts"].get(hostid), at_time)[0]}
+
+
+@mcp.tool()
+def maintenance_status(hostids: Optional[List[str]] = None,
+                       groupids: Optional[List[str]] = None,
+                       at_time: Optional[int] = None,
+                       refresh: bool = False) -> str:
+    """Check whether hosts or host groups are in maintenance at a given time.
+    
+    Answers come from a precomputed interval index of active and upcoming
+    maintenance windows, refreshed incrementally every MAINTENANCE_INDEX_TTL
+    seconds. Without hostids or groupids, all hosts in maintenance are listed.
+    
+    Args:
+        hostids: List of host IDs to check
+        groupids: List of host group IDs to check
+        at_time: Time to check (Unix timestamp), defaults to now
+        refresh: Force an index refresh before answering
+        
+    Returns:
+        str: JSON formatted maintenance state per host and host group
+    """
+    index = refresh_maintenance_index(force=refresh)
+    at_time = at_time or int(time.time())
+    window = index["window"]
+    if not window[0] <= at_time <= window[1]:
+        raise ValueError(f"at_time must fall inside the indexed window {window[0]}-{window[1]}")
+    
+    def describe(entry: Optional[Tuple[List[int], List[int]]]) -> Dict[str, Any]:
+        active, upcoming = _lookup_maintenance(entry, at_time)
+        return {
+            "in_maintenance": active is not None,
+            "active_until": active[1] if active else None,
+            "next_start": upcoming[0] if upcoming else None,
+            "next_end": upcoming[1] if upcoming else None
+        }
+    
+    if not hostids and not groupids:
+        hostids = sorted(hostid for hostid, entry in index["hosts"].items()
+                         if _lookup_maintenance(entry, at_time)[0])
+    
+    return format_response({
+        "at_time": at_time,
+        "refreshed_at": index["refreshed_at"],
+        "window": {"from": window[0], "till": window[1]},
+        "hosts": {hostid: describe(index["hosts"].get(hostid)) for hostid in hostids or []},
+        "groups": {groupid: describe(index["groups"].get(groupid)) for groupid in groupids or []}
+    })
+
+
 # GRAPH MANAGEMENT
 @mcp.tool()
 def graph_get(graphids: Optional[List[str]] = None,
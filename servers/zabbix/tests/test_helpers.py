@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pure helpers of the Zabbix MCP Server
+Run with: python -m pytest servers/zabbix/tests
+"""
+
+import json
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import zabbix_mcp_server as zms
+
+HOUR = 3600
+DAY = zms.SECONDS_PER_DAY
+# 2024-01-01T00:00:00Z
+ORIGIN = 1704067200
+
+
+def hourly(days: int, value) -> tuple:
+    """Hourly clocks from ORIGIN and their values"""
+    clocks = [ORIGIN + hour * HOUR for hour in range(days * 24)]
+    return clocks, [value(clock) for clock in clocks]
+
+
+class TestForecastSeries:
+    def test_linear_trend_projects_crossing(self):
+        # Grows by 1 per day from 10
+        clocks, values = hourly(10, lambda clock: 10 + (clock - ORIGIN) / DAY)
+        now = ORIGIN + 10 * DAY
+        result = zms._forecast_series(clocks, values, "linear", 24, 30, "above", now)
+        assert result["slope_per_day"] == pytest.approx(1.0)
+        assert result["current_level"] == pytest.approx(20.0)
+        assert result["r_squared"] == pytest.approx(1.0)
+        assert result["days_to_threshold"] == pytest.approx(10.0)
+        assert result["threshold_time"] == now + 10 * DAY
+        assert result["samples"] == 240
+
+    def test_falling_metric_below(self):
+        clocks, values = hourly(10, lambda clock: 100 - 2 * (clock - ORIGIN) / DAY)
+        result = zms._forecast_series(clocks, values, "linear", 24, 60, "below", ORIGIN + 10 * DAY)
+        assert result["days_to_threshold"] == pytest.approx(10.0)
+
+    def test_already_crossed(self):
+        clocks, values = hourly(5, lambda clock: 95.0)
+        result = zms._forecast_series(clocks, values, "linear", 24, 90, "above", ORIGIN + 5 * DAY)
+        assert result["days_to_threshold"] == 0.0
+
+    def test_trend_moving_away_never_crosses(self):
+        clocks, values = hourly(5, lambda clock: 50 - (clock - ORIGIN) / DAY)
+        result = zms._forecast_series(clocks, values, "linear", 24, 90, "above", ORIGIN + 5 * DAY)
+        assert result["days_to_threshold"] is None
+        assert result["threshold_time"] is None
+
+    def test_flat_series_has_no_r_squared(self):
+        clocks, values = hourly(2, lambda clock: 5.0)
+        assert zms._forecast_series(clocks, values, "linear", 24, 90, "above", ORIGIN)["r_squared"] is None
+
+    def test_seasonal_projects_with_daily_peak(self):
+        # Flat at 50 with a +20 peak between 12:00 and 13:00 every day
+        clocks, values = hourly(14, lambda clock: 70.0 if (clock // HOUR) % 24 == 12 else 50.0)
+        now = ORIGIN + 14 * DAY
+        linear = zms._forecast_series(clocks, values, "linear", 24, 60, "above", now)
+        seasonal = zms._forecast_series(clocks, values, "seasonal", 24, 60, "above", now)
+        assert linear["days_to_threshold"] > 365
+        assert seasonal["days_to_threshold"] == 0.0
+        assert seasonal["r_squared"] == pytest.approx(1.0)
+        assert seasonal["r_squared"] > linear["r_squared"]
+
+    def test_season_hours_must_be_positive(self):
+        clocks, values = hourly(2, lambda clock: 1.0)
+        with pytest.raises(ValueError, match="season_hours"):
+            zms._forecast_series(clocks, values, "seasonal", 0, 10, "above", ORIGIN)
+
+
+class FakeZabbix:
+    """Client serving fixed maintenance definitions and host groups"""
+
+    def __init__(self, maintenances: list, hosts: list):
+        self.maintenances = maintenances
+        self.maintenance = SimpleNamespace(get=lambda **kwargs: self.maintenances)
+        self.host = SimpleNamespace(get=lambda **kwargs: hosts)
+
+
+@pytest.fixture
+def expanded_maintenances(monkeypatch):
+    """Reset the maintenance index on Zabbix 6.4 and record which maintenances get expanded"""
+    monkeypatch.setattr(zms, "zabbix_api_version", (6, 4))
+    for key, value in {"refreshed_at": 0, "window": (0, 0), "maintenances": {},
+                       "group_hosts": {}, "hosts": {}, "groups": {}}.items():
+        monkeypatch.setitem(zms._maintenance_index, key, value)
+    expanded = []
+    windows = zms._maintenance_windows
+
+    def counting_windows(maintenance, start, end, tz):
+        expanded.append(maintenance["maintenanceid"])
+        return windows(maintenance, start, end, tz)
+
+    monkeypatch.setattr(zms, "_maintenance_windows", counting_windows)
+    return expanded
+
+
+def one_time_maintenance(maintenanceid: str, start: int, period: int, hostids=(), groupids=()) -> dict:
+    """One-time maintenance of period seconds from start"""
+    return {
+        "maintenanceid": maintenanceid,
+        "name": f"maintenance {maintenanceid}",
+        "active_since": str(start - DAY),
+        "active_till": str(start + 30 * DAY),
+        "timeperiods": [{"timeperiod_type": "0", "start_date": str(start), "period": str(period)}],
+        "hosts": [{"hostid": hostid} for hostid in hostids],
+        "hostgroups": [{"groupid": groupid} for groupid in groupids]
+    }
+
+
+class TestMaintenanceIndex:
+    def test_merge_intervals(self):
+        assert zms._merge_intervals([(5, 8), (1, 3), (3, 4), (7, 10), (12, 12)]) == [(1, 4), (5, 10)]
+
+    def test_lookup_active_and_upcoming(self):
+        entry = zms._index_entry([(300, 400), (100, 200), (150, 250)])
+        assert entry == ([100, 300], [250, 400])
+        assert zms._lookup_maintenance(entry, 50) == (None, (100, 250))
+        assert zms._lookup_maintenance(entry, 100) == ((100, 250), (300, 400))
+        assert zms._lookup_maintenance(entry, 250) == (None, (300, 400))
+        assert zms._lookup_maintenance(entry, 399) == ((300, 400), None)
+        assert zms._lookup_maintenance(entry, 400) == (None, None)
+
+    def test_lookup_without_entry(self):
+        assert zms._lookup_maintenance(None, 100) == (None, None)
+
+    def test_daily_windows_respect_timezone(self):
+        maintenance = {
+            "active_since": str(ORIGIN),
+            "active_till": str(ORIGIN + 3 * DAY),
+            # Every day 02:00-03:00 local time
+            "timeperiods": [{"timeperiod_type": "2", "every": "1", "start_time": str(2 * HOUR),
+                             "period": str(HOUR)}]
+        }
+        utc = zms._maintenance_windows(maintenance, ORIGIN, ORIGIN + 2 * DAY, ZoneInfo("UTC"))
+        assert utc == [(ORIGIN + 2 * HOUR, ORIGIN + 3 * HOUR),
+                       (ORIGIN + DAY + 2 * HOUR, ORIGIN + DAY + 3 * HOUR)]
+        berlin = zms._maintenance_windows(maintenance, ORIGIN, ORIGIN + 2 * DAY, ZoneInfo("Europe/Berlin"))
+        assert berlin[0] == (ORIGIN + HOUR, ORIGIN + 2 * HOUR)
+
+    def test_refresh_indexes_hosts_and_groups(self, monkeypatch, expanded_maintenances):
+        start = int(time.time()) + HOUR
+        client = FakeZabbix(
+            [one_time_maintenance("1", start, HOUR, hostids=["10"]),
+             one_time_maintenance("2", start + 30 * 60, HOUR, groupids=["5"])],
+            [{"hostid": "20", "hostgroups": [{"groupid": "5"}]}]
+        )
+        monkeypatch.setattr(zms, "zabbix_api", client)
+        index = zms.refresh_maintenance_index(force=True)
+        assert index["hosts"]["10"] == ([start], [start + HOUR])
+        assert index["hosts"]["20"] == ([start + 30 * 60], [start + 90 * 60])
+        assert index["groups"]["5"] == ([start + 30 * 60], [start + 90 * 60])
+        assert sorted(expanded_maintenances) == ["1", "2"]
+
+    def test_refresh_reexpands_only_changed_maintenances(self, monkeypatch, expanded_maintenances):
+        start = int(time.time()) + HOUR
+        client = FakeZabbix(
+            [one_time_maintenance("1", start, HOUR, hostids=["10"]),
+             one_time_maintenance("2", start, HOUR, hostids=["11"])],
+            []
+        )
+        monkeypatch.setattr(zms, "zabbix_api", client)
+        zms.refresh_maintenance_index(force=True)
+        expanded_maintenances.clear()
+        client.maintenances = [one_time_maintenance("1", start, HOUR, hostids=["10"]),
+                               one_time_maintenance("2", start, 2 * HOUR, hostids=["11"])]
+        index = zms.refresh_maintenance_index(force=True)
+        assert expanded_maintenances == ["2"]
+        assert index["hosts"]["10"] == ([start], [start + HOUR])
+        assert index["hosts"]["11"] == ([start], [start + 2 * HOUR])
+
+    def test_removed_maintenance_drops_host(self, monkeypatch, expanded_maintenances):
+        start = int(time.time()) + HOUR
+        client = FakeZabbix([one_time_maintenance("1", start, HOUR, hostids=["10"])], [])
+        monkeypatch.setattr(zms, "zabbix_api", client)
+        zms.refresh_maintenance_index(force=True)
+        client.maintenances = []
+        index = zms.refresh_maintenance_index(force=True)
+        assert "10" not in index["hosts"]
+        assert zms.hosts_in_maintenance(["10"], start + 60) == set()
+
+
+class FakeEvents:
+    """Client serving one host and fixed problem and recovery events"""
+
+    def __init__(self, problems: list, recoveries: list):
+        self.host = SimpleNamespace(get=lambda **kwargs: [{"hostid": "10", "name": "web"}])
+        self.event = SimpleNamespace(get=self.get_events)
+        self.problems = problems
+        self.recoveries = recoveries
+
+    def get_events(self, **params):
+        if "eventids" in params:
+            return [event for event in self.recoveries if event["eventid"] in params["eventids"]]
+        return [event for event in self.problems
+                if params["time_from"] <= int(event["clock"]) <= params["time_till"]]
+
+
+class TestAvailabilityReport:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        # One problem on host 10 from day 1 to day 12
+        client = FakeEvents(
+            [{"eventid": "1", "clock": str(ORIGIN + DAY), "r_eventid": "2", "hosts": [{"hostid": "10"}]}],
+            [{"eventid": "2", "clock": str(ORIGIN + 12 * DAY)}]
+        )
+        monkeypatch.setattr(zms, "zabbix_api", client)
+        monkeypatch.setattr(zms, "_availability_cache", OrderedDict())
+        return client
+
+    @staticmethod
+    def downtime(first_day: int, last_day: int) -> int:
+        report = json.loads(zms.availability_report(ORIGIN + first_day * DAY, ORIGIN + last_day * DAY,
+                                                    hostids=["10"], exclude_maintenance=False))
+        return report["hosts"][0]["downtime_seconds"]
+
+    def test_lookback_applies_per_day(self, client):
+        # Day 9 starts eight days after the problem opened, past the 7 day lookback
+        assert self.downtime(5, 10) == 4 * DAY
+
+    def test_short_report_first(self, client):
+        assert self.downtime(8, 10) == DAY
+        assert self.downtime(5, 10) == 4 * DAY
+
+    def test_long_report_first(self, client):
+        assert self.downtime(5, 10) == 4 * DAY
+        assert self.downtime(8, 10) == DAY
+        assert len(zms._availability_cache) == 5